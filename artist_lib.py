@@ -0,0 +1,123 @@
+import re
+import string
+import unicodedata
+from collections import Counter
+
+# Only "the": "a", "la" or "le" often start a name ("A Tribe Called Quest",
+# "La Roux"), stripping them would merge distinct artists
+ARTICLES = "the"
+ARTICLE_PATTERN = re.compile(rf"^(?:{ARTICLES}) (?=.)|, (?:{ARTICLES})$")
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+ASCII_NON_WORD = str.maketrans("", "", f"{string.punctuation}{string.whitespace}")
+
+
+def fold_case(name):
+    # Composed and compatibility forms (NFC/NFD accents, ligatures, full-width) and case
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+
+def strip_article(name):
+    # "the red garland quintet", "red garland quintet, the" -> "red garland quintet"
+    return ARTICLE_PATTERN.sub("", name, count=1)
+
+
+def strip_punctuation(name):
+    # "ac/dc" -> "acdc", "simon & garfunkel" -> "simonandgarfunkel"
+    name = name.replace("&", "and")
+    if name.isascii():
+        return name.translate(ASCII_NON_WORD)
+    return NON_WORD_PATTERN.sub("", name)
+
+
+def fold_keys(name):
+    # Keys of name for each rule of FOLDS, each one looser than the previous one
+    # A name without any letter or digit ("!!!") keeps its punctuation, instead of
+    # an empty key shared by all of them
+    case = fold_case(name)
+    article = strip_article(case)
+    return case, article, strip_punctuation(article) or article
+
+
+def fold_article(name):
+    return fold_keys(name)[1]
+
+
+def fold_punctuation(name):
+    return fold_keys(name)[2]
+
+
+# Tried in this order after an exact lookup
+FOLDS = ["case", "article", "punctuation"]
+
+
+class ArtistIndex(dict):
+    # Playlist ids by artist, as built by build_artist_dict. A name missing from the
+    # dict is looked up by its folded keys and then in the aliases; the folded keys of
+    # the artists are computed once, and the result of each name is memoized, so a
+    # lookup stays O(1) per track. Iteration, equality and exact lookups are the ones
+    # of the dict.
+    def __init__(self, artist_dict=(), aliases=()):
+        super().__init__(artist_dict)
+        self.folded = [{} for _ in FOLDS]
+        for artist in self:
+            for folded, key in zip(self.folded, fold_keys(artist)):
+                folded.setdefault(key, artist)
+        self.aliases = {}
+        self.resolved = {}
+        for alias, artist in aliases:
+            canonical = self.canonical(artist)
+            if canonical is None:
+                print(f"WARNING: alias {alias} refers to {artist}, not in the artists.")
+            else:
+                self.aliases.setdefault(fold_punctuation(alias), canonical)
+        # Names looked up above were resolved without the aliases
+        self.resolved = {}
+        # Lookups answered by a fold or an alias, by rule and by name
+        self.hits = Counter()
+        self.matched = {}
+
+    def resolve(self, name):
+        # (artist of the dict, rule) or None
+        if dict.__contains__(self, name):
+            return name, "exact"
+        if name not in self.resolved:
+            self.resolved[name] = None
+            keys = fold_keys(name)
+            for rule, folded, key in zip(FOLDS, self.folded, keys):
+                artist = folded.get(key)
+                if artist is not None:
+                    self.resolved[name] = (artist, rule)
+                    break
+            else:
+                artist = self.aliases.get(keys[-1])
+                if artist is not None:
+                    self.resolved[name] = (artist, "alias")
+        return self.resolved[name]
+
+    def canonical(self, name):
+        resolved = self.resolve(name)
+        return None if resolved is None else resolved[0]
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def lookup(self, name, nb=1):
+        # Artist of the dict of name looked up nb times, or None
+        resolved = self.resolve(name)
+        if resolved is None:
+            return None
+        artist, rule = resolved
+        if rule != "exact":
+            self.hits[rule] += nb
+            self.matched[name] = resolved
+        return artist
+
+    def __missing__(self, name):
+        # Only called for names that aren't exact keys
+        artist = self.lookup(name)
+        if artist is None:
+            raise KeyError(name)
+        return dict.__getitem__(self, artist)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
@@ -0,0 +1,104 @@
+"""
+Seeded generator of synthetic pipeline input files (00 to 06) of any size.
+
+Usage: python benchmarks/bench_data.py FOLDER --tracks N [--seed S]
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+# At most this many 06 paths are created on disk, the others point to missing files
+MAX_REAL_FIX_FILES = 1000
+
+
+def generate_library(nb_tracks, nb_playlists=50, seed=0):
+    rng = random.Random(seed)
+    nb_artists = max(10, nb_tracks // 20)
+    artists = [f"Artist {i:06d}" for i in range(nb_artists)]
+    artist_list = [
+        (artist, str(playlist_id))
+        for artist in artists
+        for playlist_id in rng.sample(range(1, nb_playlists + 1), rng.randint(1, 2))
+    ]
+    favorites = [
+        (artist, f"Title {i}")
+        for i, artist in enumerate(rng.choices(artists, k=nb_tracks))
+    ]
+    playlist_dict = {str(i): f"Playlist {i}" for i in range(1, nb_playlists + 1)}
+    return rng, favorites, artist_list, playlist_dict
+
+
+def track_path(artist, title, album, extension="flac"):
+    return f"{artist}/Album {album}/{title}.{extension}"
+
+
+def generate_dataset(
+    folder,
+    nb_tracks,
+    nb_playlists=50,
+    seed=0,
+    missing_ratio=0.05,
+    unknown_artist_ratio=0.02,
+):
+    folder = Path(folder)
+    files_dir = folder / "files"
+    music_dir = folder / "music"
+    files_dir.mkdir(parents=True, exist_ok=True)
+
+    rng, favorites, artist_list, playlist_dict = generate_library(
+        nb_tracks, nb_playlists, seed
+    )
+    unknown_artists = {
+        artist for artist, _ in artist_list if rng.random() < unknown_artist_ratio
+    }
+    artist_list = [x for x in artist_list if x[0] not in unknown_artists]
+
+    tracks = []
+    missing = []
+    for artist, title in favorites:
+        if rng.random() < missing_ratio:
+            missing.append(f"{artist} - {title}")
+        else:
+            # Some favorites match several versions (live, compilations)
+            for album in range(rng.choice([1, 1, 1, 2])):
+                tracks.append(track_path(artist, title, album))
+
+    fixes = []
+    for i, track in enumerate(missing[::2]):
+        artist, title = track.split(" - ", 1)
+        path = music_dir / track_path(artist, title, "fix")
+        if i < MAX_REAL_FIX_FILES:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+        fixes.append(f"{track};{path}")
+
+    contents = {
+        "00_favorite-tracks.txt": [f"{a} - {t}" for a, t in favorites],
+        "01_playlists.csv": [f"{k};{v}" for k, v in playlist_dict.items()],
+        "02_artists.csv": [f"{p};{a}" for a, p in artist_list],
+        "04_result-mplaylist.csv": tracks,
+        "05_result-mplaylist-missing.csv": missing,
+        "06_fix-missing-tracks.csv": fixes,
+    }
+    for name, lines in contents.items():
+        with open(files_dir / name, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+    return {name: files_dir / name for name in contents}, f"{music_dir}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("folder")
+    parser.add_argument("--tracks", type=int, default=10_000)
+    parser.add_argument("--playlists", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    files, _ = generate_dataset(args.folder, args.tracks, args.playlists, args.seed)
+    for path in files.values():
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Time and measure the memory of every playlist_lib stage on synthetic data.
+
+Usage: python benchmarks/bench_stages.py [--sizes N ...] [--baseline FILE] [--save]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_data import generate_dataset  # noqa: E402
+from playlist_lib import (  # noqa: E402
+    build_artist_dict,
+    build_playlists,
+    export_playlists,
+    match_missing_tracks,
+    match_tracks,
+    read_files,
+)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_THRESHOLD = 1.5
+# Stages faster than this are too noisy to be compared
+MIN_TIME = 0.01
+
+
+def run_stages(files, local_basepath, output_folder, measure):
+    # measure(stage, function, *args) runs a stage and returns its result
+    (
+        _,
+        tracks,
+        missing_tracks,
+        playlist_dict,
+        artist_list,
+        missing_dict,
+    ) = measure(
+        "read_files",
+        read_files,
+        files["00_favorite-tracks.txt"],
+        files["01_playlists.csv"],
+        files["02_artists.csv"],
+        files["04_result-mplaylist.csv"],
+        files["05_result-mplaylist-missing.csv"],
+        files["06_fix-missing-tracks.csv"],
+    )
+    artist_dict = measure("build_artist_dict", build_artist_dict, artist_list)
+    file_list, _ = measure("match_tracks", match_tracks, tracks, artist_dict)
+    missing_file_list, _, _ = measure(
+        "match_missing_tracks",
+        match_missing_tracks,
+        missing_tracks,
+        missing_dict,
+        artist_dict,
+        local_basepath,
+    )
+    final_dict = measure(
+        "build_playlists",
+        build_playlists,
+        file_list + missing_file_list,
+        playlist_dict,
+    )
+    measure("export_playlists", export_playlists, output_folder, "/music/", final_dict)
+
+
+def benchmark(nb_tracks, repeat=1, seed=0):
+    results = {}
+
+    def timed(stage, function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        results.setdefault(stage, {})
+        results[stage]["time"] = min(results[stage].get("time", elapsed), elapsed)
+        return result
+
+    def traced(stage, function, *args):
+        tracemalloc.start()
+        result = function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[stage]["memory"] = peak
+        return result
+
+    with tempfile.TemporaryDirectory() as folder:
+        files, local_basepath = generate_dataset(folder, nb_tracks, seed=seed)
+        output_folder = Path(folder) / "playlists"
+        output_folder.mkdir()
+        with open(Path(folder) / "log.txt", "w") as log:
+            # Silence the warnings printed for the fix files that don't exist
+            stdout, sys.stdout = sys.stdout, log
+            try:
+                for _ in range(repeat):
+                    run_stages(files, local_basepath, output_folder, timed)
+                # Separate run, tracemalloc slows down the code it traces
+                run_stages(files, local_basepath, output_folder, traced)
+            finally:
+                sys.stdout = stdout
+    return results
+
+
+def compare(results, baseline, threshold, min_time=MIN_TIME):
+    regressions = []
+    for size, stages in results.items():
+        for stage, values in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if not reference:
+                continue
+            if (
+                max(values["time"], reference["time"]) >= min_time
+                and values["time"] > reference["time"] * threshold
+            ):
+                regressions.append(
+                    (size, stage, "time", reference["time"], values["time"])
+                )
+            if values["memory"] > reference["memory"] * threshold:
+                regressions.append(
+                    (size, stage, "memory", reference["memory"], values["memory"])
+                )
+    return regressions
+
+
+def format_value(metric, value):
+    if metric == "time":
+        return f"{value * 1000:.1f} ms"
+    return f"{value / 1024 / 1024:.1f} MiB"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="keep the best time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE)
+    parser.add_argument(
+        "--save", action="store_true", help="save the results as the new baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="fail when a stage is slower or bigger than baseline * threshold",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = benchmark(size, args.repeat, args.seed)
+        for stage, values in results[str(size)].items():
+            print(
+                f"{size:>9} {stage:22} {format_value('time', values['time']):>12} {format_value('memory', values['memory']):>12}"
+            )
+
+    baseline_file = Path(args.baseline)
+    if args.save:
+        baseline = {}
+        if baseline_file.exists():
+            with open(baseline_file, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(baseline_file, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {baseline_file}.")
+        return 0
+
+    if not baseline_file.exists():
+        print(f"No baseline in {baseline_file}, run with --save to create it.")
+        return 0
+
+    with open(baseline_file, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for size, stage, metric, before, after in regressions:
+        print(
+            f"REGRESSION: {stage} at {size} tracks, {metric} {format_value(metric, before)} -> {format_value(metric, after)}"
+        )
+    if regressions:
+        return 1
+    print(f"No regression past {args.threshold}x the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Compare the list-of-dicts matching path with the TrackTable one.
+
+Usage: python benchmarks/bench_track_table.py [--tracks N] [--playlists N]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_data import generate_library, track_path  # noqa: E402
+from playlist_lib import (  # noqa: E402
+    TrackTable,
+    build_artist_dict,
+    build_playlists,
+    match_tracks,
+    match_tracks_table,
+)
+
+
+def generate(nb_tracks, nb_playlists, seed=0):
+    _, favorites, artist_list, playlist_dict = generate_library(
+        nb_tracks, nb_playlists, seed
+    )
+    tracks = [
+        track_path(artist, title, i % 50) for i, (artist, title) in enumerate(favorites)
+    ]
+    return tracks, artist_list, playlist_dict
+
+
+def list_of_dicts(tracks, artist_dict, playlist_dict):
+    file_list, _ = match_tracks(tracks, artist_dict)
+    return file_list, build_playlists(file_list, playlist_dict)
+
+
+def track_table(tracks, artist_dict, playlist_dict):
+    table = TrackTable()
+    match_tracks_table(tracks, artist_dict, table)
+    return table, build_playlists(table, playlist_dict)
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=200_000)
+    parser.add_argument("--playlists", type=int, default=50)
+    args = parser.parse_args()
+
+    tracks, artist_list, playlist_dict = generate(args.tracks, args.playlists)
+    artist_dict = build_artist_dict(artist_list)
+
+    results = {}
+    for name, function in [
+        ("list of dicts", list_of_dicts),
+        ("track table", track_table),
+    ]:
+        (_, final_dict), elapsed, peak = measure(
+            function, tracks, artist_dict, playlist_dict
+        )
+        results[name] = {k: list(v) for k, v in final_dict.items()}
+        print(f"{name:15} {elapsed * 1000:8.1f} ms {peak / 1024 / 1024:8.1f} MiB peak")
+
+    assert results["list of dicts"] == results["track table"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from library_lib import normalize
+
+DEFAULT_TTL = 30 * 24 * 3600
+
+
+def get_db_update(client):
+    return dict(client.command("stats")).get("db_update")
+
+
+def cache_key(artist, title):
+    return f"{normalize(artist)}\t{normalize(title)}"
+
+
+class QueryCache:
+    # Search results keyed by normalized (artist, title), dropped as a whole when the
+    # mpd database is updated. New results are appended to a journal as soon as they
+    # are known, so an interrupted run can be resumed without querying them again.
+    def __init__(self, cache_file, db_update, ttl=DEFAULT_TTL, clock=time.time):
+        self.cache_file = Path(cache_file)
+        self.journal_file = Path(f"{cache_file}.journal")
+        self.db_update = db_update
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+        self._journal = open(self.journal_file, "a", encoding="utf-8")
+        if self.journal_file.stat().st_size == 0:
+            self._append({"db_update": db_update})
+
+    def _load(self):
+        if self.cache_file.exists():
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("db_update") == self.db_update:
+                self.entries = data["entries"]
+
+        if self.journal_file.exists():
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            header = json.loads(lines[0]) if lines else {}
+            if header.get("db_update") != self.db_update:
+                self.journal_file.unlink()
+                return
+            for line in lines[1:]:
+                try:
+                    key, timestamp, files = json.loads(line)
+                except ValueError:
+                    # Last line of a killed run may be truncated
+                    continue
+                self.entries[key] = [timestamp, files]
+            print(f"Resuming from {self.journal_file} ({len(lines) - 1} queries).")
+
+    def _append(self, record):
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+
+    def get(self, artist, title):
+        entry = self.entries.get(cache_key(artist, title))
+        if entry is None or self.clock() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def set(self, artist, title, files):
+        key = cache_key(artist, title)
+        timestamp = self.clock()
+        self.entries[key] = [timestamp, files]
+        self._append([key, timestamp, files])
+
+    def save(self):
+        now = self.clock()
+        entries = {k: v for k, v in self.entries.items() if now - v[0] <= self.ttl}
+        tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {"db_update": self.db_update, "entries": entries},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_file, self.cache_file)
+        self.close()
+        self.journal_file.unlink(missing_ok=True)
+
+    def close(self):
+        if not self._journal.closed:
+            self._journal.close()
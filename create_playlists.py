@@ -1,13 +1,45 @@
+import argparse
+import cProfile
+import time
+from contextlib import ExitStack
+from itertools import chain
 from pathlib import Path
 from playlist_lib import (
     read_files,
+    read_lines,
+    read_alias_list,
+    read_optional,
     build_artist_dict,
-    match_tracks,
     match_missing_tracks,
+    match_tracks_table,
+    match_missing_tracks_table,
+    TrackTable,
     build_playlists,
+    iter_matches,
     export_playlists,
     export_raw_playlists,
 )
+from path_lib import PathValidator
+from sync_lib import sync_targets
+from mpd_lib import MPDClient
+from mpd_playlist_lib import load_uploaded, save_uploaded, upload_playlists
+from subsonic_lib import SongIdMap, SubsonicClient, sync_playlists
+from smart_lib import build_smart_playlists, read_smart_playlists
+from snapshot_lib import Snapshot
+from spread_lib import spread_tracks
+from store_lib import TABLES, StateStore
+from tag_lib import load_tag_artists
+import report_lib
+from report_lib import count, counted, span
+from watch_lib import DEFAULT_INTERVAL, FileWatcher, PlaylistState
+from stream_lib import (
+    DEFAULT_MEMORY_BUDGET,
+    iter_fields,
+    iter_lines,
+    reverse_lines,
+    group_playlists,
+    export_playlist_streams,
+)
 
 LOCAL_BASEPATH = "/home/david/nfs/WDC14/Musique/"
 BASEPATH = "/music/"
@@ -16,6 +48,7 @@ FOLDER_PATH = "files"
 FAVORITE_TRACKS_FILE_NAME = f"{FOLDER_PATH}/00_dbeley-favorite-tracks.txt"
 PLAYLISTS_FILE_NAME = f"{FOLDER_PATH}/01_playlists.csv"
 ARTISTS_FILE_NAME = f"{FOLDER_PATH}/02_artists.csv"
+ARTIST_ALIASES_FILE_NAME = f"{FOLDER_PATH}/09_artist-aliases.csv"
 ARTISTS_NOT_FOUND_FILE_NAME = f"{FOLDER_PATH}/03_artists_NOT-FOUND.csv"
 RESULT_MPLAYLIST_FILE_NAME = f"{FOLDER_PATH}/04_result-mplaylist.csv"
 RESULT_MPLAYLIST_MISSING_FILE_NAME = f"{FOLDER_PATH}/05_result-mplaylist-missing.csv"
@@ -23,76 +56,513 @@ FIX_MISSING_TRACKS_FILE_NAME = f"{FOLDER_PATH}/06_fix-missing-tracks.csv"
 FIX_MISSING_TRACKS_NOT_FOUND_FILE_NAME = (
     f"{FOLDER_PATH}/07_fix-missing-tracks_NOT-FOUND.csv"
 )
+FAVORITE_TIMESTAMPS_FILE_NAME = f"{FOLDER_PATH}/11_favorite-tracks-timestamps.csv"
+EXPORT_MANIFEST_FILE_NAME = f"{FOLDER_PATH}/.export-manifest.json"
+PATH_CACHE_FILE_NAME = f"{FOLDER_PATH}/.path-cache.json"
+SUBSONIC_ID_CACHE_FILE_NAME = f"{FOLDER_PATH}/.subsonic-ids.json"
+MPD_UPLOADED_FILE_NAME = f"{FOLDER_PATH}/.mpd-uploaded.json"
+NAVIDROME_UPLOADED_FILE_NAME = f"{FOLDER_PATH}/.navidrome-uploaded.json"
+SYNC_RECORD_FILE_NAME = f"{FOLDER_PATH}/.sync-record.json"
+LASTFM_STATE_FILE_NAME = f"{FOLDER_PATH}/.lastfm-state.json"
+TAG_CACHE_FILE_NAME = f"{FOLDER_PATH}/.tag-cache.json"
+STORE_FILE_NAME = f"{FOLDER_PATH}/.state.sqlite3"
+SMART_PLAYLISTS_FILE_NAME = f"{FOLDER_PATH}/10_smart-playlists.csv"
 
-Path(ARTISTS_NOT_FOUND_FILE_NAME).unlink(missing_ok=True)
-Path(FIX_MISSING_TRACKS_NOT_FOUND_FILE_NAME).unlink(missing_ok=True)
-
-
-(
-    raw_tracks,
-    tracks,
-    missing_tracks,
-    playlist_dict,
-    artist_list,
-    missing_dict,
-) = read_files(
-    FAVORITE_TRACKS_FILE_NAME,
-    PLAYLISTS_FILE_NAME,
-    ARTISTS_FILE_NAME,
-    RESULT_MPLAYLIST_FILE_NAME,
-    RESULT_MPLAYLIST_MISSING_FILE_NAME,
-    FIX_MISSING_TRACKS_FILE_NAME,
-)
+# Exported folder, folder where --sync copies it
+SYNC_TARGETS = [
+    ("mpd_playlists", "~/.config/mpd/playlists/"),
+    ("playlists", "~/nfs/WDC14/Musique/00_Playlists/"),
+]
 
-artist_dict = build_artist_dict(artist_list)
-file_list, missing_artists = match_tracks(tracks, artist_dict)
-raw_track_list, raw_missing_artists = match_tracks(raw_tracks, artist_dict, sep=" - ")
-missing_file_list, list_missing_paths, missing_artists2 = match_missing_tracks(
-    missing_tracks, missing_dict, artist_dict, LOCAL_BASEPATH
-)
-file_list = missing_file_list + file_list
-missing_artists = missing_artists + missing_artists2
 
-if len(missing_artists) > 0:
-    missing_artists = set(missing_artists)
-    for missing_artist in missing_artists:
-        print(f"{missing_artist} is missing.")
-    print(f"{len(missing_artists)} artists missing!")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Create the playlists.")
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Process the input files as streams, with bounded memory",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=DEFAULT_MEMORY_BUDGET // (1024 * 1024),
+        help="Memory (in MB) used to group playlists in --stream mode before spilling to disk",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, and update the playlists when an input file changes",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=DEFAULT_INTERVAL,
+        help="Seconds between two checks of the input files in --watch mode",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Copy the changed playlists to the SYNC_TARGETS folders after the export",
+    )
+    parser.add_argument(
+        "--upload",
+        action="store_true",
+        help="Apply the changes of mpd_playlists to the stored playlists of mpd ($MPD_HOST, $MPD_PORT)",
+    )
+    parser.add_argument(
+        "--navidrome",
+        action="store_true",
+        help="Apply the changes of playlists to the playlists of navidrome through the Subsonic API ($SUBSONIC_URL, $SUBSONIC_USER, $SUBSONIC_PASSWORD). Requires Report Real Path for the playlist-versioning player in navidrome, nothing is uploaded when most tracks aren't found",
+    )
+    parser.add_argument(
+        "--tags",
+        action="store_true",
+        help=f"Match the tracks whose folder isn't an artist by their artist tags, from the index of mplaylist.py --local ({TAG_CACHE_FILE_NAME})",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="FILE",
+        help="Library snapshot (mplaylist.py --save-snapshot), read by --smart and by --tags instead of its index",
+    )
+    parser.add_argument(
+        "--smart",
+        action="store_true",
+        help=f"Add the rule playlists of {SMART_PLAYLISTS_FILE_NAME}, selected from the library of --snapshot (requires numpy)",
+    )
+    parser.add_argument(
+        "--spread",
+        type=int,
+        metavar="GAP",
+        help="Reorder the playlists to keep at least GAP tracks between two tracks of the same artist, newest tracks still at the end",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the --spread order, the same seed gives the same playlists",
+    )
+    parser.add_argument(
+        "--store",
+        action="store_true",
+        help=f"Keep the input files in a SQLite store ({STORE_FILE_NAME}), only the changed ones are parsed again",
+    )
+    parser.add_argument(
+        "--report",
+        metavar="FILE",
+        help="Save the duration of each stage, counters and peak memory to a JSON report",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Save a cProfile dump of the run, to be read with pstats",
+    )
+    args = parser.parse_args(argv)
+    if args.watch and args.stream:
+        parser.error("--watch and --stream can't be used together")
+    if args.watch and (args.upload or args.navidrome or args.report or args.profile):
+        parser.error(
+            "--watch can't be used with --upload, --navidrome, --report or --profile"
+        )
+    if args.tags and (args.watch or args.stream):
+        parser.error("--tags can't be used with --watch or --stream")
+    if args.store and (args.watch or args.stream):
+        parser.error("--store can't be used with --watch or --stream")
+    if args.smart and (args.watch or args.stream or not args.snapshot):
+        parser.error(
+            "--smart needs --snapshot, and can't be used with --watch or --stream"
+        )
+    if args.spread is not None and (args.watch or args.stream or args.spread < 1):
+        parser.error(
+            "--spread needs a positive GAP, and can't be used with --watch or --stream"
+        )
+    if args.snapshot and not (args.tags or args.smart):
+        parser.error("--snapshot is only used with --tags or --smart")
+    return args
 
-    with open(ARTISTS_NOT_FOUND_FILE_NAME, "w") as f:
-        f.write("\n".join(missing_artists))
 
-if len(list_missing_paths) > 0:
-    missing_paths = set(list_missing_paths)
-    for missing_path in sorted(missing_paths):
-        print(f"{missing_path} is missing.")
-    print(f"{len(missing_paths)} paths missing!")
+def report_missing(missing_artists, list_missing_paths):
+    if len(missing_artists) > 0:
+        missing_artists = set(missing_artists)
+        for missing_artist in missing_artists:
+            print(f"{missing_artist} is missing.")
+        print(f"{len(missing_artists)} artists missing!")
 
-    with open(FIX_MISSING_TRACKS_NOT_FOUND_FILE_NAME, "w") as f:
-        f.write("\n".join(missing_paths))
+        with open(ARTISTS_NOT_FOUND_FILE_NAME, "w") as f:
+            f.write("\n".join(missing_artists))
 
-nb_missing_artists = len(set(missing_artists))
-nb_missing_paths = len(list_missing_paths)
+    if len(list_missing_paths) > 0:
+        missing_paths = set(list_missing_paths)
+        for missing_path in sorted(missing_paths):
+            print(f"{missing_path} is missing.")
+        print(f"{len(missing_paths)} paths missing!")
 
-final_dict = build_playlists(file_list, playlist_dict)
-raw_final_dict = build_playlists(raw_track_list + missing_file_list, playlist_dict)
+        with open(FIX_MISSING_TRACKS_NOT_FOUND_FILE_NAME, "w") as f:
+            f.write("\n".join(missing_paths))
 
-export_playlists("playlists", BASEPATH, final_dict)
-export_playlists("mpd_playlists", "", final_dict)
-export_raw_playlists(raw_final_dict)
 
-print(
-    f"{nb_missing_artists} artists not found in {ARTISTS_FILE_NAME}.\n{nb_missing_paths} missing tracks not found in {FIX_MISSING_TRACKS_FILE_NAME}."
-)
-if nb_missing_artists > 0:
+def report_resolved(artist_dict):
+    # Track artists found in the artists file through a fold or an alias
+    for name, (artist, rule) in sorted(artist_dict.matched.items()):
+        print(f"{name} matched as {artist} ({rule}).")
+    for rule, nb in sorted(artist_dict.hits.items()):
+        count(f"artist_hits_{rule}", nb)
+    if artist_dict.matched:
+        print(f"{len(artist_dict.matched)} artists matched through a fold or an alias.")
+
+
+def print_summary(nb_missing_artists, nb_missing_paths):
     print(
-        f"Update {ARTISTS_FILE_NAME} with the artists in {ARTISTS_NOT_FOUND_FILE_NAME}."
+        f"{nb_missing_artists} artists not found in {ARTISTS_FILE_NAME}.\n{nb_missing_paths} missing tracks not found in {FIX_MISSING_TRACKS_FILE_NAME}."
     )
-if nb_missing_paths > 0:
+    if nb_missing_artists > 0:
+        print(
+            f"Update {ARTISTS_FILE_NAME} with the artists in {ARTISTS_NOT_FOUND_FILE_NAME}."
+        )
+    if nb_missing_paths > 0:
+        print(
+            f"Update {FIX_MISSING_TRACKS_FILE_NAME} with the paths in {FIX_MISSING_TRACKS_NOT_FOUND_FILE_NAME}."
+        )
+    if nb_missing_artists == 0 and nb_missing_paths == 0:
+        print(
+            "You're all set, all your playlists were successfully created in the playlists folder!"
+        )
+
+
+def create_playlists(
+    tag_artists=None, store=None, smart_dict=None, spread_gap=None, seed=0
+):
+    # With a StateStore, only the csv files changed since the last run are parsed
+    with span("parse"):
+        if store is None:
+            (
+                raw_tracks,
+                tracks,
+                missing_tracks,
+                playlist_dict,
+                artist_list,
+                missing_dict,
+            ) = read_files(
+                FAVORITE_TRACKS_FILE_NAME,
+                PLAYLISTS_FILE_NAME,
+                ARTISTS_FILE_NAME,
+                RESULT_MPLAYLIST_FILE_NAME,
+                RESULT_MPLAYLIST_MISSING_FILE_NAME,
+                FIX_MISSING_TRACKS_FILE_NAME,
+            )
+            aliases = read_optional(read_alias_list, ARTIST_ALIASES_FILE_NAME, [])
+        else:
+            files = input_files()
+            imported = store.sync({x: files[x] for x in TABLES})
+            if imported:
+                print(f"{', '.join(imported)} imported in the store.")
+            playlist_dict = store.playlist_dict()
+            artist_list = store.artist_list()
+            missing_dict = store.missing_dict()
+            aliases = store.alias_list()
+            raw_tracks = read_lines(FAVORITE_TRACKS_FILE_NAME)
+            tracks = read_optional(read_lines, RESULT_MPLAYLIST_FILE_NAME, [])
+            missing_tracks = read_optional(
+                read_lines, RESULT_MPLAYLIST_MISSING_FILE_NAME, []
+            )
+        nb_raw_tracks, nb_tracks = len(raw_tracks), len(tracks)
+    count("favorite_lines", nb_raw_tracks)
+    count("result_lines", nb_tracks)
+    count("missing_lines", len(missing_tracks))
+    count("playlist_lines", len(playlist_dict))
+    count("artist_lines", len(artist_list))
+    count("fix_lines", len(missing_dict))
+
+    with span("artist_dict"):
+        artist_dict = build_artist_dict(artist_list, aliases)
+    with span("resolve_missing"):
+        missing_table, list_missing_paths, missing_artists2 = (
+            match_missing_tracks_table(
+                missing_tracks,
+                missing_dict,
+                artist_dict,
+                LOCAL_BASEPATH,
+                PathValidator(PATH_CACHE_FILE_NAME),
+            )
+        )
+    with span("match"):
+        table = TrackTable()
+        table.extend(missing_table)
+        raw_table = TrackTable()
+        missing_artists = match_tracks_table(
+            tracks, artist_dict, table, tag_artists=tag_artists
+        )
+        match_tracks_table(raw_tracks, artist_dict, raw_table, sep=" - ")
+        raw_table.extend(missing_table)
+        missing_artists = missing_artists + missing_artists2
+    count("matches", len(table))
+    count("raw_matches", len(raw_table))
+
+    report_resolved(artist_dict)
+    report_missing(missing_artists, list_missing_paths)
+
+    with span("group"):
+        final_dict = build_playlists(table, playlist_dict)
+        raw_final_dict = build_playlists(raw_table, playlist_dict)
+    # Rule playlists are exported with the others, the exports remove the files they
+    # don't produce
+    for name, tracks in (smart_dict or {}).items():
+        if name in final_dict:
+            print(f"WARNING: rule playlist {name} replaces the playlist {name}.")
+        final_dict[name] = tracks
+    if spread_gap:
+        with span("spread"):
+            final_dict = {
+                k: spread_tracks(v, spread_gap, seed) for k, v in final_dict.items()
+            }
+
+    with span("export:playlists"):
+        export_playlists("playlists", BASEPATH, final_dict, EXPORT_MANIFEST_FILE_NAME)
+    with span("export:mpd_playlists"):
+        export_playlists("mpd_playlists", "", final_dict, EXPORT_MANIFEST_FILE_NAME)
+    with span("export:raw_playlists"):
+        export_raw_playlists(raw_final_dict, manifest_file=EXPORT_MANIFEST_FILE_NAME)
+
+    return len(set(missing_artists)), len(list_missing_paths)
+
+
+def create_playlists_streaming(memory_budget):
+    # Same output as create_playlists, without loading the favorites and the mpd
+    # results in memory: result files are read backwards to keep the newest tracks
+    # at the end, and playlists are grouped within memory_budget bytes
+    # Parsing, matching and grouping are interleaved with the exports, their spans
+    # include them
+    with span("parse"):
+        playlist_dict = dict(
+            counted("playlist_lines", iter_fields(PLAYLISTS_FILE_NAME))
+        )
+        artist_list = [
+            (x[1], x[0])
+            for x in counted("artist_lines", iter_fields(ARTISTS_FILE_NAME))
+        ]
+        missing_dict = {}
+        if Path(FIX_MISSING_TRACKS_FILE_NAME).exists():
+            missing_dict = {
+                x[0]: x[1]
+                for x in counted("fix_lines", iter_fields(FIX_MISSING_TRACKS_FILE_NAME))
+            }
+    with span("artist_dict"):
+        artist_dict = build_artist_dict(
+            artist_list, read_optional(read_alias_list, ARTIST_ALIASES_FILE_NAME, [])
+        )
+
+    missing_tracks = []
+    if Path(RESULT_MPLAYLIST_MISSING_FILE_NAME).exists():
+        missing_tracks = counted(
+            "missing_lines", iter_lines(RESULT_MPLAYLIST_MISSING_FILE_NAME)
+        )
+    with span("resolve_missing"):
+        missing_file_list, list_missing_paths, missing_artists2 = match_missing_tracks(
+            missing_tracks,
+            missing_dict,
+            artist_dict,
+            LOCAL_BASEPATH,
+            PathValidator(PATH_CACHE_FILE_NAME),
+        )
+        missing_pairs = [next(iter(x.items())) for x in missing_file_list]
+
+    tracks = []
+    if Path(RESULT_MPLAYLIST_FILE_NAME).exists():
+        tracks = counted("result_lines", reverse_lines(RESULT_MPLAYLIST_FILE_NAME))
+    missing_artists = set(missing_artists2)
+    pairs = counted(
+        "matches",
+        chain(missing_pairs, iter_matches(tracks, artist_dict, missing_artists)),
+    )
+    with span("export:playlists+mpd_playlists"):
+        export_playlist_streams(
+            group_playlists(pairs, playlist_dict, memory_budget),
+            [("playlists", BASEPATH, ".m3u"), ("mpd_playlists", "", ".m3u")],
+            EXPORT_MANIFEST_FILE_NAME,
+        )
+
+    raw_tracks = counted("favorite_lines", reverse_lines(FAVORITE_TRACKS_FILE_NAME))
+    raw_pairs = counted(
+        "raw_matches",
+        chain(iter_matches(raw_tracks, artist_dict, set(), sep=" - "), missing_pairs),
+    )
+    with span("export:raw_playlists"):
+        export_playlist_streams(
+            group_playlists(raw_pairs, playlist_dict, memory_budget),
+            [("raw_playlists", "", ".txt")],
+            EXPORT_MANIFEST_FILE_NAME,
+        )
+
+    report_resolved(artist_dict)
+    report_missing(missing_artists, list_missing_paths)
+    return len(missing_artists), len(list_missing_paths)
+
+
+def upload_mpd_playlists():
+    uploaded = load_uploaded(MPD_UPLOADED_FILE_NAME)
+    with MPDClient() as client:
+        names, deleted, failed, commands = upload_playlists(
+            client, "mpd_playlists", uploaded
+        )
+    save_uploaded(MPD_UPLOADED_FILE_NAME, (set(uploaded) - set(deleted)) | set(names))
     print(
-        f"Update {FIX_MISSING_TRACKS_FILE_NAME} with the paths in {FIX_MISSING_TRACKS_NOT_FOUND_FILE_NAME}."
+        f"{len(names)} playlists uploaded to mpd, {len(deleted)} deleted, {len(failed)} failed, {len(commands)} commands sent."
+    )
+
+
+def upload_navidrome_playlists():
+    uploaded = load_uploaded(NAVIDROME_UPLOADED_FILE_NAME)
+    client = SubsonicClient()
+    id_map = SongIdMap(SUBSONIC_ID_CACHE_FILE_NAME, client)
+    names, deleted, failed, nb_requests = sync_playlists(
+        client, id_map, "playlists", BASEPATH, uploaded
+    )
+    save_uploaded(
+        NAVIDROME_UPLOADED_FILE_NAME, (set(uploaded) - set(deleted)) | set(names)
     )
-if nb_missing_artists == 0 and nb_missing_paths == 0:
     print(
-        "You're all set, all your playlists were successfully created in the playlists folder!"
+        f"{len(names)} playlists uploaded to navidrome, {len(deleted)} deleted, {len(failed)} failed, {nb_requests} requests sent."
     )
+
+
+def input_files():
+    return {
+        "favorites": FAVORITE_TRACKS_FILE_NAME,
+        "playlists": PLAYLISTS_FILE_NAME,
+        "artists": ARTISTS_FILE_NAME,
+        "aliases": ARTIST_ALIASES_FILE_NAME,
+        "result": RESULT_MPLAYLIST_FILE_NAME,
+        "missing": RESULT_MPLAYLIST_MISSING_FILE_NAME,
+        "fix": FIX_MISSING_TRACKS_FILE_NAME,
+    }
+
+
+def export_state(state):
+    Path(ARTISTS_NOT_FOUND_FILE_NAME).unlink(missing_ok=True)
+    Path(FIX_MISSING_TRACKS_NOT_FOUND_FILE_NAME).unlink(missing_ok=True)
+    missing_artists = state.missing_artists()
+    report_missing(missing_artists, state.list_missing_paths)
+
+    final_dict, raw_final_dict = state.final_dicts()
+    export_playlists("playlists", BASEPATH, final_dict, EXPORT_MANIFEST_FILE_NAME)
+    export_playlists("mpd_playlists", "", final_dict, EXPORT_MANIFEST_FILE_NAME)
+    export_raw_playlists(raw_final_dict, manifest_file=EXPORT_MANIFEST_FILE_NAME)
+    print_summary(len(set(missing_artists)), len(state.list_missing_paths))
+
+
+def watch_playlists(interval, watcher=None, sync=False):
+    # The inputs are parsed once, then only the changed files are parsed again and
+    # only the playlists of the artists they touch are rebuilt
+    files = input_files()
+    watcher = watcher or FileWatcher(files, interval)
+    state = PlaylistState(files, LOCAL_BASEPATH, PathValidator(PATH_CACHE_FILE_NAME))
+    export_state(state)
+    if sync:
+        sync_targets(SYNC_TARGETS, SYNC_RECORD_FILE_NAME)
+    print(f"Watching the files in {FOLDER_PATH}, press Ctrl-C to stop.")
+
+    failed = False
+    retry = False
+    try:
+        while True:
+            if retry:
+                # A file being replaced or an unreachable mount: tried again after
+                # an interval, without waiting for another change
+                time.sleep(interval)
+                changed = list(files)
+            else:
+                changed = watcher.wait()
+            retry = False
+            start = time.perf_counter()
+            try:
+                # After a failed update the state is partially parsed, start over
+                affected = state.update(list(files) if failed else changed)
+                failed = False
+                export_state(state)
+            except (IndexError, ValueError) as e:
+                failed = True
+                print(f"WARNING: can't parse {', '.join(changed)}: {e!r}. Waiting.")
+                continue
+            except OSError as e:
+                failed = retry = True
+                print(f"WARNING: {e}. Retrying in {interval}s.")
+                continue
+            if sync:
+                sync_targets(SYNC_TARGETS, SYNC_RECORD_FILE_NAME)
+            print(
+                f"Updated {len(affected)} playlists after a change of {', '.join(changed)} in {(time.perf_counter() - start) * 1000:.0f} ms."
+            )
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.watch:
+        watch_playlists(args.interval, sync=args.sync)
+        return
+
+    Path(ARTISTS_NOT_FOUND_FILE_NAME).unlink(missing_ok=True)
+    Path(FIX_MISSING_TRACKS_NOT_FOUND_FILE_NAME).unlink(missing_ok=True)
+
+    report = report_lib.enable() if args.report else None
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        if args.stream:
+            nb_missing_artists, nb_missing_paths = create_playlists_streaming(
+                args.memory_budget * 1024 * 1024
+            )
+        else:
+            with ExitStack() as stack:
+                tag_artists = None
+                smart_dict = None
+                if args.snapshot:
+                    snapshot = stack.enter_context(Snapshot(args.snapshot))
+                if args.smart:
+                    with span("smart"):
+                        smart_dict = build_smart_playlists(
+                            snapshot,
+                            read_smart_playlists(SMART_PLAYLISTS_FILE_NAME),
+                            read_optional(read_lines, RESULT_MPLAYLIST_FILE_NAME, []),
+                        )
+                    print(f"{len(smart_dict)} rule playlists selected.")
+                if args.tags and args.snapshot:
+                    tag_artists = snapshot.tag_artists()
+                    print(f"Artist tags of the {len(snapshot)} tracks of the snapshot.")
+                elif args.tags:
+                    with span("tags"):
+                        tag_artists = load_tag_artists(TAG_CACHE_FILE_NAME)
+                    print(f"Artist tags of {len(tag_artists)} tracks loaded.")
+                store = None
+                if args.store:
+                    store = stack.enter_context(StateStore(STORE_FILE_NAME))
+                nb_missing_artists, nb_missing_paths = create_playlists(
+                    tag_artists, store, smart_dict, args.spread, args.seed
+                )
+        count("missing_artists", nb_missing_artists)
+        count("missing_paths", nb_missing_paths)
+        if args.sync:
+            with span("sync"):
+                sync_targets(SYNC_TARGETS, SYNC_RECORD_FILE_NAME)
+        if args.upload:
+            with span("upload"):
+                upload_mpd_playlists()
+        if args.navidrome:
+            with span("navidrome"):
+                upload_navidrome_playlists()
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile saved to {args.profile}.")
+        if report:
+            report_lib.disable()
+            report.save(args.report)
+            print(f"Report saved to {args.report}.")
+
+    print_summary(nb_missing_artists, nb_missing_paths)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+from mpd_lib import first_tag
+
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_LIMIT = 3
+
+# Stylized letters found in artist names that NFKC doesn't fold (CHVRCHΞS)
+CONFUSABLES = str.maketrans({"ξ": "e", "ø": "o", "æ": "ae", "œ": "oe", "ß": "ss"})
+APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "´": "'", "`": "'", "‐": "-"})
+NON_WORD = re.compile(r"[\W_]+")
+
+
+def fold(value):
+    value = unicodedata.normalize("NFKC", value).translate(APOSTROPHES).casefold()
+    value = value.translate(CONFUSABLES).replace("'", "")
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(x for x in value if not unicodedata.combining(x))
+    return NON_WORD.sub(" ", value).strip()
+
+
+def trigrams(value):
+    padded = f"  {value} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def dice(a, b):
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def artist_similarity(query, candidate):
+    # Also rewards library artists that extend the favorite one ("X Tinissima 4et")
+    score = dice(query, candidate)
+    if len(query) >= 6:
+        score = max(score, 0.95 * len(query & candidate) / len(query))
+    return score
+
+
+class TrigramIndex:
+    def __init__(self, songs):
+        self.entries = []
+        self.postings = defaultdict(list)
+        for song in songs:
+            artist = first_tag(song, "Artist")
+            title = first_tag(song, "Title")
+            if artist is None or title is None:
+                continue
+            artist_grams = trigrams(fold(artist))
+            title_grams = trigrams(fold(title))
+            entry_id = len(self.entries)
+            self.entries.append((song["file"], artist_grams, title_grams))
+            for gram in title_grams:
+                self.postings[gram].append(entry_id)
+
+    def candidates(self, title_grams, min_shared):
+        # Only the posting lists of the query trigrams are visited
+        shared = defaultdict(int)
+        for gram in title_grams:
+            for entry_id in self.postings.get(gram, ()):
+                shared[entry_id] += 1
+        return [x for x, count in shared.items() if count >= min_shared]
+
+    def suggest(self, artist, title, limit=DEFAULT_LIMIT):
+        artist_grams = trigrams(fold(artist))
+        title_grams = trigrams(fold(title))
+        min_shared = max(1, len(title_grams) // 3)
+        scored = []
+        for entry_id in self.candidates(title_grams, min_shared):
+            path, entry_artist, entry_title = self.entries[entry_id]
+            score = 0.6 * dice(title_grams, entry_title) + 0.4 * artist_similarity(
+                artist_grams, entry_artist
+            )
+            scored.append((round(score, 3), path))
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return scored[:limit]
+
+
+def resolve_missing(
+    missing_tracks, index, threshold=DEFAULT_THRESHOLD, limit=DEFAULT_LIMIT
+):
+    suggestions = []
+    accepted = {}
+    for track in missing_tracks:
+        artist, _, title = track.partition(" - ")
+        ranked = index.suggest(artist, title, limit)
+        suggestions += [(track, score, path) for score, path in ranked]
+        if ranked and ranked[0][0] >= threshold:
+            accepted[track] = ranked[0][1]
+    return suggestions, accepted
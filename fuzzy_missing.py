@@ -0,0 +1,86 @@
+import argparse
+from pathlib import Path
+
+from fuzzy_lib import DEFAULT_LIMIT, DEFAULT_THRESHOLD, TrigramIndex, resolve_missing
+from library_lib import fetch_library, load_dump
+from mpd_lib import MPDClient
+
+LOCAL_BASEPATH = "/home/david/nfs/WDC14/Musique/"
+
+FOLDER_PATH = Path(__file__).resolve().parent / "files"
+RESULT_MPLAYLIST_MISSING_FILE_NAME = f"{FOLDER_PATH}/05_result-mplaylist-missing.csv"
+FIX_MISSING_TRACKS_FILE_NAME = f"{FOLDER_PATH}/06_fix-missing-tracks.csv"
+FUZZY_SUGGESTIONS_FILE_NAME = f"{FOLDER_PATH}/08_fuzzy-suggestions.csv"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Suggest library tracks for the tracks not matched by mpd."
+    )
+    parser.add_argument("--host", help="MPD host (default: $MPD_HOST or localhost)")
+    parser.add_argument("--port", help="MPD port (default: $MPD_PORT or 6600)")
+    parser.add_argument("--dump", help="Use a saved listallinfo dump instead of mpd")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Score from which the best suggestion is added to the fix file",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=DEFAULT_LIMIT,
+        help="Number of suggestions kept per missing track",
+    )
+    parser.add_argument("--local-basepath", default=LOCAL_BASEPATH)
+    parser.add_argument("--missing", default=RESULT_MPLAYLIST_MISSING_FILE_NAME)
+    parser.add_argument("--fix", default=FIX_MISSING_TRACKS_FILE_NAME)
+    parser.add_argument("--suggestions", default=FUZZY_SUGGESTIONS_FILE_NAME)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.dump:
+        songs = load_dump(args.dump)
+    else:
+        with MPDClient(args.host, args.port) as client:
+            songs = fetch_library(client)
+
+    with open(args.missing, "r", encoding="utf-8") as f:
+        missing_tracks = [x.strip() for x in f if x.strip()]
+
+    fixed_tracks = set()
+    if Path(args.fix).exists():
+        with open(args.fix, "r", encoding="utf-8") as f:
+            fixed_tracks = {x.split(";")[0] for x in f if x.strip()}
+
+    missing_tracks = [x for x in missing_tracks if x not in fixed_tracks]
+    suggestions, accepted = resolve_missing(
+        missing_tracks, TrigramIndex(songs), args.threshold, args.limit
+    )
+
+    with open(args.suggestions, "w", encoding="utf-8") as f:
+        f.writelines(f"{track};{score};{path}\n" for track, score, path in suggestions)
+
+    if accepted:
+        with open(args.fix, "a+", encoding="utf-8") as f:
+            f.seek(0)
+            content = f.read()
+            if content and not content.endswith("\n"):
+                f.write("\n")
+            f.writelines(
+                f"{track};{args.local_basepath}{path}\n"
+                for track, path in accepted.items()
+            )
+
+    for track, path in accepted.items():
+        print(f"{track} resolved to {path}.")
+    print(
+        f"{len(accepted)}/{len(missing_tracks)} missing tracks added to {args.fix}, suggestions in {args.suggestions}."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+from collections import deque
+
+from mpd_lib import first_tag
+
+
+def read_list(filename):
+    # Same lines as the shell version: comments and empty lines are skipped
+    with open(filename, "r", encoding="utf-8") as f:
+        lines = [x.strip() for x in f]
+    return [x for x in lines if x and not x.startswith("#")]
+
+
+def normalize_title(value):
+    # mpd title search is case-insensitive, and both apostrophes were searched
+    return value.replace("’", "'").casefold()
+
+
+class AhoCorasick:
+    # Multi-pattern substring matcher: one pass over a text finds every pattern it contains
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            node = 0
+            for char in pattern:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.outputs[node].append(pattern_id)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                self.outputs[child] = (
+                    self.outputs[child] + self.outputs[self.fail[child]]
+                )
+
+    def search(self, text):
+        goto = self.goto
+        fail = self.fail
+        outputs = self.outputs
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if outputs[node]:
+                found.update(outputs[node])
+        return found
+
+
+class PrefixTrie:
+    def __init__(self, prefixes):
+        self.root = {}
+        for prefix in prefixes:
+            node = self.root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[None] = True
+
+    def has_prefix_of(self, value):
+        node = self.root
+        if None in node:
+            return True
+        for char in value:
+            node = node.get(char)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
+
+
+def match_standards(songs, standards, allowlist):
+    # Returns the matched paths in the order of the shell version: standards in file
+    # order, then the paths of each standard sorted and deduplicated
+    automaton = AhoCorasick([normalize_title(x) for x in standards])
+    trie = PrefixTrie([x.lower() for x in allowlist])
+    matches = [set() for _ in standards]
+
+    for song in songs:
+        title = first_tag(song, "Title")
+        if title is None:
+            continue
+        for standard_id in automaton.search(normalize_title(title)):
+            matches[standard_id].add(song["file"])
+
+    tracks = []
+    rejected = []
+    for standard, paths in zip(standards, matches):
+        for path in sorted(paths):
+            artist_name = path.split("/")[0].lower()
+            if trie.has_prefix_of(artist_name):
+                tracks.append(path)
+            else:
+                rejected.append((artist_name, standard))
+    return tracks, rejected
+
+
+def write_m3u(filename, tracks, path=""):
+    with open(filename, "w", encoding="utf-8") as f:
+        f.writelines(f"{path}{x}\n" for x in tracks)
@@ -0,0 +1,67 @@
+import argparse
+import sys
+from pathlib import Path
+
+DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(DIR.parent))
+
+from jazz_lib import match_standards, read_list, write_m3u  # noqa: E402
+from library_lib import fetch_library, load_dump  # noqa: E402
+from mpd_lib import MPDClient  # noqa: E402
+from snapshot_lib import Snapshot  # noqa: E402
+
+BASEPATH = "/music/"
+
+JAZZ_STANDARDS_FILE = DIR / "jazz_standards.txt"
+JAZZ_ARTISTS_ALLOWLIST_FILE = DIR / "jazz_artists_allowlist.txt"
+OUTPUT_FILE = DIR / "jazz_standards.m3u"
+OUTPUT_FILE_MPD = DIR / "jazz_standards_mpd.m3u"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract the jazz standards of the mpd database."
+    )
+    parser.add_argument("--host", help="MPD host (default: $MPD_HOST or localhost)")
+    parser.add_argument("--port", help="MPD port (default: $MPD_PORT or 6600)")
+    parser.add_argument("--dump", help="Use a saved listallinfo dump instead of mpd")
+    parser.add_argument(
+        "--snapshot", help="Use a library snapshot (mplaylist.py --save-snapshot)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    for filename in [JAZZ_STANDARDS_FILE, JAZZ_ARTISTS_ALLOWLIST_FILE]:
+        if not filename.is_file():
+            sys.exit(f"Error: {filename.name} file not found.")
+
+    standards = read_list(JAZZ_STANDARDS_FILE)
+    allowlist = read_list(JAZZ_ARTISTS_ALLOWLIST_FILE)
+    if args.snapshot:
+        # Only the titles and files are decoded
+        with Snapshot(args.snapshot) as snapshot:
+            tracks, rejected = match_standards(
+                snapshot.songs(("file", "Title")), standards, allowlist
+            )
+    else:
+        if args.dump:
+            songs = load_dump(args.dump)
+        else:
+            with MPDClient(args.host, args.port) as client:
+                songs = fetch_library(client)
+        tracks, rejected = match_standards(songs, standards, allowlist)
+    for artist_name, standard in rejected:
+        print(
+            f"Artist {artist_name} not found in allowlist (current track name {standard})."
+        )
+
+    write_m3u(OUTPUT_FILE, tracks, BASEPATH)
+    write_m3u(OUTPUT_FILE_MPD, tracks)
+    print(f"{len(tracks)} tracks written to {OUTPUT_FILE} and {OUTPUT_FILE_MPD}.")
+
+
+if __name__ == "__main__":
+    main()
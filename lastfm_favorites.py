@@ -0,0 +1,48 @@
+import argparse
+import os
+
+from create_playlists import (
+    FAVORITE_TIMESTAMPS_FILE_NAME,
+    FAVORITE_TRACKS_FILE_NAME,
+    LASTFM_STATE_FILE_NAME,
+)
+from lastfm_lib import LastfmClient, ingest_loved_tracks
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Add the new loved tracks of a last.fm user to the favorites."
+    )
+    parser.add_argument(
+        "--user",
+        default=os.environ.get("LASTFM_USER"),
+        help="last.fm user (default: $LASTFM_USER)",
+    )
+    parser.add_argument("--api-key", help="last.fm API key (default: $LASTFM_API_KEY)")
+    parser.add_argument("--file", default=FAVORITE_TRACKS_FILE_NAME)
+    parser.add_argument("--timestamps", default=FAVORITE_TIMESTAMPS_FILE_NAME)
+    parser.add_argument("--state", default=LASTFM_STATE_FILE_NAME)
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Fetch all the loved tracks and rewrite the favorites (picks up unloved tracks)",
+    )
+    args = parser.parse_args(argv)
+    if not args.user:
+        parser.error("--user or $LASTFM_USER is required")
+    return args
+
+
+def main(argv=None, client=None):
+    args = parse_args(argv)
+    client = client or LastfmClient(args.api_key)
+    entries = ingest_loved_tracks(
+        client, args.user, args.file, args.timestamps, args.state, args.full
+    )
+    print(
+        f"{len(entries)} new loved tracks added to {args.file} ({client.nb_requests} requests)."
+    )
+
+
+if __name__ == "__main__":
+    main()
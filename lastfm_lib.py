@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+API_URL = "https://ws.audioscrobbler.com/2.0/"
+PAGE_SIZE = 200
+
+
+class LastfmError(Exception):
+    pass
+
+
+class LastfmClient:
+    def __init__(self, api_key=None, url=API_URL, timeout=30):
+        self.api_key = api_key or os.environ.get("LASTFM_API_KEY", "")
+        self.url = url
+        self.timeout = timeout
+        self.nb_requests = 0
+
+    def request(self, method, **params):
+        params.update(method=method, api_key=self.api_key, format="json")
+        self.nb_requests += 1
+        try:
+            with urlopen(
+                f"{self.url}?{urlencode(params)}", timeout=self.timeout
+            ) as response:
+                body = json.load(response)
+        except (URLError, ValueError) as e:
+            raise LastfmError(f"{method} failed: {e}") from e
+        if "error" in body:
+            raise LastfmError(f"{method} failed: {body.get('message', body['error'])}")
+        return body
+
+    def loved_tracks_page(self, user, page, limit=PAGE_SIZE):
+        # Newest first, returns the (timestamp, line) of the page and the number of pages
+        result = self.request("user.getlovedtracks", user=user, page=page, limit=limit)
+        result = result["lovedtracks"]
+        tracks = result.get("track", [])
+        if isinstance(tracks, dict):
+            tracks = [tracks]
+        entries = [(int(x["date"]["uts"]), track_line(x)) for x in tracks]
+        return entries, int(result["@attr"]["totalPages"])
+
+
+def track_line(track):
+    artist = " ".join(track["artist"]["name"].split())
+    title = " ".join(track["name"].split())
+    return f"{artist} - {title}"
+
+
+def entry_hash(timestamp, line):
+    return hashlib.sha1(f"{timestamp}\t{line}".encode("utf-8")).hexdigest()
+
+
+def is_known(timestamp, line, mark):
+    # The mark track itself, or anything older when it has been unloved since
+    return entry_hash(timestamp, line) == mark["hash"] or timestamp < mark["timestamp"]
+
+
+def fetch_loved_tracks(client, user, mark=None, limit=PAGE_SIZE):
+    # Pages are fetched newest first until the first known track, everything when
+    # there is no mark yet
+    entries = []
+    page = 1
+    while True:
+        tracks, nb_pages = client.loved_tracks_page(user, page, limit)
+        for timestamp, line in tracks:
+            if mark and is_known(timestamp, line, mark):
+                return entries
+            entries.append((timestamp, line))
+        if page >= nb_pages:
+            return entries
+        page += 1
+
+
+def read_mark(state_file, user):
+    if not Path(state_file).exists():
+        return None
+    with open(state_file, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    return state if state.get("user") == user else None
+
+
+def written_lines(filename, lines):
+    # Number of lines, from the end of lines, already at the head of the file: added
+    # by a run interrupted before its state was saved
+    if not lines or not Path(filename).exists():
+        return 0
+    with open(filename, "r", encoding="utf-8") as f:
+        head = [x.rstrip("\n") for _, x in zip(lines, f)]
+    if not head:
+        return 0
+    for i, line in enumerate(lines):
+        if line == head[0] and lines[i:] == head[: len(lines) - i]:
+            return len(lines) - i
+    return 0
+
+
+def write_lines(filename, lines, keep_existing):
+    # New lines go first, the file is replaced at once so readers never see half of it
+    tmp_file = f"{filename}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.writelines(f"{x}\n" for x in lines)
+        if keep_existing and Path(filename).exists():
+            with open(filename, "r", encoding="utf-8") as old:
+                for line in old:
+                    f.write(line if line.endswith("\n") else f"{line}\n")
+    os.replace(tmp_file, filename)
+
+
+def ingest_loved_tracks(
+    client, user, favorites_file, timestamps_file, state_file, full=False
+):
+    # The favorites file keeps its ARTIST - TRACK format, the timestamps of the same
+    # entries are kept in timestamps_file as timestamp;ARTIST - TRACK
+    mark = None if full else read_mark(state_file, user)
+    entries = fetch_loved_tracks(client, user, mark)
+    if entries or mark is None:
+        for filename, lines in [
+            (favorites_file, [x for _, x in entries]),
+            (timestamps_file, [f"{t};{x}" for t, x in entries]),
+        ]:
+            if mark is not None:
+                lines = lines[: len(lines) - written_lines(filename, lines)]
+            write_lines(filename, lines, mark is not None)
+    if entries:
+        timestamp, line = entries[0]
+        tmp_file = f"{state_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "user": user,
+                    "timestamp": timestamp,
+                    "hash": entry_hash(timestamp, line),
+                },
+                f,
+            )
+        os.replace(tmp_file, state_file)
+    return entries
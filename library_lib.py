@@ -0,0 +1,216 @@
+from collections import defaultdict
+
+from mpd_lib import split_songs, tag_values
+
+# Seconds before the previous database update from which modified songs are fetched
+# again: a file changed during an update scan has an mtime before its end
+MODIFIED_MARGIN = 300
+
+
+def normalize(value):
+    # MPD search compares tags case-insensitively
+    return value.strip().casefold()
+
+
+def fetch_library(client):
+    # A listallinfo of the root is refused beyond max_output_buffer_size (8 MB by
+    # default, about 100k songs): the root is listed by lsinfo, then each top-level
+    # directory by its own listallinfo
+    pairs = client.command("lsinfo")
+    songs = split_songs(pairs)
+    for directory in [v for k, v in pairs if k == "directory"]:
+        songs += split_songs(client.command("listallinfo", directory))
+    return songs
+
+
+def fetch_stats(client):
+    return dict(client.command("stats"))
+
+
+def fetch_modified(client, since):
+    # Songs whose file changed since a UNIX time
+    return split_songs(client.command("find", f"(modified-since '{since}')"))
+
+
+def fetch_files(client):
+    # Paths of the library, without their tags
+    return [value for key, value in client.command("listall") if key == "file"]
+
+
+def fetch_songs(client, files):
+    responses = client.command_list(("lsinfo", x) for x in files)
+    return [song for pairs in responses for song in split_songs(pairs)]
+
+
+def save_dump(songs, dump_file):
+    with open(dump_file, "w", encoding="utf-8") as f:
+        for song in songs:
+            f.writelines(f"{k}: {v}\n" for k in song for v in tag_values(song, k))
+
+
+def read_pairs(dump_file):
+    # Accepts both save_dump output and a raw "listallinfo" protocol transcript
+    with open(dump_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not line or line == "OK" or line.startswith("OK MPD "):
+                continue
+            key, _, value = line.partition(": ")
+            yield key, value
+
+
+def load_dump(dump_file):
+    return split_songs(read_pairs(dump_file))
+
+
+def song_keys(song):
+    # A key per artist of the song, the search of mpd matches any value of a tag
+    return list(
+        dict.fromkeys(
+            (normalize(artist), normalize(title))
+            for artist in tag_values(song, "Artist")
+            for title in tag_values(song, "Title")
+        )
+    )
+
+
+def song_key(song):
+    keys = song_keys(song)
+    return keys[0] if keys else None
+
+
+def build_index(songs, tags=False):
+    # With tags the index holds the songs themselves, as needed by a ranking
+    index = defaultdict(list)
+    for song in songs:
+        for key in song_keys(song):
+            index[key].append(song if tags else song["file"])
+    return dict(index)
+
+
+def resolve_favorites(favorites, index, ranking=None):
+    for artist, title in favorites:
+        found = index.get((normalize(artist), normalize(title)), [])
+        if ranking is not None:
+            found = ranking.rank((artist, title), found)
+        yield (artist, title), found
+
+
+def song_tags(song):
+    return tuple(sorted((k, tuple(tag_values(song, k))) for k in song if k != "file"))
+
+
+def find_moved(added, removed, old_files, new_files):
+    # Files moved: removed and added with the same tags
+    removed_by_tags = {
+        song_tags(x): x["file"] for x in removed if x["file"] not in new_files
+    }
+    return [
+        (removed_by_tags[song_tags(x)], x["file"])
+        for x in added
+        if x["file"] not in old_files and song_tags(x) in removed_by_tags
+    ]
+
+
+def diff_library(old_songs, new_songs):
+    # Songs added and removed between two snapshots (a retagged song is removed and
+    # added again), and files moved
+    old = {x["file"]: x for x in old_songs}
+    new = {x["file"]: x for x in new_songs}
+    added = [x for x in new_songs if old.get(x["file"]) != x]
+    removed = [x for x in old_songs if new.get(x["file"]) != x]
+    return added, removed, find_moved(added, removed, old, new)
+
+
+def song_file(value):
+    # Values of the index are files, or songs with a ranking
+    return value if isinstance(value, str) else value["file"]
+
+
+class IncrementalMatcher:
+    # Favorites resolved against an index of the library; after a database update
+    # only the favorites whose (artist, title) was touched are resolved again. The
+    # files of an index entry keep the order of the library (position of the file in
+    # the last full listing, then order of arrival)
+    def __init__(self, favorites, songs, ranking=None):
+        self.favorites = list(favorites)
+        self.songs = {x["file"]: x for x in songs}
+        self.order = {x["file"]: i for i, x in enumerate(songs)}
+        self.ranking = ranking
+        self.index = build_index(songs, tags=ranking is not None)
+        self.files = [
+            x for _, x in resolve_favorites(self.favorites, self.index, ranking)
+        ]
+        self.positions = defaultdict(list)
+        for i, (artist, title) in enumerate(self.favorites):
+            self.positions[(normalize(artist), normalize(title))].append(i)
+
+    def results(self):
+        return zip(self.favorites, self.files)
+
+    def results_at(self, favorites):
+        # {position: (favorite, files)} of favorites, for each of their lines
+        return {
+            i: (self.favorites[i], self.files[i])
+            for artist, title in favorites
+            for i in self.positions[(normalize(artist), normalize(title))]
+        }
+
+    def update(self, songs):
+        # From a full listing of the library: returns the diff of the library and
+        # the favorites whose files changed
+        added, removed, moved = diff_library(list(self.songs.values()), songs)
+        self.order = {x["file"]: i for i, x in enumerate(songs)}
+        changed = self.apply(added, removed)
+        self.songs = {x["file"]: x for x in songs}
+        return added, removed, moved, changed
+
+    def update_songs(self, modified, files=None):
+        # From the songs modified since the last update, and the paths of the
+        # library when songs may have been removed: same result as update
+        added = [x for x in modified if self.songs.get(x["file"]) != x]
+        removed = [self.songs[x["file"]] for x in added if x["file"] in self.songs]
+        new_files = self.songs.keys() | {x["file"] for x in added}
+        if files is not None:
+            new_files = set(files)
+            removed += [x for x in self.songs.values() if x["file"] not in new_files]
+        moved = find_moved(added, removed, self.songs, new_files)
+        for song in added:
+            self.order.setdefault(song["file"], len(self.order))
+        return added, removed, moved, self.apply(added, removed)
+
+    def apply(self, added, removed):
+        removed_files = {x["file"] for x in removed}
+        added_by_key = defaultdict(list)
+        for song in added:
+            for key in song_keys(song):
+                added_by_key[key].append(song)
+        for song in removed:
+            self.songs.pop(song["file"], None)
+        for song in added:
+            self.songs[song["file"]] = song
+        for file in removed_files - self.songs.keys():
+            self.order.pop(file, None)
+
+        keys = {key for x in added + removed for key in song_keys(x)}
+        for key in keys:
+            entry = [
+                x for x in self.index.pop(key, ()) if song_file(x) not in removed_files
+            ]
+            entry += [
+                x if self.ranking is not None else x["file"]
+                for x in added_by_key.get(key, ())
+            ]
+            entry.sort(key=lambda x: self.order[song_file(x)])
+            if entry:
+                self.index[key] = entry
+
+        changed = []
+        for key in keys:
+            for i in self.positions.get(key, ()):
+                favorite = [self.favorites[i]]
+                files = next(resolve_favorites(favorite, self.index, self.ranking))[1]
+                if self.files[i] != files:
+                    self.files[i] = files
+                    changed.append(self.favorites[i])
+        return changed
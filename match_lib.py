@@ -0,0 +1,82 @@
+from mpd_lib import quote, split_songs
+from rank_lib import ranked_files, slim_song
+
+DEFAULT_BATCH_SIZE = 100
+
+
+def parse_favorite(line, sep=" - "):
+    # Same splitting as the former awk calls: first field is the artist, second the title
+    line = line.replace('"', "").strip()
+    if not line:
+        return None
+    fields = line.split(sep)
+    artist = fields[0].strip()
+    title = fields[1].strip() if len(fields) > 1 else ""
+    return artist, title
+
+
+def read_favorites(favorite_tracks_file):
+    with open(favorite_tracks_file, "r", encoding="utf-8") as f:
+        for line in f:
+            favorite = parse_favorite(line)
+            if favorite:
+                yield favorite
+
+
+def search_filter(artist, title):
+    # Values are quoted here, and the whole expression once more when sent to MPD
+    return f"((artist == {quote(artist)}) AND (title == {quote(title)}))"
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def search_favorites(
+    client, favorites, batch_size=DEFAULT_BATCH_SIZE, cache=None, ranking=None
+):
+    for batch in batched(favorites, batch_size):
+        if cache is None:
+            pending = batch
+        else:
+            cached = {x: cache.get(*x) for x in batch}
+            pending = [x for x, songs in cached.items() if songs is None]
+
+        responses = client.command_list(
+            ("search", search_filter(artist, title)) for artist, title in pending
+        )
+        found = {}
+        for favorite, pairs in zip(pending, responses):
+            found[favorite] = [slim_song(x) for x in split_songs(pairs)]
+            if cache is not None:
+                cache.set(*favorite, found[favorite])
+
+        for favorite in batch:
+            songs = found[favorite] if favorite in found else cached[favorite]
+            yield favorite, ranked_files(favorite, songs, ranking)
+
+
+def write_results(results, output_file, output_file_missing, verbose=True):
+    nb_found = 0
+    nb_missing = 0
+    with (
+        open(output_file, "w", encoding="utf-8") as f_found,
+        open(output_file_missing, "w", encoding="utf-8") as f_missing,
+    ):
+        for (artist, title), files in results:
+            if files:
+                f_found.writelines(f"{x}\n" for x in files)
+                nb_found += 1
+            else:
+                if verbose:
+                    print(f"Track {artist} - {title} not found in mpd database.")
+                f_missing.write(f"{artist} - {title}\n")
+                nb_missing += 1
+    return nb_found, nb_missing
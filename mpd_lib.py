@@ -0,0 +1,166 @@
+import os
+import socket
+
+DEFAULT_HOST = "localhost"
+DEFAULT_PORT = 6600
+
+
+class MPDError(Exception):
+    pass
+
+
+def quote(value):
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def build_command(name, *args):
+    return " ".join([name] + [quote(x) for x in args])
+
+
+def get_connection_settings(host=None, port=None):
+    # Same environment variables as mpc: MPD_HOST may be "password@host", the host a
+    # unix socket path ("/run/mpd/socket") or an abstract socket name ("@mpd")
+    host = host or os.environ.get("MPD_HOST", DEFAULT_HOST)
+    port = int(port or os.environ.get("MPD_PORT", DEFAULT_PORT))
+    password = None
+    if "@" in host and not host.startswith("@"):
+        password, host = host.split("@", 1)
+    return host, port, password
+
+
+def is_unix_socket(host):
+    return host.startswith(("/", "@"))
+
+
+def open_connection(host, port, timeout=None):
+    if not is_unix_socket(host):
+        return socket.create_connection((host, port), timeout)
+    # Abstract socket names start with a null byte
+    address = f"\0{host[1:]}" if host.startswith("@") else host
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(address)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class MPDClient:
+    def __init__(self, host=None, port=None, timeout=None):
+        self.host, self.port, self.password = get_connection_settings(host, port)
+        self.timeout = timeout
+        self.version = None
+        self._sock = None
+        self._rfile = None
+
+    def connect(self):
+        self._sock = open_connection(self.host, self.port, self.timeout)
+        self._rfile = self._sock.makefile("rb")
+        greeting = self._read_line()
+        if not greeting.startswith("OK MPD "):
+            self.close()
+            address = (
+                self.host if is_unix_socket(self.host) else f"{self.host}:{self.port}"
+            )
+            raise MPDError(f"Unexpected greeting from {address}: {greeting}")
+        self.version = greeting[len("OK MPD ") :]
+        if self.password:
+            self.command("password", self.password)
+        return self
+
+    def close(self):
+        if self._rfile:
+            self._rfile.close()
+        if self._sock:
+            self._sock.close()
+        self._sock = None
+        self._rfile = None
+
+    def __enter__(self):
+        if self._sock is None:
+            self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _send(self, lines):
+        self._sock.sendall("".join(f"{x}\n" for x in lines).encode("utf-8"))
+
+    def _read_line(self):
+        line = self._rfile.readline()
+        if not line:
+            raise MPDError("Connection closed by MPD.")
+        return line.decode("utf-8").rstrip("\n")
+
+    def _read_pairs(self, terminator="OK"):
+        pairs = []
+        while True:
+            line = self._read_line()
+            if line == terminator:
+                return pairs
+            if line.startswith("ACK "):
+                raise MPDError(line)
+            key, _, value = line.partition(": ")
+            pairs.append((key, value))
+
+    def command(self, name, *args):
+        self._send([build_command(name, *args)])
+        return self._read_pairs()
+
+    def idle(self, *subsystems):
+        # Blocks until one of the subsystems changes, returns the changed ones
+        self._sock.settimeout(None)
+        try:
+            self._send([build_command("idle", *subsystems)])
+            return [v for k, v in self._read_pairs() if k == "changed"]
+        finally:
+            self._sock.settimeout(self.timeout)
+
+    def command_list(self, commands):
+        # commands: iterable of (name, *args) tuples, one response per command
+        commands = list(commands)
+        if not commands:
+            return []
+        lines = ["command_list_ok_begin"]
+        lines += [build_command(*x) for x in commands]
+        lines.append("command_list_end")
+        self._send(lines)
+        responses = [self._read_pairs("list_OK") for _ in commands]
+        self._read_pairs()
+        return responses
+
+
+def split_songs(pairs):
+    # mpd sends a line per value of a tag, a tag with several values (Artist of a
+    # collaboration) is the list of its values
+    songs = []
+    for key, value in pairs:
+        if key == "file":
+            songs.append({"file": value})
+        elif key in ("directory", "playlist"):
+            songs.append(None)
+        elif songs and songs[-1] is not None:
+            song = songs[-1]
+            if key not in song:
+                song[key] = value
+            elif isinstance(song[key], list):
+                song[key].append(value)
+            else:
+                song[key] = [song[key], value]
+    return [x for x in songs if x is not None]
+
+
+def tag_values(song, key):
+    value = song.get(key)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def first_tag(song, key, default=None):
+    values = tag_values(song, key)
+    return values[0] if values else default
@@ -0,0 +1,121 @@
+import json
+import os
+from collections import defaultdict
+from difflib import SequenceMatcher
+from pathlib import Path
+
+from mpd_lib import MPDError
+
+
+def edit_script(name, current, desired):
+    # Commands turning the stored playlist current into desired: the longest common
+    # subsequence stays in place, tracks present in both lists but out of order are
+    # moved, surplus tracks are deleted and missing ones are added at their position
+    target = [None] * len(current)
+    paired = set()
+    matcher = SequenceMatcher(None, current, desired, autojunk=False)
+    for block in matcher.get_matching_blocks():
+        for k in range(block.size):
+            target[block.a + k] = block.b + k
+            paired.add(block.b + k)
+
+    unpaired = defaultdict(list)
+    for j in reversed(range(len(desired))):
+        if j not in paired:
+            unpaired[desired[j]].append(j)
+    for i, track in enumerate(current):
+        if target[i] is None and unpaired[track]:
+            target[i] = unpaired[track].pop()
+
+    commands = []
+    for i in reversed(range(len(current))):
+        if target[i] is None:
+            commands.append(("playlistdelete", name, str(i)))
+    work = [x for x in target if x is not None]
+    moved = set(work) - paired
+
+    # The common subsequence is already in order, every other track is placed right
+    # after its predecessor in desired, which keeps work[:] in the order of desired
+    for j, track in enumerate(desired):
+        if j in paired:
+            continue
+        position = work.index(j - 1) + 1 if j else 0
+        if j in moved:
+            k = work.index(j)
+            work.pop(k)
+            if k < position:
+                position -= 1
+            if k != position:
+                commands.append(("playlistmove", name, str(k), str(position)))
+        elif position == len(work):
+            commands.append(("playlistadd", name, track))
+        else:
+            commands.append(("playlistadd", name, track, str(position)))
+        work.insert(position, j)
+    return commands
+
+
+def read_playlist(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        return [x.strip() for x in f if x.strip()]
+
+
+def stored_playlists(client):
+    return [v for k, v in client.command("listplaylists") if k == "playlist"]
+
+
+def load_uploaded(record_file):
+    # Names of the playlists uploaded by the previous runs, the only ones deleted when
+    # they are no longer exported: the playlists created by hand are left alone
+    if Path(record_file).exists():
+        with open(record_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return []
+
+
+def save_uploaded(record_file, names):
+    tmp_file = f"{record_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(sorted(names), f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, record_file)
+
+
+def upload_playlists(client, folder, uploaded=(), extension=".m3u"):
+    # Brings the stored playlists of mpd in line with the playlists of folder: every
+    # local playlist is diffed against its stored version, and the uploaded playlists
+    # no longer in folder are removed. mpd stops a command list at its first error,
+    # each playlist is edited by its own list and a failed one is diffed again by the
+    # next upload
+    existing = set(stored_playlists(client))
+    local = {x.stem: x for x in sorted(Path(folder).glob(f"*{extension}"))}
+    names = sorted(local)
+
+    to_list = [x for x in names if x in existing]
+    current = {x: [] for x in names}
+    responses = client.command_list(("listplaylist", x) for x in to_list)
+    for name, pairs in zip(to_list, responses):
+        current[name] = [v for k, v in pairs if k == "file"]
+
+    commands = []
+    failed = []
+    for name in names:
+        edits = edit_script(name, current[name], read_playlist(local[name]))
+        try:
+            client.command_list(edits)
+        except MPDError as e:
+            print(f"WARNING: can't upload {name} to mpd: {e}.")
+            failed.append(name)
+            continue
+        commands += edits
+
+    deleted = []
+    for name in sorted((set(uploaded) & existing) - set(local)):
+        try:
+            client.command("rm", name)
+        except MPDError as e:
+            print(f"WARNING: can't delete {name} from mpd: {e}.")
+            failed.append(name)
+            continue
+        commands.append(("rm", name))
+        deleted.append(name)
+    return names, deleted, failed, commands
@@ -1,3 +1,4 @@
 #!/usr/bin/env bash
+# Full sync, `python create_playlists.py --sync` only copies the changed playlists
 rsync -azvhP --stats --inplace --zc=zstd --zl=3 mpd_playlists/ ~/.config/mpd/playlists/
 rsync -azvhP --stats --inplace --zc=zstd --zl=3 jazz_standards/jazz_standards_mpd.m3u ~/.config/mpd/playlists/
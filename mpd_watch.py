@@ -0,0 +1,135 @@
+import argparse
+import time
+
+import create_playlists
+from create_playlists import (
+    FAVORITE_TRACKS_FILE_NAME,
+    LOCAL_BASEPATH,
+    PATH_CACHE_FILE_NAME,
+    RESULT_MPLAYLIST_FILE_NAME,
+    RESULT_MPLAYLIST_MISSING_FILE_NAME,
+)
+from library_lib import (
+    MODIFIED_MARGIN,
+    IncrementalMatcher,
+    fetch_files,
+    fetch_library,
+    fetch_modified,
+    fetch_songs,
+    fetch_stats,
+)
+from match_lib import read_favorites, write_results
+from mpd_lib import MPDClient
+from path_lib import PathValidator
+from rank_lib import DEFAULT_FORMATS, RULES, Ranking, parse_rules
+from watch_lib import PlaylistState
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Keep the mpd results and the playlists up to date with the mpd database."
+    )
+    parser.add_argument("--host", help="MPD host (default: $MPD_HOST or localhost)")
+    parser.add_argument("--port", help="MPD port (default: $MPD_PORT or 6600)")
+    parser.add_argument("--file", default=FAVORITE_TRACKS_FILE_NAME)
+    parser.add_argument(
+        "--top",
+        type=int,
+        help="Keep only the N best matches of each favorite (default: all of them)",
+    )
+    parser.add_argument(
+        "--rank",
+        type=parse_rules,
+        default=RULES,
+        help=f"Comma-separated rules ranking the matches, most important first (default: {','.join(RULES)})",
+    )
+    parser.add_argument(
+        "--formats",
+        type=lambda x: x.split(","),
+        default=DEFAULT_FORMATS,
+        help=f"File formats by order of preference for the format rule (default: {','.join(DEFAULT_FORMATS)})",
+    )
+    parser.add_argument("--output", default=RESULT_MPLAYLIST_FILE_NAME)
+    parser.add_argument("--output-missing", default=RESULT_MPLAYLIST_MISSING_FILE_NAME)
+    return parser.parse_args(argv)
+
+
+def write_matcher_results(matcher, args):
+    nb_found, nb_missing = write_results(
+        matcher.results(), args.output, args.output_missing, verbose=False
+    )
+    print(f"{nb_found} tracks found, {nb_missing} tracks not found in mpd database.")
+
+
+def fetch_changes(client, matcher, since):
+    # Songs modified since the previous update, and the paths of the library when
+    # the number of songs doesn't add up or no song changed (removed or moved files,
+    # whose mtime is kept): only then the library is listed, without its tags
+    stats = fetch_stats(client)
+    modified = fetch_modified(client, since - MODIFIED_MARGIN)
+    new_files = {x["file"] for x in modified} - matcher.songs.keys()
+    changed = any(matcher.songs.get(x["file"]) != x for x in modified)
+    files = None
+    if not changed or int(stats["songs"]) != len(matcher.songs) + len(new_files):
+        files = fetch_files(client)
+        unknown = set(files) - matcher.songs.keys() - new_files
+        modified += fetch_songs(client, [x for x in files if x in unknown])
+    return modified, files, int(stats["db_update"])
+
+
+def watch_database(client, matcher, state, args, max_updates=None):
+    # Each database update only fetches the songs modified since the previous one,
+    # only the favorites whose artist and title were touched are matched again, and
+    # only the playlists of their artists are rebuilt
+    since = int(fetch_stats(client)["db_update"])
+    nb_updates = 0
+    while max_updates is None or nb_updates < max_updates:
+        if "database" not in client.idle("database"):
+            continue
+        nb_updates += 1
+        start = time.perf_counter()
+        modified, files, since = fetch_changes(client, matcher, since)
+        added, removed, moved, changed = matcher.update_songs(modified, files)
+        print(
+            f"Database updated: {len(added)} added, {len(removed)} removed, {len(moved)} moved, {len(changed)} favorites changed."
+        )
+        if not changed:
+            continue
+        write_matcher_results(matcher, args)
+        affected = state.update_results(matcher.results_at(changed))
+        create_playlists.export_state(state)
+        print(
+            f"Updated {len(affected)} playlists in {(time.perf_counter() - start) * 1000:.0f} ms."
+        )
+
+
+def load_state(client, args):
+    songs = fetch_library(client)
+    print(f"{len(songs)} tracks loaded from the mpd database.")
+    ranking = Ranking(args.rank, args.top, args.formats) if args.top else None
+    matcher = IncrementalMatcher(read_favorites(args.file), songs, ranking)
+    write_matcher_results(matcher, args)
+
+    files = create_playlists.input_files()
+    files["result"] = args.output
+    files["missing"] = args.output_missing
+    state = PlaylistState(files, LOCAL_BASEPATH, PathValidator(PATH_CACHE_FILE_NAME))
+    state.load_results(matcher.results())
+    create_playlists.export_state(state)
+    return matcher, state
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with MPDClient(args.host, args.port) as client:
+        matcher, state = load_state(client, args)
+        print("Waiting for mpd database updates, press Ctrl-C to stop.")
+        try:
+            watch_database(client, matcher, state, args)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import argparse
+from pathlib import Path
+
+from match_lib import (
+    DEFAULT_BATCH_SIZE,
+    read_favorites,
+    search_favorites,
+    write_results,
+)
+from cache_lib import DEFAULT_TTL, QueryCache, get_db_update
+from library_lib import (
+    build_index,
+    fetch_library,
+    load_dump,
+    resolve_favorites,
+    save_dump,
+)
+from mpd_lib import MPDClient
+from rank_lib import DEFAULT_FORMATS, RULES, Ranking, parse_rules
+from snapshot_lib import Snapshot, write_snapshot
+from tag_lib import index_library
+
+FOLDER_PATH = Path(__file__).resolve().parent / "files"
+OUTPUT_FILE_NAME = f"{FOLDER_PATH}/04_result-mplaylist.csv"
+OUTPUT_FILE_MISSING_NAME = f"{FOLDER_PATH}/05_result-mplaylist-missing.csv"
+CACHE_FILE_NAME = f"{FOLDER_PATH}/.mpd-query-cache.json"
+TAG_CACHE_FILE_NAME = f"{FOLDER_PATH}/.tag-cache.json"
+LOCAL_BASEPATH = "/home/david/nfs/WDC14/Musique/"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Match favorite tracks against the mpd database."
+    )
+    parser.add_argument("file", help="Favorite tracks file (ARTIST - TRACK per line)")
+    parser.add_argument("--host", help="MPD host (default: $MPD_HOST or localhost)")
+    parser.add_argument("--port", help="MPD port (default: $MPD_PORT or 6600)")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="Number of searches sent per command list",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Fetch the whole database once with listallinfo and match locally",
+    )
+    parser.add_argument(
+        "--dump",
+        help="Match against a saved listallinfo dump instead of querying mpd",
+    )
+    parser.add_argument(
+        "--save-dump",
+        help="Save the database fetched with --index to this file",
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Match against a library snapshot saved with --save-snapshot, mapped in memory instead of loaded",
+    )
+    parser.add_argument(
+        "--save-snapshot",
+        help="Save the library of --index, --dump or --local to this snapshot file",
+    )
+    parser.add_argument(
+        "--local",
+        nargs="?",
+        const=LOCAL_BASEPATH,
+        metavar="FOLDER",
+        help=f"Match against the tags of the files of FOLDER instead of mpd (default: {LOCAL_BASEPATH})",
+    )
+    parser.add_argument(
+        "--tag-cache",
+        default=TAG_CACHE_FILE_NAME,
+        help="Tags of the last --local index, only the changed files are read again",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Processes reading the tags with --local (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--cache",
+        default=CACHE_FILE_NAME,
+        help="Search results cache, invalidated when the mpd database is updated",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Query mpd for every favorite"
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL / 86400,
+        help="Days after which a cached search result is queried again",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        help="Keep only the N best matches of each favorite (default: all of them)",
+    )
+    parser.add_argument(
+        "--rank",
+        type=parse_rules,
+        default=RULES,
+        help=f"Comma-separated rules ranking the matches, most important first (default: {','.join(RULES)})",
+    )
+    parser.add_argument(
+        "--formats",
+        type=lambda x: x.split(","),
+        default=DEFAULT_FORMATS,
+        help=f"File formats by order of preference for the format rule (default: {','.join(DEFAULT_FORMATS)})",
+    )
+    parser.add_argument("--output", default=OUTPUT_FILE_NAME)
+    parser.add_argument("--output-missing", default=OUTPUT_FILE_MISSING_NAME)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    ranking = Ranking(args.rank, args.top, args.formats) if args.top else None
+    favorites = read_favorites(args.file)
+
+    if args.snapshot:
+        with Snapshot(args.snapshot) as snapshot:
+            print(f"{len(snapshot)} tracks in the snapshot {args.snapshot}.")
+            results = resolve_favorites(
+                favorites, snapshot.index(tags=ranking is not None), ranking
+            )
+            nb_found, nb_missing = write_results(
+                results, args.output, args.output_missing
+            )
+    elif args.dump or args.index or args.local:
+        if args.local:
+            songs = index_library(args.local, args.tag_cache, args.workers)
+        elif args.dump:
+            songs = load_dump(args.dump)
+        else:
+            with MPDClient(args.host, args.port) as client:
+                songs = fetch_library(client)
+            if args.save_dump:
+                save_dump(songs, args.save_dump)
+        if args.save_snapshot:
+            write_snapshot(songs, args.save_snapshot)
+        print(f"{len(songs)} tracks loaded from {args.local or 'the mpd database'}.")
+        results = resolve_favorites(
+            favorites, build_index(songs, tags=ranking is not None), ranking
+        )
+        nb_found, nb_missing = write_results(results, args.output, args.output_missing)
+    else:
+        with MPDClient(args.host, args.port) as client:
+            cache = None
+            if not args.no_cache:
+                cache = QueryCache(
+                    args.cache, get_db_update(client), ttl=args.cache_ttl * 86400
+                )
+            results = search_favorites(
+                client,
+                favorites,
+                batch_size=args.batch_size,
+                cache=cache,
+                ranking=ranking,
+            )
+            try:
+                nb_found, nb_missing = write_results(
+                    results, args.output, args.output_missing
+                )
+            finally:
+                if cache is not None:
+                    cache.close()
+            if cache is not None:
+                cache.save()
+                print(f"{cache.hits} cached searches, {cache.misses} sent to mpd.")
+
+    print(f"{nb_found} tracks found, {nb_missing} tracks not found in mpd database.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
 #!/usr/bin/env bash
+# Full sync, `python create_playlists.py --sync` only copies the changed playlists
 rsync -azvhP --stats --inplace --zc=zstd --zl=3 playlists/ ~/nfs/WDC14/Musique/00_Playlists/
 rsync -azvhP --stats --inplace --zc=zstd --zl=3 jazz_standards/jazz_standards.m3u ~/nfs/WDC14/Musique/00_Playlists/
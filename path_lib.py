@@ -0,0 +1,111 @@
+import json
+import os
+import queue
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from report_lib import count
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 10.0
+
+
+def list_directory(directory, cached=None):
+    # One stat of the directory, and one listing only when its mtime changed
+    mtime = os.stat(directory).st_mtime_ns
+    if cached and cached[0] == mtime:
+        return cached
+    with os.scandir(directory) as entries:
+        return [mtime, sorted(x.name for x in entries if x.is_file())]
+
+
+class PathValidator:
+    # Checks that files exist by listing each parent directory once, on a pool of
+    # daemon threads (a hung network mount can't block the interpreter exit), with
+    # listings cached across runs and keyed by the directory mtime. Only the
+    # directories looked up in this run are saved, the cache doesn't grow with the
+    # directories of tracks fixed or removed since
+    def __init__(
+        self, cache_file=None, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TIMEOUT
+    ):
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = {}
+        self.used = set()
+        self.listings = 0
+        if cache_file and Path(cache_file).exists():
+            with open(cache_file, "r", encoding="utf-8") as f:
+                self.cache = json.load(f)
+
+    def _worker(self, tasks, results):
+        while True:
+            try:
+                directory = tasks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                results.put(
+                    (directory, list_directory(directory, self.cache.get(directory)))
+                )
+            except OSError:
+                results.put((directory, None))
+
+    def _list_directories(self, directories):
+        tasks = queue.Queue()
+        results = queue.Queue()
+        for directory in directories:
+            tasks.put(directory)
+        for _ in range(min(self.max_workers, len(directories))):
+            threading.Thread(
+                target=self._worker, args=(tasks, results), daemon=True
+            ).start()
+
+        listings = {}
+        while len(listings) < len(directories):
+            try:
+                directory, listing = results.get(timeout=self.timeout)
+            except queue.Empty:
+                pending = sorted(set(directories) - set(listings))
+                print(
+                    f"WARNING: no answer after {self.timeout}s while listing {len(pending)} directories, considering them unavailable."
+                )
+                for directory in pending:
+                    listings[directory] = None
+                break
+            count("stat_calls")
+            if listing is not None and self.cache.get(directory) is not listing:
+                self.listings += 1
+                count("directory_listings")
+            listings[directory] = listing
+        return listings
+
+    def validate(self, paths):
+        by_directory = defaultdict(list)
+        for path in paths:
+            directory, name = os.path.split(path)
+            by_directory[directory or "."].append((path, name))
+
+        self.used.update(by_directory)
+        listings = self._list_directories(list(by_directory))
+        result = {}
+        for directory, entries in by_directory.items():
+            listing = listings[directory]
+            if listing is None:
+                self.cache.pop(directory, None)
+                names = set()
+            else:
+                self.cache[directory] = listing
+                names = set(listing[1])
+            for path, name in entries:
+                result[path] = name in names
+
+        if self.cache_file:
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {k: v for k, v in self.cache.items() if k in self.used},
+                    f,
+                    ensure_ascii=False,
+                )
+        return result
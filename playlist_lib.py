@@ -1,6 +1,61 @@
+import hashlib
+import json
+import os
+from array import array
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
 
+from artist_lib import ArtistIndex
+from path_lib import PathValidator
+from report_lib import count
+
+DEFAULT_WRITERS = 8
+# Lines joined and written together by the playlist writers
+WRITE_CHUNK_SIZE = 1024
+
+
+# Preserves current behavior: empty lines become empty strings, malformed CSV raises IndexError
+def read_lines(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        return [x.strip() for x in f.readlines()]
+
+
+def read_playlist_dict(playlists_file):
+    with open(playlists_file, "r", encoding="utf-8") as f:
+        return dict([x.strip().split(";") for x in f.readlines()])
+
+
+def read_artist_list(artists_file):
+    with open(artists_file, "r", encoding="utf-8") as f:
+        return [
+            (x.strip().split(";")[1], x.strip().split(";")[0]) for x in f.readlines()
+        ]
+
+
+def read_alias_list(aliases_file):
+    # ALIAS;ARTIST, ARTIST being an artist of the artists file
+    with open(aliases_file, "r", encoding="utf-8") as f:
+        return [
+            (x.strip().split(";")[0], x.strip().split(";")[1]) for x in f if x.strip()
+        ]
+
+
+def read_missing_dict(fix_missing_tracks_file):
+    with open(fix_missing_tracks_file, "r", encoding="utf-8") as f:
+        return dict(
+            [(x.strip().split(";")[0], x.strip().split(";")[1]) for x in f.readlines()]
+        )
+
+
+def read_optional(read, filename, default):
+    # The result and fix files don't exist before the first mplaylist run
+    if filename and Path(filename).exists():
+        return read(filename)
+    return default
+
 
 def read_files(
     favorite_tracks_file,
@@ -10,124 +65,390 @@ def read_files(
     result_mplaylist_missing_file=None,
     fix_missing_tracks_file=None,
 ):
-    # Preserves current behavior: empty lines become empty strings, malformed CSV raises IndexError
-    with open(favorite_tracks_file, "r", encoding="utf-8") as f:
-        raw_tracks = [x.strip() for x in f.readlines()]
-
-    with open(playlists_file, "r", encoding="utf-8") as f:
-        playlist_dict = dict([x.strip().split(";") for x in f.readlines()])
-
-    with open(artists_file, "r", encoding="utf-8") as f:
-        artist_list = [
-            (x.strip().split(";")[1], x.strip().split(";")[0]) for x in f.readlines()
-        ]
-
-    tracks = []
-    if result_mplaylist_file and Path(result_mplaylist_file).exists():
-        with open(result_mplaylist_file, "r", encoding="utf-8") as f:
-            tracks = [x.strip() for x in f.readlines()]
-
-    missing_tracks = []
-    if result_mplaylist_missing_file and Path(result_mplaylist_missing_file).exists():
-        with open(result_mplaylist_missing_file, "r", encoding="utf-8") as f:
-            missing_tracks = [x.strip() for x in f.readlines()]
-
-    missing_dict = {}
-    if fix_missing_tracks_file and Path(fix_missing_tracks_file).exists():
-        with open(fix_missing_tracks_file, "r", encoding="utf-8") as f:
-            missing_dict = dict(
-                [
-                    (x.strip().split(";")[0], x.strip().split(";")[1])
-                    for x in f.readlines()
-                ]
-            )
+    raw_tracks = read_lines(favorite_tracks_file)
+    playlist_dict = read_playlist_dict(playlists_file)
+    artist_list = read_artist_list(artists_file)
+    tracks = read_optional(read_lines, result_mplaylist_file, [])
+    missing_tracks = read_optional(read_lines, result_mplaylist_missing_file, [])
+    missing_dict = read_optional(read_missing_dict, fix_missing_tracks_file, {})
 
     return raw_tracks, tracks, missing_tracks, playlist_dict, artist_list, missing_dict
 
 
-def build_artist_dict(artist_list):
+def build_artist_dict(artist_list, aliases=()):
     artist_dict = {}
     for i in artist_list:
         if i[0] in artist_dict:
             artist_dict[i[0]] += [i[1]]
         else:
             artist_dict[i[0]] = [i[1]]
-    return artist_dict
+    return ArtistIndex(artist_dict, aliases)
+
+
+def iter_matches(tracks, artist_dict, missing_artists, sep="/", tag_artists=None):
+    # A single lookup per track, exact names don't leave the dict lookup of C. A
+    # folder that isn't an artist falls back to the artist tags of the track
+    # ({track: names}, see tag_lib.load_tag_artists). missing_artists is a list, or a
+    # set to keep the memory of a stream bounded
+    if isinstance(missing_artists, set):
+        add_missing = missing_artists.add
+    else:
+        add_missing = missing_artists.append
+    for track in tracks:
+        artist = track.split(sep)[0].strip()
+        try:
+            playlist_ids = artist_dict[artist]
+        except KeyError:
+            playlist_ids = None
+            for name in tag_artists.get(track, ()) if tag_artists else ():
+                if name in artist_dict:
+                    playlist_ids = artist_dict[name]
+                    count("tag_artist_matches")
+                    break
+            if playlist_ids is None:
+                add_missing(artist)
+                continue
+        for playlist_id in playlist_ids:
+            yield playlist_id, track
 
 
 def match_tracks(tracks, artist_dict, sep="/"):
     # Tracks processed in reverse order to have newest tracks at the end
-    file_list = []
     missing_artists = []
-    for track in reversed(tracks):
-        artist = track.split(sep)[0].strip()
-        if artist in artist_dict:
-            for playlist_id in artist_dict[artist]:
-                file_list.append({playlist_id: track})
-        else:
-            missing_artists.append(artist)
-
+    file_list = [
+        {playlist_id: track}
+        for playlist_id, track in iter_matches(
+            reversed(tracks), artist_dict, missing_artists, sep
+        )
+    ]
     return file_list, missing_artists
 
 
-def match_missing_tracks(missing_tracks, missing_dict, artist_dict, local_basepath=""):
-    list_missing_paths = []
-    missing_file_list = []
-    missing_artists = []
+def iter_missing_paths(
+    missing_tracks,
+    missing_dict,
+    local_basepath,
+    list_missing_paths,
+    path_validator=None,
+):
+    # All the paths are checked at once, one listing per parent directory
+    missing_tracks = list(missing_tracks)
+    existing_files = (path_validator or PathValidator()).validate(
+        {missing_dict[x].strip() for x in missing_tracks if x in missing_dict}
+    )
 
     for track in missing_tracks:
         if track in missing_dict:
             artist = track.split(" - ")[0]
             path = missing_dict[track].strip()
-            my_file = Path(path)
 
-            if not my_file.is_file():
+            if not existing_files[path]:
                 print(
                     f"WARNING: file {path} doesn't seem to exist for track {track}. Skipping."
                 )
-            elif artist in artist_dict:
-                for i in artist_dict[artist]:
-                    missing_file_list.append({i: path.replace(local_basepath, "")})
             else:
-                missing_artists.append(artist)
+                yield artist, path.replace(local_basepath, "")
         else:
             list_missing_paths.append(track)
 
+
+def iter_missing_matches(
+    missing_tracks,
+    missing_dict,
+    artist_dict,
+    local_basepath,
+    list_missing_paths,
+    missing_artists,
+    path_validator=None,
+):
+    for artist, path in iter_missing_paths(
+        missing_tracks, missing_dict, local_basepath, list_missing_paths, path_validator
+    ):
+        try:
+            playlist_ids = artist_dict[artist]
+        except KeyError:
+            missing_artists.append(artist)
+            continue
+        for i in playlist_ids:
+            yield i, path
+
+
+def match_missing_tracks(
+    missing_tracks, missing_dict, artist_dict, local_basepath="", path_validator=None
+):
+    list_missing_paths = []
+    missing_artists = []
+    missing_file_list = [
+        {playlist_id: path}
+        for playlist_id, path in iter_missing_matches(
+            missing_tracks,
+            missing_dict,
+            artist_dict,
+            local_basepath,
+            list_missing_paths,
+            missing_artists,
+            path_validator,
+        )
+    ]
     return missing_file_list, list_missing_paths, missing_artists
 
 
+class TrackView:
+    # Read-only sequence of the tracks of one playlist of a TrackTable
+    __slots__ = ("tracks", "ids")
+
+    def __init__(self, tracks, ids):
+        self.tracks = tracks
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        tracks = self.tracks
+        return (tracks[i] for i in self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.tracks[x] for x in self.ids[i]]
+        return self.tracks[self.ids[i]]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"TrackView({list(self)!r})"
+
+
+class TrackTable:
+    # Each track path is stored once, playlists are arrays of track indices
+    __slots__ = ("tracks", "index", "playlists")
+
+    def __init__(self):
+        self.tracks = []
+        self.index = {}
+        self.playlists = {}
+
+    def __len__(self):
+        return sum(len(x) for x in self.playlists.values())
+
+    def add(self, playlist_id, track):
+        track_id = self.index.get(track)
+        if track_id is None:
+            track_id = self.index[track] = len(self.tracks)
+            self.tracks.append(track)
+        ids = self.playlists.get(playlist_id)
+        if ids is None:
+            ids = self.playlists[playlist_id] = array("I")
+        ids.append(track_id)
+
+    def add_pairs(self, pairs):
+        for playlist_id, track in pairs:
+            self.add(playlist_id, track)
+
+    def extend(self, other):
+        for playlist_id, ids in other.playlists.items():
+            self.add_pairs((playlist_id, other.tracks[i]) for i in ids)
+
+    def view(self, playlist_id):
+        return TrackView(self.tracks, self.playlists[playlist_id])
+
+
+def match_tracks_table(tracks, artist_dict, table, sep="/", tag_artists=None):
+    # Same as match_tracks, adding the matches to a TrackTable
+    missing_artists = []
+    table.add_pairs(
+        iter_matches(reversed(tracks), artist_dict, missing_artists, sep, tag_artists)
+    )
+    return missing_artists
+
+
+def match_missing_tracks_table(
+    missing_tracks, missing_dict, artist_dict, local_basepath="", path_validator=None
+):
+    # Same as match_missing_tracks, returning the matches as a TrackTable
+    table = TrackTable()
+    list_missing_paths = []
+    missing_artists = []
+    table.add_pairs(
+        iter_missing_matches(
+            missing_tracks,
+            missing_dict,
+            artist_dict,
+            local_basepath,
+            list_missing_paths,
+            missing_artists,
+            path_validator,
+        )
+    )
+    return table, list_missing_paths, missing_artists
+
+
 def build_playlists(file_list, playlist_dict):
-    d = defaultdict(list)
-    for i in file_list:
-        k, v = list(i.items())[0]
-        d[k].append(v)
+    if isinstance(file_list, TrackTable):
+        condensed_dict = {k: file_list.view(k) for k in file_list.playlists}
+    else:
+        d = defaultdict(list)
+        for i in file_list:
+            k, v = list(i.items())[0]
+            d[k].append(v)
+        condensed_dict = dict(d)
 
-    condensed_dict = dict(d)
     final_dict = dict()
-    max_playlist_id = max([int(x) for x in playlist_dict])
+    width = playlist_id_width(playlist_dict)
 
     for k, v in condensed_dict.items():
         if k in playlist_dict:
-            final_dict[f"{k.zfill(len(str(max_playlist_id)))}_{playlist_dict[k]}"] = v
+            final_dict[playlist_name(k, playlist_dict, width)] = v
         else:
             print(f"Playlist name {k} not in playlist dict.")
 
     return final_dict
 
 
-def export_playlists(folder, path, final_dict):
-    Path(folder).mkdir(parents=True, exist_ok=True)
-    for playlist, tracks in final_dict.items():
-        filename = f"{folder}/{playlist.replace('/', '-')}.m3u"
-        print(f"Creating {filename}.")
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write("\n".join([f"{path}{x}" for x in tracks]))
+def playlist_id_width(playlist_dict):
+    max_playlist_id = max([int(x) for x in playlist_dict])
+    return len(str(max_playlist_id))
+
+
+def playlist_name(playlist_id, playlist_dict, width):
+    return f"{playlist_id.zfill(width)}_{playlist_dict[playlist_id]}"
+
+
+def load_manifest(manifest_file):
+    if manifest_file and Path(manifest_file).exists():
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest_file, manifest):
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True, ensure_ascii=False)
 
 
-def export_raw_playlists(final_dict, folder="raw_playlists"):
+def file_signature(filename):
+    # Files modified outside of the export (git checkout, manual edit) are rewritten
+    count("stat_calls")
+    try:
+        stat = Path(filename).stat()
+    except FileNotFoundError:
+        return [None, None]
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def is_unchanged(filename, digest, manifest):
+    return manifest.get(filename) == [digest, *file_signature(filename)]
+
+
+def record_written(filename, digest, manifest):
+    signature = file_signature(filename)
+    count("bytes_written", signature[0] or 0)
+    manifest[filename] = [digest, *signature]
+
+
+def remove_stale_files(folder, filenames, manifest):
+    removed = []
+    for filename in list(manifest):
+        if (
+            str(Path(filename).parent) == str(Path(folder))
+            and filename not in filenames
+        ):
+            print(f"Deleting {filename}.")
+            Path(filename).unlink(missing_ok=True)
+            del manifest[filename]
+            removed.append(filename)
+    return removed
+
+
+def iter_content(path, tracks, chunk_size=WRITE_CHUNK_SIZE):
+    # Same text as "\n".join(f"{path}{x}" for x in tracks), by chunks of lines
+    tracks = iter(tracks)
+    prefix = path
+    separator = f"\n{path}"
+    while chunk := list(islice(tracks, chunk_size)):
+        yield prefix + separator.join(chunk)
+        prefix = separator
+
+
+@contextmanager
+def open_tmp_file(filename):
+    # Temporary file of filename, synced to disk when the block ends: renamed over
+    # the playlist before that, a crash can leave an empty playlist that the manifest
+    # records as current. The caller removes it when the block fails
+    with open(f"{filename}.tmp", "w", encoding="utf-8") as f:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_playlist_file(filename, path, tracks, manifest):
+    # Returns the content hash if the file was written, None if it was unchanged. The
+    # content goes to a temporary file synced and renamed over the playlist, a crash
+    # never leaves a truncated playlist behind
+    digest = hashlib.sha1()
+    for chunk in iter_content(path, tracks):
+        digest.update(chunk.encode("utf-8"))
+    digest = digest.hexdigest()
+    if is_unchanged(filename, digest, manifest):
+        return None
+
+    tmp_file = f"{filename}.tmp"
+    try:
+        with open_tmp_file(filename) as f:
+            f.writelines(iter_content(path, tracks))
+        os.replace(tmp_file, filename)
+    except BaseException:
+        Path(tmp_file).unlink(missing_ok=True)
+        raise
+    return digest
+
+
+def write_playlist_files(
+    folder, contents, manifest_file=None, max_workers=DEFAULT_WRITERS
+):
+    # contents: {filename: (path prefix, tracks)}. Only files whose content hash
+    # changed since the last run are written, on a pool of writers (the latency of
+    # network filesystems dominates), and files generated previously in this folder
+    # but no longer produced are deleted
     Path(folder).mkdir(parents=True, exist_ok=True)
-    for playlist, tracks in final_dict.items():
-        filename = f"{folder}/{playlist.replace('/', '-')}.txt"
-        print(f"Creating {filename}.")
-        with open(filename, "w", encoding="utf-8") as f:
-            f.write("\n".join([x for x in tracks]))
+    manifest = load_manifest(manifest_file)
+    written = []
+    removed = []
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        digests = executor.map(
+            lambda x: write_playlist_file(x[0], *x[1], manifest), contents.items()
+        )
+        for filename, digest in zip(contents, digests):
+            if digest is None:
+                continue
+            print(f"Creating {filename}.")
+            record_written(filename, digest, manifest)
+            written.append(filename)
+
+    if manifest_file:
+        removed = remove_stale_files(folder, contents, manifest)
+        save_manifest(manifest_file, manifest)
+
+    return written, removed
+
+
+def playlist_filename(folder, playlist, extension):
+    return f"{folder}/{playlist.replace('/', '-')}{extension}"
+
+
+def export_playlists(folder, path, final_dict, manifest_file=None):
+    contents = {
+        playlist_filename(folder, playlist, ".m3u"): (path, tracks)
+        for playlist, tracks in final_dict.items()
+    }
+    return write_playlist_files(folder, contents, manifest_file)
+
+
+def export_raw_playlists(final_dict, folder="raw_playlists", manifest_file=None):
+    contents = {
+        playlist_filename(folder, playlist, ".txt"): ("", tracks)
+        for playlist, tracks in final_dict.items()
+    }
+    return write_playlist_files(folder, contents, manifest_file)
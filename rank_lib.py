@@ -0,0 +1,74 @@
+import heapq
+import os
+import re
+
+from library_lib import normalize
+from mpd_lib import first_tag
+
+RULES = ("exact", "album", "format", "length")
+DEFAULT_FORMATS = ("flac", "opus", "ogg", "m4a", "mp3")
+COMPILATION_ARTISTS = {"various artists", "various", "va", "artistes divers"}
+LIVE_PATTERN = re.compile(r"\blive\b", re.IGNORECASE)
+# Tags kept with the files of the search results, enough to rank them again later
+RANK_TAGS = ("Artist", "Title", "Album", "AlbumArtist")
+
+
+def parse_rules(value):
+    rules = tuple(x.strip() for x in value.split(",") if x.strip())
+    unknown = [x for x in rules if x not in RULES]
+    if unknown:
+        raise ValueError(f"unknown rules {', '.join(unknown)}")
+    return rules
+
+
+def slim_song(song):
+    return {k: song[k] for k in ("file", *RANK_TAGS) if k in song}
+
+
+class Ranking:
+    # Candidates of a favorite are ordered by a key computed once per candidate, one
+    # component per rule (lower is better), ties keep the order of mpd
+    def __init__(self, rules=RULES, top=1, formats=DEFAULT_FORMATS):
+        self.rules = [getattr(self, f"rank_{x}") for x in rules]
+        self.top = top
+        self.formats = {x.lower().lstrip("."): i for i, x in enumerate(formats)}
+
+    def rank_exact(self, artist, title, song):
+        # Same tags as the favorite, not only the same ones once case-folded
+        exact = first_tag(song, "Artist", "").strip() == artist
+        return 0 if exact and first_tag(song, "Title", "").strip() == title else 1
+
+    def rank_album(self, artist, title, song):
+        # Studio album, then live version, then compilation
+        artist = first_tag(song, "Artist", "")
+        album_artist = normalize(first_tag(song, "AlbumArtist", artist))
+        if album_artist in COMPILATION_ARTISTS or album_artist not in normalize(artist):
+            return 2
+        album = first_tag(song, "Album", "")
+        if LIVE_PATTERN.search(f"{album} {first_tag(song, 'Title', '')}"):
+            return 1
+        return 0
+
+    def rank_format(self, artist, title, song):
+        extension = os.path.splitext(song["file"])[1].lower().lstrip(".")
+        return self.formats.get(extension, len(self.formats))
+
+    def rank_length(self, artist, title, song):
+        return len(song["file"])
+
+    def rank(self, favorite, songs):
+        # Returns the files of the top candidates, best first
+        if len(songs) <= 1:
+            return [x["file"] for x in songs]
+        artist, title = favorite
+        keyed = [
+            (tuple(rule(artist, title, song) for rule in self.rules), i, song["file"])
+            for i, song in enumerate(songs)
+        ]
+        return [x[2] for x in heapq.nsmallest(self.top or len(keyed), keyed)]
+
+
+def ranked_files(favorite, songs, ranking=None):
+    if ranking is None:
+        return [x["file"] for x in songs]
+    return ranking.rank(favorite, songs)
@@ -0,0 +1,100 @@
+import json
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+NULL_SPAN = nullcontext()
+
+# Report of the current run, None when the instrumentation is off so that span()
+# and count() cost a single test
+_report = None
+# Counters are incremented from the pools of writers too
+_lock = threading.Lock()
+
+
+def peak_memory():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * MAXRSS_UNIT
+
+
+class RunReport:
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.start = clock()
+        self.spans = []
+        self.counters = defaultdict(int)
+
+    @contextmanager
+    def span(self, name):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.spans.append(
+                {
+                    "name": name,
+                    "start": start - self.start,
+                    "duration": self.clock() - start,
+                    "peak_memory": peak_memory(),
+                }
+            )
+
+    def count(self, name, value=1):
+        with _lock:
+            self.counters[name] += value
+
+    def to_dict(self):
+        return {
+            "duration": self.clock() - self.start,
+            "peak_memory": peak_memory(),
+            "spans": self.spans,
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def save(self, report_file):
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def enable():
+    global _report
+    _report = RunReport()
+    return _report
+
+
+def disable():
+    global _report
+    _report = None
+
+
+def span(name):
+    if _report is None:
+        return NULL_SPAN
+    return _report.span(name)
+
+
+def count(name, value=1):
+    if _report is not None:
+        _report.count(name, value)
+
+
+def counted(name, iterable):
+    # Counts the items of iterable as they are consumed
+    if _report is None:
+        return iterable
+    return _counted(_report, name, iterable)
+
+
+def _counted(report, name, iterable):
+    nb = 0
+    try:
+        for item in iterable:
+            nb += 1
+            yield item
+    finally:
+        report.counters[name] += nb
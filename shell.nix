@@ -6,6 +6,8 @@ in pkgs.mkShell {
   buildInputs = [
     python3
     pythonPackages.pytest
+    pythonPackages.mutagen
+    pythonPackages.numpy
     prek
   ];
 
@@ -0,0 +1,227 @@
+import re
+from fnmatch import translate
+
+from snapshot_lib import FIELDS, MISSING
+
+RULES = ("genre", "year", "duration", "path", "format", "favorites")
+
+
+def parse_range(value):
+    # "1955-1965", "1959", "-600", "120-" -> (low, high), None for an open bound
+    low, sep, high = value.partition("-")
+    if not sep:
+        high = low
+    try:
+        return (float(low) if low else None, float(high) if high else None)
+    except ValueError:
+        raise ValueError(f"invalid range {value}") from None
+
+
+def parse_rule(rule):
+    # "genre=Jazz|Blues" -> ("genre", value parsed for the rule)
+    name, _, value = rule.strip().partition("=")
+    if name not in RULES:
+        raise ValueError(f"unknown rule {name}")
+    if name == "favorites":
+        return name, None
+    if not value:
+        raise ValueError(f"rule {name} needs a value")
+    if name in ("year", "duration"):
+        return name, parse_range(value)
+    if name == "path":
+        return name, re.compile(translate(value))
+    return name, {x.strip().casefold() for x in value.split("|")}
+
+
+def read_smart_playlists(smart_playlists_file):
+    # NAME;RULE;RULE... per line, a track is in the playlist when all the rules match
+    playlists = []
+    with open(smart_playlists_file, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            name, *rules = line.strip().split(";")
+            try:
+                playlists.append((name, [parse_rule(x) for x in rules if x.strip()]))
+            except ValueError as e:
+                raise ValueError(f"line {i + 1} of {smart_playlists_file}: {e}")
+    return playlists
+
+
+def parse_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return float("nan")
+
+
+def lowercase(chars):
+    # ASCII lowercase of an array of bytes
+    return chars | ((chars >= 65) & (chars <= 90)) * 32
+
+
+class LibraryColumns:
+    # The columns of a snapshot as numpy arrays of string ids, its strings read in
+    # place from the map. Numbers and extensions are read from the bytes of the strings
+    # for all the tracks at once, genres are compared once per distinct value: no
+    # Python code runs per track, except for path globs, run on the tracks left by
+    # the other rules, and the favorites, compared once
+    def __init__(self, snapshot, favorites=()):
+        import numpy as np
+
+        self.np = np
+        self.snapshot = snapshot
+        self.favorites = favorites
+        self.cache = {}
+        self.paths = {}
+        self.nb_strings = len(snapshot.offsets) - 1
+
+    def column(self, field):
+        # String ids of a field, missing tags pointing to an extra empty string
+        key = ("column", field)
+        if key not in self.cache:
+            np = self.np
+            column = np.frombuffer(self.snapshot.columns, dtype=np.uint32)[
+                FIELDS.index(field) :: len(FIELDS)
+            ].astype(np.int64)
+            column[column == MISSING] = self.nb_strings
+            self.cache[key] = column
+        return self.cache[key]
+
+    def chars(self, ids, width, tail=False):
+        # (len(ids), width) array of the first (or last) bytes of the strings, 0
+        # past their length, and the lengths. The bytes are gathered from views of
+        # the map, dropped on return: the snapshot can be closed once built
+        np = self.np
+        offsets = np.frombuffer(self.snapshot.offsets, dtype=np.uint64)
+        data = np.frombuffer(
+            self.snapshot.mmap, dtype=np.uint8, offset=self.snapshot.data
+        )
+        # Missing tags (id nb_strings) are empty strings
+        starts = offsets[np.minimum(ids, self.nb_strings)].astype(np.int64)
+        ends = offsets[np.minimum(ids + 1, self.nb_strings)].astype(np.int64)
+        lengths = ends - starts
+        positions = np.arange(width)
+        if tail:
+            positions = positions - width
+            index = ends[:, None] + positions
+            valid = positions >= -lengths[:, None]
+        else:
+            index = starts[:, None] + positions
+            valid = positions < lengths[:, None]
+        index = np.clip(index, 0, max(len(data) - 1, 0))
+        chars = np.where(valid, data[index] if len(data) else 0, 0)
+        return chars.astype(np.uint8), lengths
+
+    def values(self, field):
+        # Numbers of a field by track (year of the date, duration), NaN when the tag
+        # is missing or invalid
+        key = ("values", field)
+        if key not in self.cache:
+            np = self.np
+            ids, inverse = np.unique(self.column(field), return_inverse=True)
+            if field == "Date":
+                # Dates start with the year
+                chars, _ = self.chars(ids, 4)
+                digits = chars.astype(np.int64) - 48
+                valid = ((digits >= 0) & (digits <= 9)).all(axis=1)
+                values = np.where(valid, digits @ [1000, 100, 10, 1], np.nan)
+            else:
+                chars, lengths = self.chars(ids, 32)
+                strings = chars.view("S32").ravel()
+                try:
+                    values = np.where(strings == b"", b"nan", strings).astype(float)
+                    values[lengths > 32] = np.nan
+                except ValueError:
+                    values = np.array([parse_number(x) for x in strings])
+            self.cache[key] = values[inverse]
+        return self.cache[key]
+
+    def genre_mask(self, genres):
+        # Genres compared once per distinct value
+        np = self.np
+        if "genres" not in self.cache:
+            ids, inverse = np.unique(self.column("Genre"), return_inverse=True)
+            names = [
+                self.snapshot.string(i).decode("utf-8").casefold()
+                if i < self.nb_strings
+                else None
+                for i in ids.tolist()
+            ]
+            self.cache["genres"] = names, inverse
+        names, inverse = self.cache["genres"]
+        return np.array([x in genres for x in names], dtype=bool)[inverse]
+
+    def format_mask(self, formats):
+        # Extensions compared on the last bytes of the paths
+        np = self.np
+        mask = np.zeros(len(self.snapshot), dtype=bool)
+        for extension in formats:
+            suffix = f".{extension}".encode()
+            key = ("tails", len(suffix))
+            if key not in self.cache:
+                chars, lengths = self.chars(self.column("file"), len(suffix), True)
+                self.cache[key] = lowercase(chars), lengths
+            chars, lengths = self.cache[key]
+            mask |= (chars == np.frombuffer(suffix, np.uint8)).all(axis=1) & (
+                lengths >= len(suffix)
+            )
+        return mask
+
+    def favorite_mask(self):
+        # The paths are compared as bytes, without decoding the library
+        if "favorites" not in self.cache:
+            favorites = {x.encode("utf-8") for x in self.favorites}
+            string = self.snapshot.string
+            self.cache["favorites"] = self.np.fromiter(
+                (string(x) in favorites for x in self.column("file").tolist()),
+                dtype=bool,
+                count=len(self.snapshot),
+            )
+        return self.cache["favorites"]
+
+    def path(self, i):
+        if i not in self.paths:
+            string_id = int(self.column("file")[i])
+            self.paths[i] = self.snapshot.string(string_id).decode("utf-8")
+        return self.paths[i]
+
+    def mask(self, rule, value):
+        np = self.np
+        if rule == "favorites":
+            return self.favorite_mask()
+        if rule == "genre":
+            return self.genre_mask(value)
+        if rule == "format":
+            return self.format_mask(value)
+        values = self.values("Date" if rule == "year" else "duration")
+        low, high = value
+        # Tracks without the tag never match
+        mask = ~np.isnan(values)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+        return mask
+
+    def select(self, rules):
+        # Indexes of the tracks matching all the rules, in library order
+        np = self.np
+        mask = np.ones(len(self.snapshot), dtype=bool)
+        for rule, value in rules:
+            if rule != "path":
+                mask &= self.mask(rule, value)
+        selected = np.flatnonzero(mask).tolist()
+        for rule, value in rules:
+            if rule == "path":
+                selected = [i for i in selected if value.match(self.path(i))]
+        return selected
+
+
+def build_smart_playlists(snapshot, smart_playlists, favorites=()):
+    # {name: tracks} of the rule playlists, as build_playlists
+    columns = LibraryColumns(snapshot, favorites)
+    return {
+        name: [columns.path(i) for i in columns.select(rules)]
+        for name, rules in smart_playlists
+    }
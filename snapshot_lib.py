@@ -0,0 +1,218 @@
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from library_lib import song_key
+from mpd_lib import first_tag
+from tag_lib import song_artists
+
+MAGIC = b"PLSNAP02"
+# Tags kept in the snapshot, one fixed-width column of string ids each
+FIELDS = (
+    "file",
+    "Artist",
+    "Title",
+    "Album",
+    "AlbumArtist",
+    "duration",
+    "Genre",
+    "Date",
+)
+# magic, number of strings, of songs, of songs with a key, of fields
+HEADER = struct.Struct("<8sIIII")
+MISSING = 0xFFFFFFFF
+# Separates the artist and the title in the keys of the string table
+KEY_SEPARATOR = "\x1f"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def aligned(size):
+    return size + -size % 8
+
+
+def align(data):
+    return data + b"\x00" * (aligned(len(data)) - len(data))
+
+
+def write_snapshot(songs, snapshot_file):
+    # Layout, each section aligned on 8 bytes:
+    # header, string offsets (Q), songs (I per field), key of each song (I),
+    # songs sorted by key (I), songs sorted by file (I), string data
+    strings = {}
+
+    def string_id(value):
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    columns = array("I")
+    keys = array("I")
+    for song in songs:
+        # A single value per field, the first one of a tag with several values
+        columns.extend(
+            string_id(first_tag(song, x)) if x in song else MISSING for x in FIELDS
+        )
+        key = song_key(song)
+        keys.append(MISSING if key is None else string_id(KEY_SEPARATOR.join(key)))
+
+    encoded = [x.encode("utf-8") for x in strings]
+    offsets = array("Q", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    nb_songs = len(keys)
+    by_key = array(
+        "I",
+        sorted(
+            (i for i in range(nb_songs) if keys[i] != MISSING),
+            key=lambda i: encoded[keys[i]],
+        ),
+    )
+    by_file = array(
+        "I",
+        sorted(range(nb_songs), key=lambda i: encoded[columns[i * len(FIELDS)]]),
+    )
+
+    tmp_file = f"{snapshot_file}.tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(
+            align(HEADER.pack(MAGIC, len(encoded), nb_songs, len(by_key), len(FIELDS)))
+        )
+        for section in (offsets, columns, keys, by_key, by_file):
+            f.write(align(section.tobytes()))
+        f.write(b"".join(encoded))
+    os.replace(tmp_file, snapshot_file)
+
+
+class Snapshot:
+    # Library written by write_snapshot, mapped in memory: opening it reads the
+    # header only, and songs are decoded when they're looked up, so processes
+    # sharing a snapshot share its pages
+    def __init__(self, snapshot_file):
+        with open(snapshot_file, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self.mmap[: HEADER.size]
+        if len(header) < HEADER.size or header[: len(MAGIC)] != MAGIC:
+            self.mmap.close()
+            raise SnapshotError(f"{snapshot_file} isn't a library snapshot")
+        _, nb_strings, nb_songs, nb_keyed, nb_fields = HEADER.unpack(header)
+        if nb_fields != len(FIELDS):
+            self.mmap.close()
+            raise SnapshotError(f"{snapshot_file} doesn't have the fields {FIELDS}")
+        self.view = memoryview(self.mmap)
+        position = aligned(HEADER.size)
+        sections = []
+        for fmt, size in [
+            ("Q", nb_strings + 1),
+            ("I", nb_songs * nb_fields),
+            ("I", nb_songs),
+            ("I", nb_keyed),
+            ("I", nb_songs),
+        ]:
+            length = size * struct.calcsize(fmt)
+            sections.append(self.view[position : position + length].cast(fmt))
+            position += aligned(length)
+        self.sections = sections
+        self.offsets, self.columns, self.keys, self.by_key, self.by_file = sections
+        self.data = position
+        self.nb_songs = nb_songs
+
+    def close(self):
+        # Views of the map are released first, mmap refuses to close while exported
+        for section in self.sections:
+            section.release()
+        self.view.release()
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.nb_songs
+
+    def string(self, string_id):
+        start = self.data + self.offsets[string_id]
+        end = self.data + self.offsets[string_id + 1]
+        return self.mmap[start:end]
+
+    def song(self, i, fields=FIELDS):
+        row = i * len(FIELDS)
+        song = {}
+        for j, field in enumerate(FIELDS):
+            string_id = self.columns[row + j]
+            if string_id != MISSING and field in fields:
+                song[field] = self.string(string_id).decode("utf-8")
+        return song
+
+    def songs(self, fields=FIELDS):
+        # Songs in the order of the library, with only the given fields decoded
+        return (self.song(i, fields) for i in range(self.nb_songs))
+
+    def __iter__(self):
+        return self.songs()
+
+    def find(self, artist, title):
+        # Indexes of the songs of a normalized (artist, title), in library order
+        target = KEY_SEPARATOR.join((artist, title)).encode("utf-8")
+
+        def key(i):
+            return self.string(self.keys[i])
+
+        found = []
+        position = bisect_left(self.by_key, target, key=key)
+        while position < len(self.by_key) and key(self.by_key[position]) == target:
+            found.append(self.by_key[position])
+            position += 1
+        return found
+
+    def find_file(self, path):
+        # Index of the song of a file or None
+        target = path.encode("utf-8")
+
+        def key(i):
+            return self.string(self.columns[i * len(FIELDS)])
+
+        position = bisect_left(self.by_file, target, key=key)
+        if position < len(self.by_file) and key(self.by_file[position]) == target:
+            return self.by_file[position]
+        return None
+
+    def index(self, tags=False):
+        return SnapshotIndex(self, tags)
+
+    def tag_artists(self):
+        return SnapshotArtists(self)
+
+
+class SnapshotIndex:
+    # Same lookups as the dict of library_lib.build_index
+    def __init__(self, snapshot, tags=False):
+        self.snapshot = snapshot
+        self.tags = tags
+
+    def get(self, key, default=None):
+        found = self.snapshot.find(*key)
+        if not found:
+            return default
+        if self.tags:
+            return [self.snapshot.song(i) for i in found]
+        return [self.snapshot.song(i, ("file",))["file"] for i in found]
+
+
+class SnapshotArtists:
+    # Same lookups as the dict of tag_lib.load_tag_artists
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def get(self, path, default=None):
+        i = self.snapshot.find_file(path)
+        if i is None:
+            return default
+        return song_artists(self.snapshot.song(i, ("Artist", "AlbumArtist"))) or default
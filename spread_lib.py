@@ -0,0 +1,47 @@
+import heapq
+import zlib
+from collections import deque
+
+from artist_lib import fold_case
+
+
+def track_artist(track, sep="/"):
+    return fold_case(track.split(sep)[0].strip())
+
+
+def jitter(track, seed):
+    # In [0, 1), from the seed and the track only: a track keeps its draw when the
+    # rest of the playlist changes
+    return zlib.crc32(f"{seed}:{track}".encode("utf-8")) / 2**32
+
+
+def spread_tracks(tracks, gap, seed=0, sep="/"):
+    # Tracks reordered with at least gap other tracks between two tracks of the
+    # same artist, when there are enough artists left. Greedy: the next track is the
+    # oldest one (position shifted by less than gap tracks by the seed) among the
+    # artists not played in the last gap tracks. Artists wait in a heap by their
+    # next track, or in a queue after being played: O(n log k) for k artists
+    queues = {}
+    for position, track in enumerate(tracks):
+        queue = queues.setdefault(track_artist(track, sep), deque())
+        queue.append((position + jitter(track, seed) * gap, position, track))
+
+    heap = [(*queue[0][:2], artist) for artist, queue in queues.items()]
+    heapq.heapify(heap)
+    # (index from which the artist can be played again, artist), in index order
+    waiting = deque()
+    spread = []
+    while heap or waiting:
+        while waiting and waiting[0][0] <= len(spread):
+            artist = waiting.popleft()[1]
+            heapq.heappush(heap, (*queues[artist][0][:2], artist))
+        if heap:
+            artist = heapq.heappop(heap)[2]
+        else:
+            # Not enough artists left to keep the gap, the first one released goes
+            artist = waiting.popleft()[1]
+        queue = queues[artist]
+        spread.append(queue.popleft()[2])
+        if queue:
+            waiting.append((len(spread) + gap, artist))
+    return spread
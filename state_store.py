@@ -0,0 +1,41 @@
+import argparse
+
+from create_playlists import STORE_FILE_NAME, input_files
+from store_lib import TABLES, StateStore
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Import the input files in the SQLite store of create_playlists.py --store, or export them from it."
+    )
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("--store", default=STORE_FILE_NAME)
+    parser.add_argument(
+        "--file",
+        choices=list(TABLES),
+        action="append",
+        help="Only this input file, can be repeated (default: all of them)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = {
+        k: v
+        for k, v in input_files().items()
+        if k in TABLES and (not args.file or k in args.file)
+    }
+
+    with StateStore(args.store) as store:
+        if args.action == "import":
+            imported = store.sync(files, force=True)
+            print(f"{len(imported)} files imported in {args.store}.")
+        else:
+            for name, filename in files.items():
+                if store.export_file(name, filename):
+                    print(f"{filename} exported.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import sqlite3
+
+
+def parse_fields(nb_fields, skip_empty=False):
+    # Same fields as the read_* functions of playlist_lib, None for a line they
+    # would fail on
+    def parse(line):
+        if skip_empty and not line.strip():
+            return ()
+        fields = line.strip().split(";")
+        if len(fields) < nb_fields:
+            return None
+        return fields[0], fields[1]
+
+    return parse
+
+
+# Table of each parsed input file: columns parsed from the lines, parser and
+# indexed columns. The track lists need no parsing and are read from their files
+TABLES = {
+    "playlists": (("playlist_id", "name"), parse_fields(2), None),
+    "artists": (("playlist_id", "artist"), parse_fields(2), None),
+    "aliases": (("alias", "artist"), parse_fields(2, skip_empty=True), None),
+    "fix": (("track", "path"), parse_fields(2), ("track",)),
+}
+
+
+def file_signature(filename):
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class StateStore:
+    # The parsed input files of the pipeline in SQLite, one table per file. Each row keeps
+    # its line as read (with its line terminator, for a lossless export) and the
+    # fields parsed from it, NULL for a malformed line. A file is imported again
+    # only when its size or mtime changed, in a single transaction
+    def __init__(self, db_file):
+        self.conn = sqlite3.connect(db_file)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS files"
+                " (name TEXT PRIMARY KEY, size INTEGER, mtime INTEGER)"
+            )
+            for name, (columns, _, indexed) in TABLES.items():
+                self.conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name}"
+                    f" (position INTEGER PRIMARY KEY, line TEXT, {', '.join(columns)})"
+                )
+                if indexed:
+                    self.conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {name}_{indexed[0]}"
+                        f" ON {name} ({', '.join(indexed)})"
+                    )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def signature(self, name):
+        row = self.conn.execute(
+            "SELECT size, mtime FROM files WHERE name = ?", (name,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def rows(self, name, filename):
+        # Lines streamed from the file, never loaded at once
+        columns, parse, _ = TABLES[name]
+        with open(filename, "r", encoding="utf-8", newline="") as f:
+            for position, line in enumerate(f):
+                fields = parse(line)
+                if fields is None:
+                    print(
+                        f"WARNING: line {position + 1} of {filename} is malformed, skipped."
+                    )
+                yield (position, line, *(fields or (None,) * len(columns)))
+
+    def import_file(self, name, filename):
+        signature = file_signature(filename)
+        columns, _, _ = TABLES[name]
+        self.conn.execute(f"DELETE FROM {name}")
+        self.conn.execute("DELETE FROM files WHERE name = ?", (name,))
+        if signature is None:
+            return
+        placeholders = ", ".join("?" * (len(columns) + 2))
+        self.conn.executemany(
+            f"INSERT INTO {name} VALUES ({placeholders})", self.rows(name, filename)
+        )
+        self.conn.execute("INSERT INTO files VALUES (?, ?, ?)", (name, *signature))
+
+    def sync(self, files, force=False):
+        # Imports the files of {name: filename} changed since the last import,
+        # returns their names
+        imported = []
+        with self.conn:
+            for name, filename in files.items():
+                if force or file_signature(filename) != self.signature(name):
+                    self.import_file(name, filename)
+                    imported.append(name)
+        return imported
+
+    def export_file(self, name, filename):
+        # Writes the lines of a table back, the file is then up to date in the store
+        if self.signature(name) is None:
+            return False
+        tmp_file = f"{filename}.tmp"
+        with open(tmp_file, "w", encoding="utf-8", newline="") as f:
+            for (line,) in self.conn.execute(
+                f"SELECT line FROM {name} ORDER BY position"
+            ):
+                f.write(line)
+        os.replace(tmp_file, filename)
+        with self.conn:
+            self.conn.execute(
+                "UPDATE files SET size = ?, mtime = ? WHERE name = ?",
+                (*file_signature(filename), name),
+            )
+        return True
+
+    def count(self, name):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+
+    def pairs(self, name):
+        columns, _, _ = TABLES[name]
+        return self.conn.execute(
+            f"SELECT {columns[0]}, {columns[1]} FROM {name}"
+            f" WHERE {columns[0]} IS NOT NULL ORDER BY position"
+        ).fetchall()
+
+    def playlist_dict(self):
+        return dict(self.pairs("playlists"))
+
+    def artist_list(self):
+        # (artist, playlist_id) as read_artist_list
+        return [(artist, playlist_id) for playlist_id, artist in self.pairs("artists")]
+
+    def alias_list(self):
+        return self.pairs("aliases")
+
+    def missing_dict(self):
+        return dict(self.pairs("fix"))
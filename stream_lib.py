@@ -0,0 +1,157 @@
+import hashlib
+import heapq
+import itertools
+import os
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+
+from playlist_lib import (
+    is_unchanged,
+    load_manifest,
+    open_tmp_file,
+    playlist_filename,
+    playlist_id_width,
+    playlist_name,
+    record_written,
+    remove_stale_files,
+    save_manifest,
+)
+
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+# Rough size of a buffered (ordinal, seq, track) tuple on top of the track string
+ENTRY_OVERHEAD = 120
+BLOCK_SIZE = 64 * 1024
+
+
+def iter_lines(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            yield line.strip()
+
+
+def iter_fields(filename):
+    for line in iter_lines(filename):
+        yield line.split(";")
+
+
+def reverse_lines(filename, block_size=BLOCK_SIZE):
+    # Same lines as iter_lines, last to first, reading the file backwards by blocks
+    with open(filename, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        if position == 0:
+            return
+        f.seek(position - 1)
+        skip_last = f.read(1) == b"\n"
+        remainder = b""
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            lines = (f.read(size) + remainder).split(b"\n")
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                if skip_last:
+                    skip_last = False
+                    continue
+                yield line.decode("utf-8").strip()
+        yield remainder.decode("utf-8").strip()
+
+
+def _spill(buffer, spill_dir):
+    fd, run_file = tempfile.mkstemp(dir=spill_dir, suffix=".run")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.writelines(f"{ordinal}\t{seq}\t{track}\n" for ordinal, seq, track in buffer)
+    return run_file
+
+
+def _read_run(run_file):
+    with open(run_file, "r", encoding="utf-8") as f:
+        for line in f:
+            ordinal, seq, track = line.rstrip("\n").split("\t", 2)
+            yield int(ordinal), int(seq), track
+
+
+def group_playlists(pairs, playlist_dict, memory_budget=DEFAULT_MEMORY_BUDGET):
+    # Groups (playlist_id, track) pairs like build_playlists: playlists in order of
+    # first appearance, tracks in arrival order. Sorted runs are spilled to disk when
+    # the buffer exceeds memory_budget bytes and merged back at the end.
+    # Each yielded track iterator must be consumed before moving to the next playlist.
+    ordinals = {}
+    buffer = []
+    buffer_size = 0
+    runs = []
+
+    with tempfile.TemporaryDirectory(prefix="playlists-") as spill_dir:
+        for seq, (playlist_id, track) in enumerate(pairs):
+            ordinal = ordinals.setdefault(playlist_id, len(ordinals))
+            buffer.append((ordinal, seq, track))
+            buffer_size += len(track) + ENTRY_OVERHEAD
+            if buffer_size > memory_budget:
+                buffer.sort()
+                runs.append(_spill(buffer, spill_dir))
+                buffer = []
+                buffer_size = 0
+
+        buffer.sort()
+        playlist_ids = list(ordinals)
+        width = playlist_id_width(playlist_dict)
+        merged = heapq.merge(*[_read_run(x) for x in runs], buffer)
+        for ordinal, group in itertools.groupby(merged, key=lambda x: x[0]):
+            playlist_id = playlist_ids[ordinal]
+            if playlist_id in playlist_dict:
+                yield (
+                    playlist_name(playlist_id, playlist_dict, width),
+                    (track for _, _, track in group),
+                )
+            else:
+                print(f"Playlist name {playlist_id} not in playlist dict.")
+
+
+def export_playlist_streams(grouped, targets, manifest_file=None):
+    # targets: (folder, path prefix, extension), all written from a single pass over
+    # the tracks of each playlist through temporary files, like write_playlist_file
+    manifest = load_manifest(manifest_file)
+    produced = {folder: set() for folder, _, _ in targets}
+    written = []
+    removed = []
+    for folder, _, _ in targets:
+        Path(folder).mkdir(parents=True, exist_ok=True)
+
+    for playlist, tracks in grouped:
+        filenames = [playlist_filename(x, playlist, ext) for x, _, ext in targets]
+        tmp_files = [f"{x}.tmp" for x in filenames]
+        digests = [hashlib.sha1() for _ in targets]
+        try:
+            with ExitStack() as stack:
+                sinks = [stack.enter_context(open_tmp_file(x)) for x in filenames]
+                separator = ""
+                for track in tracks:
+                    for (_, path, _), sink, digest in zip(targets, sinks, digests):
+                        line = f"{separator}{path}{track}"
+                        sink.write(line)
+                        digest.update(line.encode("utf-8"))
+                    separator = "\n"
+
+            for (folder, _, _), filename, tmp_file, digest in zip(
+                targets, filenames, tmp_files, digests
+            ):
+                produced[folder].add(filename)
+                if is_unchanged(filename, digest.hexdigest(), manifest):
+                    os.remove(tmp_file)
+                    continue
+                print(f"Creating {filename}.")
+                os.replace(tmp_file, filename)
+                record_written(filename, digest.hexdigest(), manifest)
+                written.append(filename)
+        except BaseException:
+            for tmp_file in tmp_files:
+                Path(tmp_file).unlink(missing_ok=True)
+            raise
+
+    if manifest_file:
+        for folder, filenames in produced.items():
+            removed += remove_stale_files(folder, filenames, manifest)
+        save_manifest(manifest_file, manifest)
+
+    return written, removed
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from mpd_playlist_lib import read_playlist
+
+DEFAULT_URL = "http://localhost:4533"
+API_VERSION = "1.16.1"
+CLIENT_NAME = "playlist-versioning"
+DEFAULT_CONNECTIONS = 4
+SEARCH_PAGE_SIZE = 500
+# Song ids sent per request, longer requests are refused by some reverse proxies
+UPDATE_BATCH_SIZE = 1000
+# Below this fraction of tracks found on the server, the paths of the server don't
+# match the playlists (navidrome reports Artist/Album/NN - Title.ext unless Report
+# Real Path is enabled for the player) and nothing is uploaded
+MIN_RESOLVED = 0.5
+
+
+class SubsonicError(Exception):
+    pass
+
+
+def get_subsonic_settings(url=None, user=None, password=None):
+    url = url or os.environ.get("SUBSONIC_URL", DEFAULT_URL)
+    user = user or os.environ.get("SUBSONIC_USER", "")
+    password = password or os.environ.get("SUBSONIC_PASSWORD", "")
+    return url.rstrip("/"), user, password
+
+
+class SubsonicClient:
+    # Requests are independent HTTP calls, a client can be shared between threads
+    def __init__(self, url=None, user=None, password=None, timeout=30):
+        self.url, self.user, self.password = get_subsonic_settings(url, user, password)
+        self.timeout = timeout
+
+    def request(self, endpoint, **params):
+        # Token authentication, list values are sent as repeated parameters
+        salt = secrets.token_hex(8)
+        token = hashlib.md5(f"{self.password}{salt}".encode("utf-8")).hexdigest()
+        params.update(
+            u=self.user, t=token, s=salt, v=API_VERSION, c=CLIENT_NAME, f="json"
+        )
+        data = urlencode(params, doseq=True).encode("utf-8")
+        try:
+            with urlopen(
+                f"{self.url}/rest/{endpoint}", data, timeout=self.timeout
+            ) as response:
+                body = json.load(response)
+        except (URLError, ValueError) as e:
+            raise SubsonicError(f"{endpoint} failed on {self.url}: {e}") from e
+        body = body.get("subsonic-response", {})
+        if body.get("status") != "ok":
+            error = body.get("error", {})
+            raise SubsonicError(
+                f"{endpoint} failed on {self.url}: {error.get('message', body)}"
+            )
+        return body
+
+    def scan_status(self):
+        status = self.request("getScanStatus").get("scanStatus", {})
+        return [status.get("lastScan"), status.get("count")]
+
+    def iter_songs(self, page_size=SEARCH_PAGE_SIZE):
+        # An empty search3 query lists the whole library on Navidrome
+        offset = 0
+        while True:
+            result = self.request(
+                "search3",
+                query="",
+                artistCount=0,
+                albumCount=0,
+                songCount=page_size,
+                songOffset=offset,
+            )
+            songs = result.get("searchResult3", {}).get("song", [])
+            yield from songs
+            if len(songs) < page_size:
+                return
+            offset += page_size
+
+    def playlists(self):
+        playlists = self.request("getPlaylists").get("playlists", {})
+        return {x["name"]: x["id"] for x in playlists.get("playlist", [])}
+
+    def playlist_song_ids(self, playlist_id):
+        playlist = self.request("getPlaylist", id=playlist_id)["playlist"]
+        return [x["id"] for x in playlist.get("entry", [])]
+
+
+class SongIdMap:
+    # Song ids keyed by path relative to the music folder, listed again only when the
+    # scan status of the server changed since the ids were saved
+    def __init__(self, cache_file, client):
+        self.cache_file = Path(cache_file)
+        self.client = client
+        self.status = client.scan_status()
+        self.ids = None
+        if self.cache_file.exists():
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("status") == self.status:
+                self.ids = data["ids"]
+
+    def load(self):
+        if self.ids is None:
+            self.ids = {x["path"]: x["id"] for x in self.client.iter_songs()}
+            self.save()
+        return self.ids
+
+    def save(self):
+        tmp_file = self.cache_file.with_name(f"{self.cache_file.name}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({"status": self.status, "ids": self.ids}, f, ensure_ascii=False)
+        os.replace(tmp_file, self.cache_file)
+
+    def resolve(self, paths, basepath):
+        ids = self.load()
+        resolved = []
+        unknown = []
+        for path in paths:
+            song_id = ids.get(path.removeprefix(basepath))
+            if song_id is None:
+                unknown.append(path)
+            else:
+                resolved.append(song_id)
+        return resolved, unknown
+
+
+def playlist_delta(current, desired):
+    # updatePlaylist can only remove by index and append: the longest prefix of desired
+    # found in order in current is kept, everything else is removed and the rest of
+    # desired is appended
+    kept = []
+    j = 0
+    for i, song_id in enumerate(current):
+        if j < len(desired) and song_id == desired[j]:
+            kept.append(i)
+            j += 1
+    kept = set(kept)
+    removed = [i for i in range(len(current)) if i not in kept]
+    return removed, desired[j:]
+
+
+def update_playlist(client, playlist_id, name, removed, added):
+    # Returns the number of requests sent
+    if playlist_id is None:
+        result = client.request(
+            "createPlaylist", name=name, songId=added[:UPDATE_BATCH_SIZE]
+        )
+        playlist_id = result["playlist"]["id"]
+        added = added[UPDATE_BATCH_SIZE:]
+        nb_requests = 1
+    elif removed or added:
+        client.request(
+            "updatePlaylist",
+            playlistId=playlist_id,
+            songIndexToRemove=removed,
+            songIdToAdd=added[:UPDATE_BATCH_SIZE],
+        )
+        added = added[UPDATE_BATCH_SIZE:]
+        nb_requests = 1
+    else:
+        return 0
+    for i in range(0, len(added), UPDATE_BATCH_SIZE):
+        client.request(
+            "updatePlaylist",
+            playlistId=playlist_id,
+            songIdToAdd=added[i : i + UPDATE_BATCH_SIZE],
+        )
+        nb_requests += 1
+    return nb_requests
+
+
+def sync_playlists(
+    client,
+    id_map,
+    folder,
+    basepath,
+    uploaded=(),
+    max_workers=DEFAULT_CONNECTIONS,
+    extension=".m3u",
+):
+    # Same as upload_playlists: every local playlist is diffed against its version on
+    # the server, and the uploaded playlists no longer in folder are deleted. Each
+    # playlist is read, diffed and updated on its own connection, at most max_workers
+    # at a time, a failed one is diffed again by the next upload
+    existing = client.playlists()
+    local = {x.stem: x for x in sorted(Path(folder).glob(f"*{extension}"))}
+    names = sorted(local)
+    # Resolved before any upload, to never upload truncated playlists
+    id_map.load()
+    resolved = {}
+    unknown = set()
+    nb_tracks = nb_unknown = 0
+    for name in names:
+        resolved[name], missing = id_map.resolve(read_playlist(local[name]), basepath)
+        unknown.update(missing)
+        nb_tracks += len(resolved[name]) + len(missing)
+        nb_unknown += len(missing)
+    if nb_tracks and (nb_tracks - nb_unknown) / nb_tracks < MIN_RESOLVED:
+        raise SubsonicError(
+            f"only {nb_tracks - nb_unknown} of {nb_tracks} tracks found on {client.url}, "
+            f"enable Report Real Path for the {CLIENT_NAME} player in navidrome"
+        )
+
+    def sync(name):
+        # Returns the number of requests sent, None if the playlist failed
+        playlist_id = existing.get(name)
+        try:
+            current = (
+                [] if playlist_id is None else client.playlist_song_ids(playlist_id)
+            )
+            return update_playlist(
+                client, playlist_id, name, *playlist_delta(current, resolved[name])
+            )
+        except SubsonicError as e:
+            print(f"WARNING: can't upload {name}: {e}.")
+            return None
+
+    def delete(name):
+        try:
+            client.request("deletePlaylist", id=existing[name])
+        except SubsonicError as e:
+            print(f"WARNING: can't delete {name}: {e}.")
+            return None
+        return 1
+
+    to_delete = sorted((set(uploaded) & set(existing)) - set(local))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        synced = list(executor.map(sync, names))
+        removed = list(executor.map(delete, to_delete))
+    failed = [x for x, y in zip(names + to_delete, synced + removed) if y is None]
+    deleted = [x for x, y in zip(to_delete, removed) if y is not None]
+    nb_requests = sum(x for x in synced + removed if x is not None)
+    if unknown:
+        print(f"WARNING: {len(unknown)} tracks not found on {client.url}.")
+    return names, deleted, failed, nb_requests
@@ -0,0 +1,115 @@
+import json
+import os
+import queue
+import shutil
+import threading
+from pathlib import Path
+
+DEFAULT_TIMEOUT = 30.0
+
+# Sync thread of each target, a timed out one can still be writing
+_running = {}
+
+
+def atomic_copy(source, destination):
+    # Readers of the target (mpd, navidrome) never see a partially written playlist
+    tmp_file = f"{destination}.tmp"
+    shutil.copy2(source, tmp_file)
+    os.replace(tmp_file, destination)
+
+
+def list_files(folder):
+    with os.scandir(folder) as entries:
+        return {x.name for x in entries if x.is_file()}
+
+
+def file_signature(filename):
+    stat = os.stat(filename)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def sync_folder(folder, target, record):
+    # record: {name: signature} of the files of folder at their last copy to target.
+    # Only the files of folder are stat'ed: the ones changed since their copy (or by a
+    # run without --sync, or while the target was unreachable) and the ones missing at
+    # the target are copied, and the recorded files no longer in folder are deleted.
+    # Returns the record of this sync
+    target = Path(target).expanduser()
+    target.mkdir(parents=True, exist_ok=True)
+    present = list_files(target)
+    synced = {}
+    copied = []
+    for name in sorted(list_files(folder)):
+        signature = file_signature(Path(folder) / name)
+        if name not in present or record.get(name) != signature:
+            atomic_copy(Path(folder) / name, target / name)
+            copied.append(str(target / name))
+        synced[name] = signature
+
+    deleted = []
+    for name in sorted((set(record) - set(synced)) & present):
+        (target / name).unlink()
+        deleted.append(str(target / name))
+    return copied, deleted, synced
+
+
+def load_record(record_file):
+    if record_file and Path(record_file).exists():
+        with open(record_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_record(record_file, record):
+    tmp_file = f"{record_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    os.replace(tmp_file, record_file)
+
+
+def sync_targets(targets, record_file=None, timeout=DEFAULT_TIMEOUT):
+    # targets: (exported folder, target folder), synced concurrently on daemon
+    # threads so that a hung network mount can't block the others or the exit. A
+    # target whose sync timed out is skipped until that sync ends, two syncs would
+    # write the same temporary files. The record of each target synced is saved in
+    # record_file, a failed or timed out target keeps its previous record
+    record = load_record(record_file)
+    results = queue.Queue()
+
+    def sync(folder, target):
+        try:
+            result = sync_folder(folder, target, record.get(target, {}))
+        except OSError as e:
+            print(f"WARNING: can't sync {folder} to {target}: {e}.")
+            result = None
+        results.put((target, result))
+
+    synced = {}
+    started = []
+    for folder, target in targets:
+        if target in _running and _running[target].is_alive():
+            print(f"WARNING: the previous sync to {target} is still running, skipped.")
+            synced[target] = None
+            continue
+        thread = threading.Thread(target=sync, args=(folder, target), daemon=True)
+        _running[target] = thread
+        thread.start()
+        started.append(target)
+
+    while len(synced) < len(targets):
+        try:
+            target, result = results.get(timeout=timeout)
+        except queue.Empty:
+            pending = sorted(set(started) - set(synced))
+            print(
+                f"WARNING: no answer after {timeout}s while syncing to {', '.join(pending)}."
+            )
+            break
+        synced[target] = result
+        if result:
+            copied, deleted, record[target] = result
+            synced[target] = copied, deleted
+            print(f"Synced {target}: {len(copied)} copied, {len(deleted)} deleted.")
+    if record_file:
+        save_record(record_file, record)
+    return synced
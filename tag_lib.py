@@ -0,0 +1,142 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from mpd_lib import tag_values
+from report_lib import count
+
+AUDIO_EXTENSIONS = {".flac", ".mp3", ".ogg", ".opus", ".m4a", ".mp4", ".wma", ".wav"}
+# Tags read from the files, named like the tags of mpd so that the songs of the index
+# can be used wherever songs of listallinfo are
+TAGS = {
+    "artist": "Artist",
+    "albumartist": "AlbumArtist",
+    "title": "Title",
+    "album": "Album",
+}
+# Files sent at once to a reader process
+READ_CHUNK_SIZE = 64
+
+
+def read_tags(filename):
+    # mutagen is only needed to index a library without mpd
+    import mutagen
+
+    try:
+        audio = mutagen.File(filename, easy=True)
+    except (OSError, mutagen.MutagenError):
+        return None
+    if audio is None:
+        return {}
+    tags = {v: audio[k][0] for k, v in TAGS.items() if audio.get(k)}
+    if audio.info is not None and getattr(audio.info, "length", None):
+        tags["duration"] = f"{audio.info.length:.3f}"
+    return tags
+
+
+def walk_library(basepath, extensions=AUDIO_EXTENSIONS):
+    # (path relative to basepath, size, mtime) of each audio file by path order, one
+    # scandir per directory and the stat results of the listing
+    stack = [Path(basepath)]
+    while stack:
+        directory = stack.pop()
+        count("directory_listings")
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda x: x.name)
+        except OSError as e:
+            print(f"WARNING: can't list {directory}: {e}.")
+            continue
+        directories = []
+        for entry in entries:
+            if entry.is_dir():
+                directories.append(Path(entry.path))
+            elif os.path.splitext(entry.name)[1].lower() in extensions:
+                stat = entry.stat()
+                path = os.path.relpath(entry.path, basepath).replace(os.sep, "/")
+                yield path, stat.st_size, stat.st_mtime_ns
+        # Popped by name order
+        stack.extend(reversed(directories))
+
+
+class TagCache:
+    # {path: [size, mtime, tags]} of the last index, a file is read again only when
+    # its size or mtime changed
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.entries = {}
+        if cache_file and Path(cache_file).exists():
+            with open(cache_file, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, path, size, mtime):
+        entry = self.entries.get(path)
+        if entry is None or entry[0] != size or entry[1] != mtime:
+            return None
+        return entry[2]
+
+    def save(self):
+        if not self.cache_file:
+            return
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_file, self.cache_file)
+
+
+def index_library(
+    basepath, cache_file=None, max_workers=None, reader=read_tags, executor=None
+):
+    # Songs of the library as {"file": path relative to basepath, tag: value}, the
+    # changed files being read on a process pool
+    cache = TagCache(cache_file)
+    files = list(walk_library(basepath))
+    entries = {}
+    pending = []
+    for path, size, mtime in files:
+        tags = cache.get(path, size, mtime)
+        if tags is None:
+            pending.append((path, size, mtime))
+        else:
+            entries[path] = [size, mtime, tags]
+
+    if pending:
+        filenames = [os.path.join(basepath, x) for x, _, _ in pending]
+        if executor is None and len(pending) > READ_CHUNK_SIZE:
+            with ProcessPoolExecutor(max_workers) as pool:
+                results = list(pool.map(reader, filenames, chunksize=READ_CHUNK_SIZE))
+        else:
+            results = list((executor.map if executor else map)(reader, filenames))
+        for (path, size, mtime), tags in zip(pending, results):
+            if tags is None:
+                print(f"WARNING: can't read the tags of {path}.")
+                continue
+            entries[path] = [size, mtime, tags]
+    count("tag_reads", len(pending))
+    print(f"{len(files)} files indexed, {len(pending)} read.")
+
+    cache.entries = entries
+    cache.save()
+    return [
+        {"file": path, **entries[path][2]} for path, _, _ in files if path in entries
+    ]
+
+
+def song_artists(tags):
+    return list(
+        dict.fromkeys(
+            name for x in ("Artist", "AlbumArtist") for name in tag_values(tags, x)
+        )
+    )
+
+
+def load_tag_artists(cache_file):
+    # {path: artist names of the file}, from the cache of the last index
+    cache = TagCache(cache_file)
+    artists = {}
+    for path, (_, _, tags) in cache.entries.items():
+        names = song_artists(tags)
+        if names:
+            artists[path] = names
+    return artists
@@ -57,3 +57,27 @@ def test_files_dir(temp_dir, fixture_dir):
         shutil.copy(fixture_file, files_dir / fixture_file.name)
 
     return temp_dir
+
+
+@pytest.fixture
+def fake_mpd():
+    from fake_mpd import FakeMPD
+
+    with FakeMPD() as server:
+        yield server
+
+
+@pytest.fixture
+def fake_subsonic():
+    from fake_subsonic import FakeSubsonic
+
+    with FakeSubsonic() as server:
+        yield server
+
+
+@pytest.fixture
+def fake_lastfm():
+    from fake_lastfm import FakeLastfm
+
+    with FakeLastfm() as server:
+        yield server
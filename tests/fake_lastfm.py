@@ -0,0 +1,87 @@
+"""
+Minimal in-process last.fm API serving user.getlovedtracks.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeLastfm:
+    def __init__(self, loved=None, user="dbeley", api_key="key"):
+        # loved: (timestamp, artist, title), oldest first like the loves happened
+        self.loved = list(loved or [])
+        self.user = user
+        self.api_key = api_key
+        self.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/2.0/"
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {
+                    k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()
+                }
+                fake.requests.append(params)
+                data = json.dumps(fake.execute(params)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def love(self, timestamp, artist, title):
+        self.loved.append((timestamp, artist, title))
+
+    def execute(self, params):
+        if params.get("api_key") != self.api_key:
+            return {"error": 10, "message": "Invalid API key"}
+        if params.get("method") != "user.getlovedtracks":
+            return {"error": 3, "message": "Invalid Method"}
+        if params.get("user") != self.user:
+            return {"error": 6, "message": "User not found"}
+
+        page = int(params.get("page", 1))
+        limit = int(params.get("limit", 50))
+        loved = sorted(self.loved, reverse=True)
+        tracks = [
+            {
+                "name": title,
+                "artist": {"name": artist, "url": ""},
+                "date": {"uts": str(timestamp), "#text": ""},
+            }
+            for timestamp, artist, title in loved[(page - 1) * limit : page * limit]
+        ]
+        return {
+            "lovedtracks": {
+                "track": tracks,
+                "@attr": {
+                    "user": self.user,
+                    "page": str(page),
+                    "perPage": str(limit),
+                    "total": str(len(loved)),
+                    "totalPages": str(max(1, -(-len(loved) // limit))),
+                },
+            }
+        }
@@ -0,0 +1,223 @@
+"""
+Minimal in-process MPD server speaking enough of the protocol for the tests.
+"""
+
+import queue
+import re
+import socketserver
+import threading
+from datetime import datetime
+
+FILTER_PATTERN = re.compile(r'\((\w+) == "((?:[^"\\]|\\.)*)"\)')
+MODIFIED_SINCE_PATTERN = re.compile(r"\(modified-since '(\d+)'\)")
+
+
+def unescape(value):
+    return re.sub(r"\\(.)", r"\1", value)
+
+
+def split_args(line):
+    args = []
+    i = 0
+    while i < len(line):
+        if line[i] == " ":
+            i += 1
+        elif line[i] == '"':
+            j = i + 1
+            value = []
+            while line[j] != '"':
+                if line[j] == "\\":
+                    j += 1
+                value.append(line[j])
+                j += 1
+            args.append("".join(value))
+            i = j + 1
+        else:
+            j = line.find(" ", i)
+            j = len(line) if j == -1 else j
+            args.append(line[i:j])
+            i = j
+    return args
+
+
+class FakeMPD:
+    def __init__(self, songs=None, unix_path=None):
+        self.songs = list(songs or [])
+        self.commands = []
+        self.db_update = 1600000000
+        self.connections = 0
+        self.events = queue.Queue()
+        self.playlists = {}
+        if unix_path is None:
+            self.server = socketserver.ThreadingTCPServer(
+                ("127.0.0.1", 0), self._handler()
+            )
+            self.host, self.port = self.server.server_address
+        else:
+            # A path, or a name starting with a null byte for an abstract socket
+            self.server = socketserver.ThreadingUnixStreamServer(
+                unix_path, self._handler()
+            )
+            self.host, self.port = unix_path, None
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                fake.connections += 1
+                self.wfile.write(b"OK MPD 0.23.5\n")
+                command_list = None
+                for raw in self.rfile:
+                    line = raw.decode("utf-8").rstrip("\n")
+                    if line in ("command_list_ok_begin", "command_list_begin"):
+                        command_list = []
+                        list_ok = line == "command_list_ok_begin"
+                    elif line == "command_list_end":
+                        response = []
+                        for i, command in enumerate(command_list):
+                            try:
+                                response += fake.execute(command)
+                            except KeyError as e:
+                                response.append(f"ACK [50@{i}] {{}} {e.args[0]}")
+                                break
+                            if list_ok:
+                                response.append("list_OK")
+                        else:
+                            response.append("OK")
+                        self._write(response)
+                        command_list = None
+                    elif command_list is not None:
+                        command_list.append(line)
+                    elif line == "close":
+                        return
+                    else:
+                        try:
+                            self._write(fake.execute(line) + ["OK"])
+                        except KeyError as e:
+                            self._write([f"ACK [50@0] {{}} {e.args[0]}"])
+
+            def _write(self, lines):
+                self.wfile.write("".join(f"{x}\n" for x in lines).encode("utf-8"))
+
+        return Handler
+
+    def execute(self, line):
+        self.commands.append(line)
+        args = split_args(line)
+        name, args = args[0], args[1:]
+        command = getattr(self, f"cmd_{name}", None)
+        if command is None:
+            raise KeyError(f'unknown command "{name}"')
+        return command(*args)
+
+    def format_songs(self, songs):
+        lines = []
+        for song in songs:
+            lines.append(f"file: {song['file']}")
+            for key, values in song.items():
+                if key != "file":
+                    values = values if isinstance(values, list) else [values]
+                    lines += [f"{key}: {x}" for x in values]
+        return lines
+
+    def cmd_ping(self):
+        return []
+
+    def cmd_password(self, password):
+        return []
+
+    def cmd_search(self, expression):
+        conditions = [
+            (tag.lower(), unescape(value).lower())
+            for tag, value in FILTER_PATTERN.findall(expression)
+        ]
+        songs = [
+            song
+            for song in self.songs
+            if all(
+                any(k.lower() == tag and v.lower() == value for k, v in song.items())
+                for tag, value in conditions
+            )
+        ]
+        return self.format_songs(songs)
+
+    def cmd_listallinfo(self, uri=""):
+        return self.format_songs(
+            x for x in self.songs if not uri or x["file"].startswith(f"{uri}/")
+        )
+
+    def cmd_listall(self, uri=""):
+        return [f"file: {x['file']}" for x in self.songs]
+
+    def cmd_lsinfo(self, uri=""):
+        # A song, or the top-level directories and the songs of the root
+        if uri:
+            return self.format_songs([x for x in self.songs if x["file"] == uri])
+        directories = dict.fromkeys(
+            x["file"].split("/")[0] for x in self.songs if "/" in x["file"]
+        )
+        return [f"directory: {x}" for x in directories] + self.format_songs(
+            x for x in self.songs if "/" not in x["file"]
+        )
+
+    def cmd_find(self, expression):
+        # Only modified-since, on the Last-Modified tag of the songs
+        since = int(MODIFIED_SINCE_PATTERN.fullmatch(expression).group(1))
+        return self.format_songs(
+            x
+            for x in self.songs
+            if "Last-Modified" in x
+            and datetime.fromisoformat(x["Last-Modified"]).timestamp() > since
+        )
+
+    def update_database(self, songs):
+        # Replaces the library and wakes up the clients idling on "database"
+        self.songs = list(songs)
+        self.db_update += 1
+        self.events.put("database")
+
+    def cmd_idle(self, *subsystems):
+        return [f"changed: {self.events.get()}"]
+
+    def stored_playlist(self, name):
+        if name not in self.playlists:
+            raise KeyError("No such playlist")
+        return self.playlists[name]
+
+    def cmd_listplaylists(self):
+        return [f"playlist: {x}" for x in self.playlists]
+
+    def cmd_listplaylist(self, name):
+        return [f"file: {x}" for x in self.stored_playlist(name)]
+
+    def cmd_playlistadd(self, name, uri, position=None):
+        tracks = self.playlists.setdefault(name, [])
+        tracks.insert(len(tracks) if position is None else int(position), uri)
+        return []
+
+    def cmd_playlistdelete(self, name, position):
+        del self.stored_playlist(name)[int(position)]
+        return []
+
+    def cmd_playlistmove(self, name, start, end):
+        tracks = self.stored_playlist(name)
+        tracks.insert(int(end), tracks.pop(int(start)))
+        return []
+
+    def cmd_rm(self, name):
+        del self.playlists[name]
+        return []
+
+    def cmd_stats(self):
+        return [f"songs: {len(self.songs)}", f"db_update: {self.db_update}"]
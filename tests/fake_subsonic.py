@@ -0,0 +1,144 @@
+"""
+Minimal in-process Subsonic server implementing the endpoints used by subsonic_lib.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeSubsonic:
+    def __init__(self, songs=None, user="admin", password="secret"):
+        # songs: {id: path relative to the music folder}
+        self.songs = dict(songs or {})
+        self.user = user
+        self.password = password
+        self.playlists = {}
+        self.requests = []
+        self.last_scan = "2024-01-01T00:00:00Z"
+        self.active = 0
+        self.max_active = 0
+        self.delay = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                params = parse_qs(
+                    self.rfile.read(length).decode("utf-8"), keep_blank_values=True
+                )
+                endpoint = urlsplit(self.path).path.rsplit("/", 1)[-1]
+                with fake._lock:
+                    fake.active += 1
+                    fake.max_active = max(fake.max_active, fake.active)
+                try:
+                    time.sleep(fake.delay)
+                    body = fake.execute(endpoint, params)
+                finally:
+                    with fake._lock:
+                        fake.active -= 1
+                data = json.dumps({"subsonic-response": body}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def execute(self, endpoint, params):
+        with self._lock:
+            self.requests.append((endpoint, params))
+            token = hashlib.md5(
+                f"{self.password}{params['s'][0]}".encode("utf-8")
+            ).hexdigest()
+            if params["u"] != [self.user] or params["t"] != [token]:
+                return {"status": "failed", "error": {"code": 40, "message": "Wrong"}}
+            command = getattr(self, f"api_{endpoint}", None)
+            if command is None:
+                return {"status": "failed", "error": {"code": 0, "message": endpoint}}
+            try:
+                return {"status": "ok", **command(params)}
+            except KeyError as e:
+                return {"status": "failed", "error": {"code": 70, "message": str(e)}}
+
+    def endpoints(self):
+        return [x for x, _ in self.requests]
+
+    def stored_playlist(self, name):
+        return next(x["songs"] for x in self.playlists.values() if x["name"] == name)
+
+    def api_getScanStatus(self, params):
+        return {"scanStatus": {"lastScan": self.last_scan, "count": len(self.songs)}}
+
+    def api_search3(self, params):
+        offset = int(params["songOffset"][0])
+        count = int(params["songCount"][0])
+        songs = list(self.songs.items())[offset : offset + count]
+        return {"searchResult3": {"song": [{"id": k, "path": v} for k, v in songs]}}
+
+    def api_getPlaylists(self, params):
+        return {
+            "playlists": {
+                "playlist": [
+                    {"id": k, "name": v["name"], "songCount": len(v["songs"])}
+                    for k, v in self.playlists.items()
+                ]
+            }
+        }
+
+    def api_getPlaylist(self, params):
+        playlist = self.playlists[params["id"][0]]
+        entries = [{"id": x, "path": self.songs[x]} for x in playlist["songs"]]
+        return {
+            "playlist": {
+                "id": params["id"][0],
+                "name": playlist["name"],
+                "entry": entries,
+            }
+        }
+
+    def api_createPlaylist(self, params):
+        playlist_id = f"pl{self._next_id}"
+        self._next_id += 1
+        self.playlists[playlist_id] = {
+            "name": params["name"][0],
+            "songs": params.get("songId", []),
+        }
+        return self.api_getPlaylist({"id": [playlist_id]})
+
+    def api_updatePlaylist(self, params):
+        playlist = self.playlists[params["playlistId"][0]]
+        removed = {int(x) for x in params.get("songIndexToRemove", [])}
+        playlist["songs"] = [
+            x for i, x in enumerate(playlist["songs"]) if i not in removed
+        ] + params.get("songIdToAdd", [])
+        return {}
+
+    def api_deletePlaylist(self, params):
+        del self.playlists[params["id"][0]]
+        return {}
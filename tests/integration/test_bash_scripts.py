@@ -101,7 +101,7 @@ class TestBashScriptFormat:
             "#!/bin/bash"
         )
         assert "usage()" in content or "Usage:" in content
-        assert "mpc search" in content
+        assert "mplaylist.py" in content
         assert "OUTPUT_FILE" in content
 
     def test_mpd_playlists_script_format(self):
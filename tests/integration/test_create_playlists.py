@@ -4,6 +4,7 @@ Tests file I/O and integration between components.
 """
 
 import pytest
+from mpd_playlist_lib import read_playlist
 
 
 @pytest.mark.integration
@@ -244,3 +245,443 @@ class TestErrorHandling:
                 files_dir / "playlists.csv",
                 files_dir / "artists.csv",
             )
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsStreaming:
+    def test_stream_mode_matches_default_mode(self, test_files_dir, monkeypatch):
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+
+        outputs = {}
+        for mode, argv in [("default", []), ("stream", ["--stream"])]:
+            create_playlists.main(argv)
+            outputs[mode] = {
+                str(path.relative_to(test_files_dir)): path.read_text()
+                for folder in ["playlists", "mpd_playlists", "raw_playlists"]
+                for path in (test_files_dir / folder).iterdir()
+            }
+            for folder in ["playlists", "mpd_playlists", "raw_playlists"]:
+                for path in (test_files_dir / folder).iterdir():
+                    path.unlink()
+            (files_dir / ".export-manifest.json").unlink()
+
+        assert outputs["default"] == outputs["stream"]
+        assert "playlists/1_Rock.m3u" in outputs["stream"]
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsReport:
+    @pytest.mark.parametrize("argv", [[], ["--stream"]])
+    def test_report_and_profile(self, test_files_dir, monkeypatch, argv):
+        import json
+        import pstats
+
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+
+        create_playlists.main(
+            argv + ["--report", "report.json", "--profile", "run.prof"]
+        )
+
+        report = json.loads((test_files_dir / "report.json").read_text())
+        names = [x["name"] for x in report["spans"]]
+        assert names[:3] == ["parse", "artist_dict", "resolve_missing"]
+        assert "export:raw_playlists" in names
+        assert report["counters"]["favorite_lines"] > 0
+        assert report["counters"]["matches"] > 0
+        assert report["counters"]["bytes_written"] > 0
+        assert report["counters"]["stat_calls"] > 0
+        assert report["peak_memory"] > 0
+        assert pstats.Stats(str(test_files_dir / "run.prof")).total_calls > 0
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsWatch:
+    def test_watch_updates_playlists(self, test_files_dir, monkeypatch, capsys):
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+        changes = iter(["artists", "bad", "artists"])
+
+        class Watcher:
+            def wait(self):
+                change = next(changes, None)
+                if change is None:
+                    raise KeyboardInterrupt
+                if change == "bad":
+                    (files_dir / "02_artists.csv").write_text("1")
+                else:
+                    (files_dir / "02_artists.csv").write_text("3;Artist Two")
+                return ["artists"]
+
+        create_playlists.watch_playlists(0, Watcher())
+
+        assert (test_files_dir / "playlists/3_Jazz.m3u").read_text() == (
+            "/music/Artist Two/Album Two/02 Track Two.mp3"
+        )
+        assert not (test_files_dir / "playlists/1_Rock.m3u").exists()
+        out = capsys.readouterr().out
+        assert "WARNING: can't parse artists" in out
+        assert "Updated 3 playlists" in out
+
+    def test_watch_retries_after_os_error(self, test_files_dir, monkeypatch, capsys):
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+        changes = iter(["unreadable"])
+        artists = files_dir / "02_artists.csv"
+
+        class Watcher:
+            def wait(self):
+                if next(changes, None) is None:
+                    raise KeyboardInterrupt
+                artists.unlink()
+                artists.mkdir()
+                return ["artists"]
+
+        def sleep(seconds):
+            # The file is readable again by the next poll
+            artists.rmdir()
+            artists.write_text("3;Artist Two")
+
+        monkeypatch.setattr(create_playlists.time, "sleep", sleep)
+        create_playlists.watch_playlists(0, Watcher())
+
+        assert (test_files_dir / "playlists/3_Jazz.m3u").read_text() == (
+            "/music/Artist Two/Album Two/02 Track Two.mp3"
+        )
+        out = capsys.readouterr().out
+        assert "Is a directory" in out and "Retrying in 0s" in out
+        assert "Updated 3 playlists" in out
+
+    @pytest.mark.parametrize(
+        "option",
+        [["--upload"], ["--navidrome"], ["--report", "r.json"], ["--profile", "p"]],
+    )
+    def test_watch_with_option_handled_once(self, option):
+        # Applied after a single export only, they would be ignored by --watch
+        import create_playlists
+
+        with pytest.raises(SystemExit):
+            create_playlists.parse_args(["--watch", *option])
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsSync:
+    def test_sync_only_changed_playlists(self, test_files_dir, monkeypatch):
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+        target = test_files_dir / "mpd"
+        monkeypatch.setattr(
+            create_playlists, "SYNC_TARGETS", [("mpd_playlists", str(target))]
+        )
+
+        create_playlists.main(["--sync"])
+        assert sorted(x.name for x in target.iterdir()) == ["1_Rock.m3u", "2_Pop.m3u"]
+
+        mtime = (target / "2_Pop.m3u").stat().st_mtime_ns
+        (files_dir / "02_artists.csv").write_text("2;Artist Two\n2;Artist One")
+        create_playlists.main(["--sync"])
+
+        assert [x.name for x in target.iterdir()] == ["2_Pop.m3u"]
+        assert (target / "2_Pop.m3u").stat().st_mtime_ns == mtime
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsUpload:
+    def test_upload_only_changed_playlists(self, test_files_dir, monkeypatch, fake_mpd):
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+        monkeypatch.setenv("MPD_HOST", fake_mpd.host)
+        monkeypatch.setenv("MPD_PORT", str(fake_mpd.port))
+
+        create_playlists.main(["--upload"])
+        stored = dict(fake_mpd.playlists)
+        assert sorted(stored) == ["1_Rock", "2_Pop"]
+        assert stored["1_Rock"] == read_playlist("mpd_playlists/1_Rock.m3u")
+
+        fake_mpd.commands.clear()
+        (files_dir / "02_artists.csv").write_text("2;Artist Two\n2;Artist One")
+        create_playlists.main(["--upload"])
+
+        assert "1_Rock" not in fake_mpd.playlists
+        assert fake_mpd.playlists["2_Pop"] == read_playlist("mpd_playlists/2_Pop.m3u")
+        assert fake_mpd.commands[-1] == 'rm "1_Rock"'
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsNavidrome:
+    def test_upload_only_changed_playlists(
+        self, test_files_dir, monkeypatch, fake_subsonic
+    ):
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+        monkeypatch.setenv("SUBSONIC_URL", fake_subsonic.url)
+        monkeypatch.setenv("SUBSONIC_USER", fake_subsonic.user)
+        monkeypatch.setenv("SUBSONIC_PASSWORD", fake_subsonic.password)
+        fake_subsonic.songs = {
+            "1": "Artist One/Album One/01 Track One.mp3",
+            "2": "Artist Two/Album Two/02 Track Two.mp3",
+            "3": "Artist Three/Album Three/03 Track Three.mp3",
+            "4": "Artist One/Album One/04 Track Four.mp3",
+        }
+
+        create_playlists.main(["--navidrome"])
+        assert fake_subsonic.stored_playlist("1_Rock") == ["4", "3", "1"]
+        assert fake_subsonic.stored_playlist("2_Pop") == ["4", "2", "1"]
+
+        fake_subsonic.requests.clear()
+        (files_dir / "02_artists.csv").write_text("2;Artist Two\n2;Artist One")
+        create_playlists.main(["--navidrome"])
+
+        assert [x["name"] for x in fake_subsonic.playlists.values()] == ["2_Pop"]
+        assert fake_subsonic.endpoints() == [
+            "getScanStatus",
+            "getPlaylists",
+            "getPlaylist",
+            "deletePlaylist",
+        ]
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsArtistAliases:
+    @pytest.mark.parametrize("argv", [[], ["--stream"]])
+    def test_folded_artists_and_aliases(self, test_files_dir, monkeypatch, argv):
+        import json
+
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        with open(files_dir / "04_result-mplaylist.csv", "a") as f:
+            f.write(
+                "The Artist Two/Live/05 Track Five.mp3\nA3/Other/06 Track Six.mp3\n"
+            )
+        (files_dir / "09_artist-aliases.csv").write_text("A3;artist three\n")
+        monkeypatch.chdir(test_files_dir)
+
+        create_playlists.main(argv + ["--report", "report.json"])
+
+        assert "The Artist Two/Live/05 Track Five.mp3" in (
+            (test_files_dir / "mpd_playlists" / "2_Pop.m3u").read_text()
+        )
+        assert "A3/Other/06 Track Six.mp3" in (
+            (test_files_dir / "mpd_playlists" / "1_Rock.m3u").read_text()
+        )
+        assert not (files_dir / "03_artists_NOT-FOUND.csv").exists()
+        counters = json.loads((test_files_dir / "report.json").read_text())["counters"]
+        assert counters["artist_hits_article"] == 1
+        assert counters["artist_hits_alias"] == 1
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsTags:
+    def test_tag_artists(self, test_files_dir, monkeypatch):
+        import json
+
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        track = "Artist Two Quartet/Live/05 Track Five.mp3"
+        with open(files_dir / "04_result-mplaylist.csv", "a") as f:
+            f.write(f"{track}\n")
+        (files_dir / ".tag-cache.json").write_text(
+            json.dumps({track: [1, 1, {"Artist": "Artist Two"}]})
+        )
+        monkeypatch.chdir(test_files_dir)
+
+        create_playlists.main([])
+        assert (files_dir / "03_artists_NOT-FOUND.csv").read_text() == (
+            "Artist Two Quartet"
+        )
+
+        create_playlists.main(["--tags"])
+        assert track in (test_files_dir / "mpd_playlists" / "2_Pop.m3u").read_text()
+        assert not (files_dir / "03_artists_NOT-FOUND.csv").exists()
+
+    def test_tag_artists_from_snapshot(self, test_files_dir, monkeypatch):
+        import create_playlists
+        from snapshot_lib import write_snapshot
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        track = "Artist Two Quartet/Live/05 Track Five.mp3"
+        with open(files_dir / "04_result-mplaylist.csv", "a") as f:
+            f.write(f"{track}\n")
+        write_snapshot(
+            [{"file": track, "Artist": "Artist Two"}],
+            test_files_dir / "library.snapshot",
+        )
+        monkeypatch.chdir(test_files_dir)
+
+        create_playlists.main(["--tags", "--snapshot", "library.snapshot"])
+
+        assert track in (test_files_dir / "mpd_playlists" / "2_Pop.m3u").read_text()
+        assert not (files_dir / "03_artists_NOT-FOUND.csv").exists()
+
+    def test_tags_with_stream(self):
+        import create_playlists
+
+        with pytest.raises(SystemExit):
+            create_playlists.parse_args(["--tags", "--stream"])
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsStore:
+    def test_store_matches_default_mode(self, test_files_dir, monkeypatch, capsys):
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+
+        outputs = {}
+        for mode, argv in [("default", []), ("store", ["--store"])]:
+            create_playlists.main(argv)
+            outputs[mode] = {
+                str(path.relative_to(test_files_dir)): path.read_text()
+                for folder in ["playlists", "mpd_playlists", "raw_playlists"]
+                for path in (test_files_dir / folder).iterdir()
+            }
+            for folder in ["playlists", "mpd_playlists", "raw_playlists"]:
+                for path in (test_files_dir / folder).iterdir():
+                    path.unlink()
+            (files_dir / ".export-manifest.json").unlink()
+
+        assert outputs["default"] == outputs["store"]
+        assert "imported in the store" in capsys.readouterr().out
+
+        create_playlists.main(["--store"])
+
+        assert "imported in the store" not in capsys.readouterr().out
+        assert (test_files_dir / "playlists" / "1_Rock.m3u").exists()
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsSmart:
+    def test_rule_playlists(self, test_files_dir, monkeypatch):
+        pytest.importorskip("numpy")
+        import create_playlists
+        from snapshot_lib import write_snapshot
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        (files_dir / "10_smart-playlists.csv").write_text(
+            "Long Favorites;duration=300-;favorites\nEighties;year=1980-1989\n"
+        )
+        write_snapshot(
+            [
+                {"file": "Artist One/Album One/01 Track One.mp3", "duration": "320"},
+                {"file": "Artist Two/Album Two/02 Track Two.mp3", "duration": "200"},
+                {
+                    "file": "Artist Four/Album/01.flac",
+                    "Date": "1984",
+                    "duration": "400",
+                },
+            ],
+            test_files_dir / "library.snapshot",
+        )
+        monkeypatch.chdir(test_files_dir)
+
+        create_playlists.main(["--smart", "--snapshot", "library.snapshot"])
+
+        assert (test_files_dir / "playlists" / "Long Favorites.m3u").read_text() == (
+            "/music/Artist One/Album One/01 Track One.mp3"
+        )
+        assert (test_files_dir / "mpd_playlists" / "Eighties.m3u").read_text() == (
+            "Artist Four/Album/01.flac"
+        )
+        assert (test_files_dir / "playlists" / "1_Rock.m3u").exists()
+        assert not (test_files_dir / "raw_playlists" / "Eighties.txt").exists()
+
+        (files_dir / "10_smart-playlists.csv").write_text("Eighties;year=1980-1989\n")
+        create_playlists.main(["--smart", "--snapshot", "library.snapshot"])
+
+        assert not (test_files_dir / "playlists" / "Long Favorites.m3u").exists()
+
+    def test_smart_needs_snapshot(self):
+        import create_playlists
+
+        with pytest.raises(SystemExit):
+            create_playlists.parse_args(["--smart"])
+
+
+@pytest.mark.integration
+class TestCreatePlaylistsSpread:
+    def test_spread_playlists(self, test_files_dir, monkeypatch):
+        import create_playlists
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        (files_dir / "04_result-mplaylist.csv").write_text(
+            "Artist One/Album One/03.mp3\n"
+            "Artist One/Album One/02.mp3\n"
+            "Artist One/Album One/01.mp3\n"
+            "Artist Three/Album Three/02.mp3\n"
+            "Artist Three/Album Three/01.mp3\n"
+        )
+        monkeypatch.chdir(test_files_dir)
+
+        create_playlists.main(["--spread", "1"])
+
+        assert (test_files_dir / "mpd_playlists" / "1_Rock.m3u").read_text() == (
+            "Artist Three/Album Three/01.mp3\n"
+            "Artist One/Album One/01.mp3\n"
+            "Artist Three/Album Three/02.mp3\n"
+            "Artist One/Album One/02.mp3\n"
+            "Artist One/Album One/03.mp3"
+        )
+
+    @pytest.mark.parametrize("argv", [["3", "--stream"], ["0"], ["-1"]])
+    def test_invalid_spread(self, argv):
+        import create_playlists
+
+        with pytest.raises(SystemExit):
+            create_playlists.parse_args(["--spread", *argv])
@@ -0,0 +1,133 @@
+import unicodedata
+
+import pytest
+from artist_lib import ArtistIndex, fold_article, fold_case, fold_punctuation
+from playlist_lib import build_artist_dict, match_tracks, read_alias_list
+
+ARTIST_LIST = [
+    ("Red Garland Quintet", "1"),
+    ("Björk", "2"),
+    ("AC/DC", "3"),
+    ("Simon & Garfunkel", "2"),
+    ("Red Garland Quintet", "2"),
+]
+
+
+@pytest.mark.unit
+class TestFolds:
+    def test_fold_case(self):
+        nfd = unicodedata.normalize("NFD", "Björk")
+        assert nfd != "Björk"
+        assert fold_case(nfd) == fold_case("BJÖRK") == "björk"
+        assert fold_case("  Ｍｏｄｅｓｔ   Mouse ") == "modest mouse"
+
+    def test_fold_article(self):
+        assert fold_article("The Red Garland Quintet") == "red garland quintet"
+        assert fold_article("Red Garland Quintet, The") == "red garland quintet"
+        assert fold_article("The") == "the"
+        # Other articles start names too often
+        assert fold_article("A Tribe Called Quest") == "a tribe called quest"
+        assert fold_article("La Roux") == "la roux"
+
+    def test_fold_punctuation(self):
+        assert fold_punctuation("AC-DC") == fold_punctuation("AC/DC") == "acdc"
+        assert fold_punctuation("Simon and Garfunkel") == fold_punctuation(
+            "Simon & Garfunkel"
+        )
+        assert fold_punctuation("!!!") == "!!!"
+        assert fold_punctuation("...") == "..."
+
+
+@pytest.mark.unit
+class TestArtistIndex:
+    def test_same_dict_as_before(self):
+        artist_dict = build_artist_dict(ARTIST_LIST)
+
+        assert artist_dict == {
+            "Red Garland Quintet": ["1", "2"],
+            "Björk": ["2"],
+            "AC/DC": ["3"],
+            "Simon & Garfunkel": ["2"],
+        }
+        assert list(artist_dict)[0] == "Red Garland Quintet"
+
+    @pytest.mark.parametrize(
+        "name, artist, rule",
+        [
+            ("Red Garland Quintet", "Red Garland Quintet", "exact"),
+            ("red garland  QUINTET", "Red Garland Quintet", "case"),
+            (unicodedata.normalize("NFD", "Björk"), "Björk", "case"),
+            ("The Red Garland Quintet", "Red Garland Quintet", "article"),
+            ("AC-DC", "AC/DC", "punctuation"),
+            ("Simon and Garfunkel", "Simon & Garfunkel", "punctuation"),
+            ("Bjork", "Björk", "alias"),
+            ("Red Garland", "Red Garland Quintet", "alias"),
+        ],
+    )
+    def test_rules(self, name, artist, rule):
+        artist_dict = build_artist_dict(
+            ARTIST_LIST, [("Bjork", "björk"), ("Red Garland", "Red Garland Quintet")]
+        )
+
+        assert artist_dict.resolve(name) == (artist, rule)
+        assert name in artist_dict
+        assert artist_dict[name] == artist_dict[artist]
+        assert artist_dict.get(name) == artist_dict[artist]
+
+    def test_punctuation_only_names_not_merged(self):
+        artist_dict = build_artist_dict([("!!!", "1"), ("Tribe Called Quest", "2")])
+
+        assert "..." not in artist_dict
+        assert "A Tribe Called Quest" not in artist_dict
+        assert artist_dict.resolve("!!! ") == ("!!!", "case")
+
+    def test_unknown_artist(self):
+        artist_dict = build_artist_dict(ARTIST_LIST)
+
+        assert "Nobody" not in artist_dict
+        assert artist_dict.get("Nobody", ()) == ()
+        with pytest.raises(KeyError):
+            artist_dict["Nobody"]
+
+    def test_alias_to_unknown_artist(self, capsys):
+        artist_dict = ArtistIndex({"A": ["1"]}, [("B", "C")])
+
+        assert "B" not in artist_dict
+        assert "WARNING: alias B refers to C" in capsys.readouterr().out
+
+    def test_hits_reported_by_rule(self):
+        artist_dict = build_artist_dict(ARTIST_LIST)
+        tracks = [
+            "The Red Garland Quintet/Album/1.mp3",
+            "Ac-Dc/Album/2.mp3",
+            "ac dc/Album/3.mp3",
+            "The Red Garland Quintet/Album/4.mp3",
+            "Nobody/Album/5.mp3",
+        ]
+
+        file_list, missing_artists = match_tracks(tracks, artist_dict)
+
+        assert len(file_list) == 6
+        assert missing_artists == ["Nobody"]
+        assert artist_dict.hits == {"article": 2, "punctuation": 2}
+        assert artist_dict.matched == {
+            "The Red Garland Quintet": ("Red Garland Quintet", "article"),
+            "Ac-Dc": ("AC/DC", "punctuation"),
+            "ac dc": ("AC/DC", "punctuation"),
+        }
+
+    def test_lookups_memoized(self, monkeypatch):
+        artist_dict = build_artist_dict(ARTIST_LIST)
+        artist_dict["the red garland quintet"]
+        monkeypatch.setattr(artist_dict, "folded", None)
+
+        assert artist_dict["the red garland quintet"] == ["1", "2"]
+
+    def test_read_alias_list(self, temp_dir):
+        aliases_file = temp_dir / "09_artist-aliases.csv"
+        aliases_file.write_text("Bjork;Björk\n\nRed Garland;Red Garland Quintet\n")
+
+        assert read_alias_list(aliases_file) == [
+            ("Bjork", "Björk"),
+            ("Red Garland", "Red Garland Quintet"),
+        ]
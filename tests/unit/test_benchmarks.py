@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def benchmarks(monkeypatch):
+    monkeypatch.syspath_prepend(Path(__file__).parent.parent.parent / "benchmarks")
+    import bench_stages
+
+    return bench_stages
+
+
+@pytest.mark.unit
+class TestGenerate:
+    def test_seeded(self, temp_dir, benchmarks):
+        from bench_data import generate_dataset
+
+        files1, basepath1 = generate_dataset(temp_dir / "1", 500, seed=3)
+        files2, basepath2 = generate_dataset(temp_dir / "2", 500, seed=3)
+
+        for name in files1:
+            content = files1[name].read_text().replace(basepath1, basepath2)
+            assert content == files2[name].read_text()
+        assert len(files1["00_favorite-tracks.txt"].read_text().splitlines()) == 500
+
+    def test_fix_files(self, temp_dir, benchmarks):
+        from bench_data import generate_dataset
+
+        files, local_basepath = generate_dataset(temp_dir, 2000)
+        paths = [
+            x.split(";")[1]
+            for x in files["06_fix-missing-tracks.csv"].read_text().splitlines()
+        ]
+
+        assert paths
+        assert all(x.startswith(local_basepath) for x in paths)
+        assert all(Path(x).exists() for x in paths)
+
+
+@pytest.mark.unit
+class TestBenchStages:
+    def test_compare(self, benchmarks):
+        baseline = {
+            "10": {
+                "a": {"time": 1.0, "memory": 100},
+                "b": {"time": 0.001, "memory": 100},
+            }
+        }
+        results = {
+            "10": {
+                "a": {"time": 2.0, "memory": 100},
+                "b": {"time": 0.004, "memory": 300},
+                "c": {"time": 9.0, "memory": 900},
+            }
+        }
+
+        assert benchmarks.compare(results, baseline, 1.5) == [
+            ("10", "a", "time", 1.0, 2.0),
+            ("10", "b", "memory", 100, 300),
+        ]
+
+    def test_save_and_check_baseline(self, temp_dir, benchmarks, capsys):
+        baseline_file = temp_dir / "baseline.json"
+        args = ["--sizes", "200", "--repeat", "1", "--baseline", str(baseline_file)]
+
+        assert benchmarks.main(args + ["--save"]) == 0
+        baseline = json.loads(baseline_file.read_text())
+        assert set(baseline["200"]) == {
+            "read_files",
+            "build_artist_dict",
+            "match_tracks",
+            "match_missing_tracks",
+            "build_playlists",
+            "export_playlists",
+        }
+
+        for stage in baseline["200"].values():
+            stage["memory"] = 1
+        baseline_file.write_text(json.dumps(baseline))
+        assert benchmarks.main(args) == 1
+        assert "REGRESSION" in capsys.readouterr().out
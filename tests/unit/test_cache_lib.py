@@ -0,0 +1,138 @@
+import json
+
+import pytest
+from cache_lib import QueryCache, cache_key, get_db_update
+from match_lib import search_favorites
+from mpd_lib import MPDClient
+
+
+SONGS = [
+    {"file": "A/x/1.mp3", "Artist": "A", "Title": "One"},
+    {"file": "B/y/2.mp3", "Artist": "B", "Title": "Two"},
+]
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def search_commands(fake_mpd):
+    return [x for x in fake_mpd.commands if x.startswith("search")]
+
+
+@pytest.mark.unit
+class TestQueryCache:
+    def test_key_is_normalized(self):
+        assert cache_key(" Artist ", "TITLE") == cache_key("artist", "title")
+
+    def test_get_and_set(self, temp_dir):
+        cache = QueryCache(temp_dir / "cache.json", 1)
+
+        assert cache.get("A", "One") is None
+        cache.set("A", "One", ["A/x/1.mp3"])
+
+        assert cache.get("a", "one") == ["A/x/1.mp3"]
+        assert (cache.hits, cache.misses) == (1, 1)
+        cache.close()
+
+    def test_persisted_until_db_update_changes(self, temp_dir):
+        cache = QueryCache(temp_dir / "cache.json", 1)
+        cache.set("A", "One", [])
+        cache.save()
+
+        assert QueryCache(temp_dir / "cache.json", 1).get("A", "One") == []
+        assert QueryCache(temp_dir / "cache.json", 2).get("A", "One") is None
+
+    def test_ttl(self, temp_dir):
+        clock = Clock()
+        cache = QueryCache(temp_dir / "cache.json", 1, ttl=10, clock=clock)
+        cache.set("A", "One", ["A/x/1.mp3"])
+
+        clock.now += 11
+
+        assert cache.get("A", "One") is None
+        cache.save()
+        data = json.loads((temp_dir / "cache.json").read_text())
+        assert data["entries"] == {}
+
+    def test_journal_resumes_interrupted_run(self, temp_dir):
+        cache = QueryCache(temp_dir / "cache.json", 1)
+        cache.set("A", "One", ["A/x/1.mp3"])
+        cache.close()
+        with open(temp_dir / "cache.json.journal", "a") as f:
+            f.write('["truncated')
+
+        resumed = QueryCache(temp_dir / "cache.json", 1)
+
+        assert resumed.get("A", "One") == ["A/x/1.mp3"]
+        resumed.save()
+        assert not (temp_dir / "cache.json.journal").exists()
+
+    def test_journal_discarded_after_db_update(self, temp_dir):
+        cache = QueryCache(temp_dir / "cache.json", 1)
+        cache.set("A", "One", ["A/x/1.mp3"])
+        cache.close()
+
+        resumed = QueryCache(temp_dir / "cache.json", 2)
+
+        assert resumed.get("A", "One") is None
+        resumed.close()
+
+
+@pytest.mark.unit
+class TestCachedSearch:
+    def test_second_run_uses_cache(self, fake_mpd, temp_dir):
+        fake_mpd.songs = SONGS
+        favorites = [("A", "One"), ("B", "Two"), ("C", "Three")]
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            cache = QueryCache(temp_dir / "cache.json", get_db_update(client))
+            first = list(search_favorites(client, favorites, cache=cache))
+            cache.save()
+        assert len(search_commands(fake_mpd)) == 3
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            cache = QueryCache(temp_dir / "cache.json", get_db_update(client))
+            second = list(search_favorites(client, favorites, cache=cache))
+            cache.save()
+
+        assert second == first
+        assert first[2] == (("C", "Three"), [])
+        assert len(search_commands(fake_mpd)) == 3
+
+    def test_db_update_invalidates(self, fake_mpd, temp_dir):
+        fake_mpd.songs = SONGS
+        favorites = [("A", "One")]
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            cache = QueryCache(temp_dir / "cache.json", get_db_update(client))
+            list(search_favorites(client, favorites, cache=cache))
+            cache.save()
+
+            fake_mpd.db_update += 1
+            cache = QueryCache(temp_dir / "cache.json", get_db_update(client))
+            list(search_favorites(client, favorites, cache=cache))
+            cache.save()
+
+        assert len(search_commands(fake_mpd)) == 2
+
+    def test_interrupted_run_resumes(self, fake_mpd, temp_dir):
+        fake_mpd.songs = SONGS
+        favorites = [("A", "One"), ("B", "Two")]
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            cache = QueryCache(temp_dir / "cache.json", get_db_update(client))
+            results = search_favorites(client, favorites, batch_size=1, cache=cache)
+            next(results)
+            cache.close()
+
+            cache = QueryCache(temp_dir / "cache.json", get_db_update(client))
+            results = list(search_favorites(client, favorites, cache=cache))
+            cache.save()
+
+        assert [x[1] for x in results] == [["A/x/1.mp3"], ["B/y/2.mp3"]]
+        assert len(search_commands(fake_mpd)) == 2
@@ -0,0 +1,133 @@
+import pytest
+from fuzzy_lib import fold, trigrams, dice, TrigramIndex, resolve_missing
+
+
+SONGS = [
+    {
+        "file": "CHVRCHΞS/Every Open Eye/02 Leave a Trace.mp3",
+        "Artist": "CHVRCHΞS",
+        "Title": "Leave a Trace",
+    },
+    {
+        "file": "Francesco Bearzatti Tinissima 4et/This Machine Kills Fascists/04 Long Train Running.flac",
+        "Artist": "Francesco Bearzatti Tinissima 4et",
+        "Title": "Long Train Running",
+    },
+    {
+        "file": "Murray Head/Say It Ain’t So/01 Say It Ain’t So, Joe.mp3",
+        "Artist": "Murray Head",
+        "Title": "Say It Ain’t So, Joe",
+    },
+    {
+        "file": "The Doobie Brothers/Best Of/01 Long Train Runnin'.mp3",
+        "Artist": "The Doobie Brothers",
+        "Title": "Long Train Runnin'",
+    },
+]
+
+
+@pytest.mark.unit
+class TestFold:
+    def test_stylized_letters(self):
+        assert fold("CHVRCHΞS") == fold("CHVRCHES") == "chvrches"
+
+    def test_apostrophes(self):
+        assert fold("Say It Ain’t So") == fold("Say It Ain't So")
+
+    def test_accents_and_punctuation(self):
+        assert fold("Beyoncé - Halo!") == "beyonce halo"
+
+    def test_dice(self):
+        assert dice(trigrams("abc"), trigrams("abc")) == 1.0
+        assert dice(trigrams("abc"), frozenset()) == 0.0
+
+
+@pytest.mark.unit
+class TestTrigramIndex:
+    def test_exact_after_folding(self):
+        index = TrigramIndex(SONGS)
+
+        ranked = index.suggest("CHVRCHES", "Leave a Trace")
+
+        assert ranked[0] == (1.0, "CHVRCHΞS/Every Open Eye/02 Leave a Trace.mp3")
+
+    def test_artist_suffix(self):
+        index = TrigramIndex(SONGS)
+
+        ranked = index.suggest("Francesco Bearzatti", "Long Train Running")
+
+        assert ranked[0][1].startswith("Francesco Bearzatti Tinissima 4et/")
+        assert ranked[0][0] > 0.9
+        assert ranked[1][1].startswith("The Doobie Brothers/")
+        assert ranked[1][0] < 0.9
+
+    def test_only_shared_trigrams_are_candidates(self):
+        index = TrigramIndex(SONGS)
+
+        assert index.candidates(trigrams(fold("zzzz")), 1) == []
+        assert index.suggest("Nobody", "Qwxyz") == []
+
+    def test_limit(self):
+        index = TrigramIndex(SONGS)
+
+        assert len(index.suggest("Anyone", "Long Train Running", limit=1)) == 1
+
+
+@pytest.mark.unit
+class TestResolveMissing:
+    def test_threshold(self):
+        index = TrigramIndex(SONGS)
+        missing = [
+            "Murray Head - Say It Ain't So, Joe",
+            "The Doobie Brothers - Long Train Running",
+            "Jorge Ben - Taj Mahal",
+        ]
+
+        suggestions, accepted = resolve_missing(missing, index, threshold=0.99)
+
+        assert accepted == {
+            "Murray Head - Say It Ain't So, Joe": "Murray Head/Say It Ain’t So/01 Say It Ain’t So, Joe.mp3"
+        }
+        assert all(track != "Jorge Ben - Taj Mahal" for track, _, _ in suggestions)
+        doobie = [x for x in suggestions if x[0].startswith("The Doobie")]
+        assert doobie[0][2].startswith("The Doobie Brothers/")
+
+
+@pytest.mark.integration
+class TestFuzzyMissingScript:
+    def test_appends_accepted_to_fix_file(self, temp_dir):
+        from fuzzy_missing import main
+        from library_lib import save_dump
+
+        dump = temp_dir / "library.txt"
+        save_dump(SONGS, dump)
+        missing = temp_dir / "05.csv"
+        missing.write_text(
+            "CHVRCHES - Leave a Trace\nAlready - Fixed\nJorge Ben - Taj Mahal\n"
+        )
+        fix = temp_dir / "06.csv"
+        fix.write_text("Already - Fixed;/music/a.mp3")
+        suggestions = temp_dir / "08.csv"
+
+        main(
+            [
+                "--dump",
+                str(dump),
+                "--local-basepath",
+                "/nfs/",
+                "--missing",
+                str(missing),
+                "--fix",
+                str(fix),
+                "--suggestions",
+                str(suggestions),
+            ]
+        )
+
+        assert fix.read_text() == (
+            "Already - Fixed;/music/a.mp3\n"
+            "CHVRCHES - Leave a Trace;/nfs/CHVRCHΞS/Every Open Eye/02 Leave a Trace.mp3\n"
+        )
+        assert suggestions.read_text().startswith(
+            "CHVRCHES - Leave a Trace;1.0;CHVRCHΞS/"
+        )
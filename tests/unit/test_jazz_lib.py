@@ -0,0 +1,126 @@
+import random
+
+import pytest
+from jazz_lib import (
+    read_list,
+    normalize_title,
+    AhoCorasick,
+    PrefixTrie,
+    match_standards,
+    write_m3u,
+)
+
+
+SONGS = [
+    {"file": "Keith Jarrett/Standards/01 Summertime.flac", "Title": "Summertime"},
+    {"file": "Art Tatum/Solo/02 Summertime.mp3", "Title": "SUMMERTIME"},
+    {"file": "Metallica/Album/01 Summertime Blues.mp3", "Title": "Summertime Blues"},
+    {
+        "file": "Hank Jones/Trio/03 It Don’t Mean a Thing.flac",
+        "Title": "It Don’t Mean a Thing",
+    },
+    {"file": "Hank Jones Trio/Live/01 Four.flac", "Title": "Four"},
+    {"file": "Keith Jarrett/Untagged.flac"},
+]
+
+
+@pytest.mark.unit
+class TestAhoCorasick:
+    def test_overlapping_patterns(self):
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+
+        assert automaton.search("ushers") == {0, 1, 3}
+        assert automaton.search("this") == {2}
+        assert automaton.search("nothing") == set()
+
+    def test_same_as_naive_search(self):
+        rng = random.Random(0)
+        patterns = ["".join(rng.choices("abc", k=rng.randint(1, 4))) for _ in range(30)]
+        automaton = AhoCorasick(patterns)
+
+        for _ in range(200):
+            text = "".join(rng.choices("abcd", k=rng.randint(0, 12)))
+            expected = {i for i, x in enumerate(patterns) if x in text}
+            assert automaton.search(text) == expected
+
+
+@pytest.mark.unit
+class TestPrefixTrie:
+    def test_prefixes(self):
+        trie = PrefixTrie(["keith jarrett", "hank jones"])
+
+        assert trie.has_prefix_of("keith jarrett")
+        assert trie.has_prefix_of("hank jones trio")
+        assert not trie.has_prefix_of("hank")
+        assert not trie.has_prefix_of("art tatum")
+
+    def test_empty_prefix_matches_everything(self):
+        assert PrefixTrie([""]).has_prefix_of("anyone")
+
+
+@pytest.mark.unit
+class TestMatchStandards:
+    def test_read_list_skips_comments(self, temp_dir):
+        path = temp_dir / "list.txt"
+        path.write_text("# comment\nfour\n\n  summertime \n")
+
+        assert read_list(path) == ["four", "summertime"]
+
+    def test_normalize_title(self):
+        assert normalize_title("It Don’t") == normalize_title("it don't")
+
+    def test_match(self):
+        standards = ["summertime", "it don't mean a thing", "four"]
+        allowlist = ["keith jarrett", "art tatum", "hank jones"]
+
+        tracks, rejected = match_standards(SONGS, standards, allowlist)
+
+        assert tracks == [
+            "Art Tatum/Solo/02 Summertime.mp3",
+            "Keith Jarrett/Standards/01 Summertime.flac",
+            "Hank Jones/Trio/03 It Don’t Mean a Thing.flac",
+            "Hank Jones Trio/Live/01 Four.flac",
+        ]
+        assert rejected == [("metallica", "summertime")]
+
+    def test_write_m3u(self, temp_dir):
+        path = temp_dir / "out.m3u"
+
+        write_m3u(path, ["a/b.mp3", "c/d.mp3"], "/music/")
+
+        assert path.read_text() == "/music/a/b.mp3\n/music/c/d.mp3\n"
+
+
+@pytest.mark.integration
+class TestJazzStandardsScript:
+    @pytest.mark.parametrize("source", ["--dump", "--snapshot"])
+    def test_outputs(self, temp_dir, monkeypatch, source):
+        from pathlib import Path
+        from library_lib import save_dump
+        from snapshot_lib import write_snapshot
+
+        monkeypatch.syspath_prepend(
+            Path(__file__).parent.parent.parent / "jazz_standards"
+        )
+        import mplaylist_jazz_standards as script
+
+        (temp_dir / "jazz_standards.txt").write_text("# standards\nsummertime\n")
+        (temp_dir / "jazz_artists_allowlist.txt").write_text("keith jarrett\n")
+        for name in ["JAZZ_STANDARDS_FILE", "JAZZ_ARTISTS_ALLOWLIST_FILE"]:
+            monkeypatch.setattr(script, name, temp_dir / getattr(script, name).name)
+        monkeypatch.setattr(script, "OUTPUT_FILE", temp_dir / "out.m3u")
+        monkeypatch.setattr(script, "OUTPUT_FILE_MPD", temp_dir / "out_mpd.m3u")
+        dump = temp_dir / "library.txt"
+        if source == "--dump":
+            save_dump(SONGS, dump)
+        else:
+            write_snapshot(SONGS, dump)
+
+        script.main([source, str(dump)])
+
+        assert (temp_dir / "out.m3u").read_text() == (
+            "/music/Keith Jarrett/Standards/01 Summertime.flac\n"
+        )
+        assert (temp_dir / "out_mpd.m3u").read_text() == (
+            "Keith Jarrett/Standards/01 Summertime.flac\n"
+        )
@@ -0,0 +1,158 @@
+import json
+
+import lastfm_favorites
+import pytest
+from lastfm_lib import LastfmClient, LastfmError, ingest_loved_tracks
+from match_lib import read_favorites
+
+
+@pytest.fixture
+def server(fake_lastfm):
+    for i in range(450):
+        fake_lastfm.love(1600000000 + i * 60, f"Artist {i % 7}", f"Title {i}")
+    return fake_lastfm
+
+
+@pytest.fixture
+def client(server):
+    return LastfmClient(server.api_key, server.url)
+
+
+@pytest.fixture
+def files(temp_dir):
+    return {
+        "favorites_file": temp_dir / "00_favorite-tracks.txt",
+        "timestamps_file": temp_dir / "11_favorite-tracks-timestamps.csv",
+        "state_file": temp_dir / ".lastfm-state.json",
+    }
+
+
+def ingest(client, files, full=False):
+    return ingest_loved_tracks(client, "dbeley", **files, full=full)
+
+
+@pytest.mark.unit
+class TestIngestLovedTracks:
+    def test_first_run_fetches_everything(self, client, files):
+        entries = ingest(client, files)
+
+        assert len(entries) == 450
+        assert client.nb_requests == 3
+        lines = files["favorites_file"].read_text().splitlines()
+        assert lines[:2] == ["Artist 1 - Title 449", "Artist 0 - Title 448"]
+        assert list(read_favorites(files["favorites_file"]))[-1] == (
+            "Artist 0",
+            "Title 0",
+        )
+        assert files["timestamps_file"].read_text().splitlines()[0] == (
+            f"{1600000000 + 449 * 60};Artist 1 - Title 449"
+        )
+        assert json.loads(files["state_file"].read_text())["timestamp"] == (
+            1600000000 + 449 * 60
+        )
+
+    def test_daily_refresh_prepends_new_tracks(self, client, server, files):
+        ingest(client, files)
+        before = files["favorites_file"].read_text()
+        server.love(1700000000, "New Artist", "New Title")
+        server.love(1700000060, "Other Artist", "Other Title")
+
+        client.nb_requests = 0
+        entries = ingest(client, files)
+
+        assert entries == [
+            (1700000060, "Other Artist - Other Title"),
+            (1700000000, "New Artist - New Title"),
+        ]
+        assert client.nb_requests == 1
+        assert files["favorites_file"].read_text() == (
+            f"Other Artist - Other Title\nNew Artist - New Title\n{before}"
+        )
+        assert len(files["timestamps_file"].read_text().splitlines()) == 452
+
+    def test_interrupted_before_state(self, client, server, files):
+        ingest(client, files)
+        state = files["state_file"].read_text()
+        server.love(1700000000, "New Artist", "New Title")
+        ingest(client, files)
+        # Crash after the favorites were written, before the state
+        files["state_file"].write_text(state)
+        server.love(1700000060, "Other Artist", "Other Title")
+
+        entries = ingest(client, files)
+
+        assert len(entries) == 2
+        lines = files["favorites_file"].read_text().splitlines()
+        assert lines[:3] == [
+            "Other Artist - Other Title",
+            "New Artist - New Title",
+            "Artist 1 - Title 449",
+        ]
+        assert len(lines) == 452
+        assert len(files["timestamps_file"].read_text().splitlines()) == 452
+
+    def test_interrupted_with_empty_files(self, client, server, files):
+        ingest(client, files)
+        files["favorites_file"].write_text("")
+        files["timestamps_file"].write_text("")
+        server.love(1700000000, "New Artist", "New Title")
+
+        entries = ingest(client, files)
+
+        assert entries == [(1700000000, "New Artist - New Title")]
+        assert files["favorites_file"].read_text() == "New Artist - New Title\n"
+
+    def test_nothing_new(self, client, files):
+        ingest(client, files)
+        mtime = files["favorites_file"].stat().st_mtime_ns
+
+        client.nb_requests = 0
+        assert ingest(client, files) == []
+        assert client.nb_requests == 1
+        assert files["favorites_file"].stat().st_mtime_ns == mtime
+
+    def test_last_known_track_unloved(self, client, server, files):
+        ingest(client, files)
+        server.loved.pop()
+        server.love(1700000000, "New Artist", "New Title")
+
+        entries = ingest(client, files)
+
+        assert entries == [(1700000000, "New Artist - New Title")]
+        lines = files["favorites_file"].read_text().splitlines()
+        assert lines[:2] == ["New Artist - New Title", "Artist 1 - Title 449"]
+
+    def test_full_rewrite(self, client, server, files):
+        ingest(client, files)
+        server.loved.pop()
+
+        entries = ingest(client, files, full=True)
+
+        assert len(entries) == 449
+        lines = files["favorites_file"].read_text().splitlines()
+        assert lines[0] == "Artist 0 - Title 448"
+        assert len(lines) == 449
+
+    def test_api_error(self, server, files):
+        with pytest.raises(LastfmError, match="Invalid API key"):
+            ingest(LastfmClient("wrong", server.url), files)
+
+
+@pytest.mark.unit
+class TestLastfmFavorites:
+    def test_main(self, client, files, capsys):
+        lastfm_favorites.main(
+            [
+                "--user",
+                "dbeley",
+                "--file",
+                str(files["favorites_file"]),
+                "--timestamps",
+                str(files["timestamps_file"]),
+                "--state",
+                str(files["state_file"]),
+            ],
+            client=client,
+        )
+
+        assert "450 new loved tracks added" in capsys.readouterr().out
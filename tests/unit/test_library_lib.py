@@ -0,0 +1,299 @@
+import pytest
+from library_lib import (
+    normalize,
+    fetch_library,
+    save_dump,
+    load_dump,
+    build_index,
+    resolve_favorites,
+    diff_library,
+    IncrementalMatcher,
+)
+from mpd_lib import MPDClient
+
+
+SONGS = [
+    {
+        "file": "Artist One/Album/01 Track One.mp3",
+        "Artist": "Artist One",
+        "Title": "Track One",
+    },
+    {
+        "file": "Artist One/Live/01 Track One.flac",
+        "Artist": "artist one",
+        "Title": "TRACK ONE",
+    },
+    {
+        "file": "Artist Two/Album/02 Track Two.mp3",
+        "Artist": "Artist Two",
+        "Title": "Track Two",
+    },
+    {"file": "Untagged/01.mp3"},
+]
+
+
+@pytest.mark.unit
+class TestBuildIndex:
+    def test_normalize(self):
+        assert normalize("  Björk ") == "björk"
+        assert normalize("STRASSE") == normalize("straße")
+
+    def test_groups_case_insensitive_matches(self):
+        index = build_index(SONGS)
+
+        assert index[("artist one", "track one")] == [
+            "Artist One/Album/01 Track One.mp3",
+            "Artist One/Live/01 Track One.flac",
+        ]
+        assert len(index) == 2
+
+    def test_resolve_favorites(self):
+        index = build_index(SONGS)
+        favorites = [("ARTIST TWO", "track two"), ("Nobody", "Nothing")]
+
+        results = list(resolve_favorites(favorites, index))
+
+        assert results == [
+            (("ARTIST TWO", "track two"), ["Artist Two/Album/02 Track Two.mp3"]),
+            (("Nobody", "Nothing"), []),
+        ]
+
+
+@pytest.mark.unit
+class TestDumps:
+    def test_save_and_load_dump(self, temp_dir):
+        dump = temp_dir / "library.txt"
+
+        save_dump(SONGS, dump)
+
+        assert load_dump(dump) == SONGS
+
+    def test_load_protocol_transcript(self, temp_dir):
+        dump = temp_dir / "library.txt"
+        dump.write_text(
+            "OK MPD 0.23.5\n"
+            "directory: Artist\n"
+            "file: Artist/a.mp3\n"
+            "Artist: Artist\n"
+            "Title: A\n"
+            "OK\n"
+        )
+
+        assert load_dump(dump) == [
+            {"file": "Artist/a.mp3", "Artist": "Artist", "Title": "A"}
+        ]
+
+    def test_fetch_library_by_directory(self, fake_mpd):
+        fake_mpd.songs = SONGS + [{"file": "root.mp3", "Title": "Root"}]
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            songs = fetch_library(client)
+
+        assert songs == [fake_mpd.songs[-1], *SONGS]
+        assert fake_mpd.commands == [
+            "lsinfo",
+            'listallinfo "Artist One"',
+            'listallinfo "Artist Two"',
+            'listallinfo "Untagged"',
+        ]
+
+    def test_multiple_values(self, fake_mpd, temp_dir):
+        song = {
+            "file": "Duets/01.mp3",
+            "Artist": ["Artist One", "Artist Two"],
+            "Title": "Duet",
+        }
+        fake_mpd.songs = [song]
+        dump = temp_dir / "library.txt"
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            songs = fetch_library(client)
+        save_dump(songs, dump)
+
+        assert songs == [song]
+        assert load_dump(dump) == [song]
+        assert build_index(songs) == {
+            ("artist one", "duet"): ["Duets/01.mp3"],
+            ("artist two", "duet"): ["Duets/01.mp3"],
+        }
+
+
+@pytest.mark.integration
+class TestMplaylistIndexMode:
+    def test_index_and_dump_modes_match_search_mode(self, fake_mpd, temp_dir):
+        from mplaylist import main
+
+        fake_mpd.songs = SONGS
+        favorites = temp_dir / "favorites.txt"
+        favorites.write_text("Artist One - Track One\nNobody - Nothing\n")
+        connection = ["--host", fake_mpd.host, "--port", str(fake_mpd.port)]
+        connection += ["--no-cache"]
+        dump = temp_dir / "library.txt"
+
+        outputs = {}
+        for mode, extra in [
+            ("search", connection),
+            ("index", connection + ["--index", "--save-dump", str(dump)]),
+            ("dump", ["--dump", str(dump)]),
+        ]:
+            output = temp_dir / f"04_{mode}.csv"
+            output_missing = temp_dir / f"05_{mode}.csv"
+            main(
+                [str(favorites), "--output", str(output)]
+                + ["--output-missing", str(output_missing)]
+                + extra
+            )
+            outputs[mode] = (output.read_text(), output_missing.read_text())
+
+        assert outputs["search"] == outputs["index"] == outputs["dump"]
+        assert outputs["index"][1] == "Nobody - Nothing\n"
+
+
+@pytest.mark.unit
+class TestIncrementalMatcher:
+    def test_diff_library(self):
+        new_songs = [
+            {**SONGS[0], "file": "Artist One/Moved/01 Track One.mp3"},
+            {**SONGS[1], "Title": "Track One (Live)"},
+            SONGS[3],
+            {"file": "New/01.mp3", "Artist": "New", "Title": "Song"},
+        ]
+
+        added, removed, moved = diff_library(SONGS, new_songs)
+
+        assert added == new_songs[:2] + new_songs[3:]
+        assert removed == SONGS[:3]
+        assert moved == [(SONGS[0]["file"], "Artist One/Moved/01 Track One.mp3")]
+
+    def test_update_same_as_full_resolution(self):
+        favorites = [("Artist One", "Track One"), ("Artist Two", "Track Two")]
+        favorites += [("New", "Song"), ("Artist One", "Track One (Live)")]
+        matcher = IncrementalMatcher(favorites, SONGS)
+        new_songs = [
+            {"file": "New/01.mp3", "Artist": "New", "Title": "Song"},
+            {**SONGS[0], "file": "Artist One/Moved/01 Track One.mp3"},
+            {**SONGS[1], "Title": "Track One (Live)"},
+            SONGS[2],
+        ]
+
+        _, _, _, changed = matcher.update(new_songs)
+
+        assert list(matcher.results()) == list(
+            resolve_favorites(favorites, build_index(new_songs))
+        )
+        assert sorted(changed) == sorted([favorites[0], favorites[2], favorites[3]])
+        assert matcher.index == build_index(new_songs)
+
+    def test_update_songs_same_as_update(self):
+        favorites = [("Artist One", "Track One"), ("Artist Two", "Track Two")]
+        favorites += [("New", "Song"), ("Artist One", "Track One (Live)")]
+        new_songs = [
+            SONGS[0],
+            {**SONGS[1], "Title": "Track One (Live)"},
+            *SONGS[2:],
+            {"file": "New/01.mp3", "Artist": "New", "Title": "Song"},
+        ]
+        full = IncrementalMatcher(favorites, SONGS)
+        incremental = IncrementalMatcher(favorites, SONGS)
+
+        expected = full.update(new_songs)
+        # Modified songs only, then a removal known from the paths of the library
+        result = incremental.update_songs([new_songs[1], new_songs[-1]])
+
+        assert result == expected
+        assert incremental.index == full.index
+        assert list(incremental.results()) == list(full.results())
+        _, removed, _, changed = incremental.update_songs(
+            [], [x["file"] for x in new_songs[1:]]
+        )
+        assert removed == [SONGS[0]]
+        assert changed == [favorites[0]]
+        assert incremental.index == build_index(new_songs[1:])
+
+    def test_idle(self, fake_mpd):
+        with MPDClient(fake_mpd.host, fake_mpd.port, timeout=5) as client:
+            fake_mpd.update_database(SONGS[:1])
+
+            assert client.idle("database") == ["database"]
+            assert fetch_library(client) == SONGS[:1]
+        assert fake_mpd.commands == [
+            'idle "database"',
+            "lsinfo",
+            'listallinfo "Artist One"',
+        ]
+
+
+@pytest.mark.integration
+class TestMpdWatch:
+    def test_database_update(self, fake_mpd, test_files_dir, monkeypatch, capsys):
+        import mpd_watch
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+        songs = []
+        for line in (files_dir / "04_result-mplaylist.csv").read_text().splitlines():
+            artist, _, name = line.split("/")
+            songs.append({"file": line, "Artist": artist, "Title": name[3:-4]})
+        fake_mpd.songs = songs
+        args = mpd_watch.parse_args(
+            ["--host", fake_mpd.host, "--port", str(fake_mpd.port)]
+        )
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            matcher, state = mpd_watch.load_state(client, args)
+            rock = (test_files_dir / "playlists/1_Rock.m3u").read_text()
+            new_song = {"file": "Artist Two/Live/02 Track Two.flac"}
+            new_song.update(Artist="Artist Two", Title="Track Two")
+            new_song["Last-Modified"] = "2020-09-13T12:26:41Z"
+            fake_mpd.update_database(songs + [new_song])
+
+            mpd_watch.watch_database(client, matcher, state, args, max_updates=1)
+
+        assert (
+            "Artist Two/Live/02 Track Two.flac"
+            in (test_files_dir / "mpd_playlists/2_Pop.m3u").read_text()
+        )
+        assert (test_files_dir / "playlists/1_Rock.m3u").read_text() == rock
+        out = capsys.readouterr().out
+        assert "1 added, 0 removed, 0 moved, 1 favorites changed" in out
+        assert "Updated 1 playlists" in out
+        # Only the modified songs are fetched
+        assert fake_mpd.commands[-1].startswith('find "(modified-since')
+        assert fake_mpd.commands.count("lsinfo") == 1
+
+    def test_database_removal(self, fake_mpd, test_files_dir, monkeypatch, capsys):
+        import mpd_watch
+
+        files_dir = test_files_dir / "files"
+        (files_dir / "00_favorite-tracks.txt").rename(
+            files_dir / "00_dbeley-favorite-tracks.txt"
+        )
+        monkeypatch.chdir(test_files_dir)
+        songs = []
+        for line in (files_dir / "04_result-mplaylist.csv").read_text().splitlines():
+            artist, _, name = line.split("/")
+            songs.append({"file": line, "Artist": artist, "Title": name[3:-4]})
+        fake_mpd.songs = songs
+        args = mpd_watch.parse_args(
+            ["--host", fake_mpd.host, "--port", str(fake_mpd.port)]
+        )
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            matcher, state = mpd_watch.load_state(client, args)
+            fake_mpd.update_database(songs[1:])
+
+            mpd_watch.watch_database(client, matcher, state, args, max_updates=1)
+
+        assert songs[0]["file"] not in (
+            (test_files_dir / "mpd_playlists/1_Rock.m3u").read_text()
+        )
+        assert "Artist One - Track One" in (
+            (files_dir / "05_result-mplaylist-missing.csv").read_text()
+        )
+        assert "0 added, 1 removed, 0 moved, 1 favorites changed" in (
+            capsys.readouterr().out
+        )
+        assert fake_mpd.commands[-1] == "listall"
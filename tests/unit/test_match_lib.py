@@ -0,0 +1,223 @@
+import os
+
+import pytest
+from match_lib import (
+    parse_favorite,
+    read_favorites,
+    search_filter,
+    batched,
+    search_favorites,
+    write_results,
+)
+from mpd_lib import (
+    MPDClient,
+    MPDError,
+    get_connection_settings,
+    quote,
+    split_songs,
+)
+
+
+SONGS = [
+    {
+        "file": "Artist One/Album One/01 Track One.mp3",
+        "Artist": "Artist One",
+        "Title": "Track One",
+    },
+    {
+        "file": "Artist One/Live/01 Track One.flac",
+        "Artist": "Artist One",
+        "Title": "Track One",
+    },
+    {
+        "file": "Artist Two/Album Two/02 Track Two.mp3",
+        "Artist": "Artist Two",
+        "Title": "Track Two",
+    },
+    {"file": 'Quote "Band"/A/01 It\'s.mp3', "Artist": "Quote Band", "Title": "It's"},
+]
+
+
+@pytest.mark.unit
+class TestParseFavorite:
+    def test_basic_line(self):
+        assert parse_favorite("Artist One - Track One\n") == ("Artist One", "Track One")
+
+    def test_strips_whitespace_and_double_quotes(self):
+        assert parse_favorite('  Artist  -  "Track"  ') == ("Artist", "Track")
+
+    def test_only_second_field_is_kept(self):
+        assert parse_favorite("Artist - Track - Live") == ("Artist", "Track")
+
+    def test_empty_line(self):
+        assert parse_favorite("   \n") is None
+
+    def test_read_favorites_does_not_modify_file(self, temp_dir):
+        favorites = temp_dir / "favorites.txt"
+        favorites.write_text('Artist - "Track"\n\nOther - Song\n')
+
+        result = list(read_favorites(favorites))
+
+        assert result == [("Artist", "Track"), ("Other", "Song")]
+        assert favorites.read_text() == 'Artist - "Track"\n\nOther - Song\n'
+
+
+@pytest.mark.unit
+class TestProtocolHelpers:
+    def test_quote_escapes(self):
+        assert quote('a "b" \\c') == '"a \\"b\\" \\\\c"'
+
+    def test_search_filter(self):
+        assert search_filter("A", "It's") == '((artist == "A") AND (title == "It\'s"))'
+
+    def test_batched(self):
+        assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+    def test_split_songs_skips_directories(self):
+        pairs = [
+            ("directory", "Artist"),
+            ("Last-Modified", "2020"),
+            ("file", "Artist/a.mp3"),
+            ("Title", "A"),
+            ("Artist", "Artist"),
+            ("Artist", "Other"),
+            ("Artist", "Third"),
+        ]
+        assert split_songs(pairs) == [
+            {
+                "file": "Artist/a.mp3",
+                "Title": "A",
+                "Artist": ["Artist", "Other", "Third"],
+            }
+        ]
+
+    @pytest.mark.parametrize(
+        "mpd_host, expected",
+        [
+            ("localhost", ("localhost", 6600, None)),
+            ("secret@localhost", ("localhost", 6600, "secret")),
+            ("/run/mpd/socket", ("/run/mpd/socket", 6600, None)),
+            ("secret@/run/mpd/socket", ("/run/mpd/socket", 6600, "secret")),
+            ("@mpd", ("@mpd", 6600, None)),
+            ("secret@@mpd", ("@mpd", 6600, "secret")),
+        ],
+    )
+    def test_connection_settings(self, monkeypatch, mpd_host, expected):
+        monkeypatch.setenv("MPD_HOST", mpd_host)
+        monkeypatch.delenv("MPD_PORT", raising=False)
+
+        assert get_connection_settings() == expected
+
+    @pytest.mark.parametrize("abstract", [False, True])
+    def test_unix_socket(self, temp_dir, abstract):
+        from fake_mpd import FakeMPD
+
+        path = f"\0mpd-test-{os.getpid()}" if abstract else str(temp_dir / "socket")
+        with FakeMPD(unix_path=path) as fake:
+            host = f"@{path[1:]}" if abstract else path
+            with MPDClient(host) as client:
+                client.command("ping")
+
+        assert fake.commands == ["ping"]
+
+
+@pytest.mark.unit
+class TestSearchFavorites:
+    def test_single_connection_batched(self, fake_mpd):
+        fake_mpd.songs = SONGS
+        favorites = [
+            ("Artist One", "Track One"),
+            ("Artist Two", "track two"),
+            ("Artist Three", "Nothing"),
+        ]
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            results = list(search_favorites(client, favorites, batch_size=2))
+
+        assert fake_mpd.connections == 1
+        assert results == [
+            (
+                ("Artist One", "Track One"),
+                [
+                    "Artist One/Album One/01 Track One.mp3",
+                    "Artist One/Live/01 Track One.flac",
+                ],
+            ),
+            (("Artist Two", "track two"), ["Artist Two/Album Two/02 Track Two.mp3"]),
+            (("Artist Three", "Nothing"), []),
+        ]
+
+    def test_escaped_values(self, fake_mpd):
+        fake_mpd.songs = SONGS
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            results = list(search_favorites(client, [("Quote Band", "It's")]))
+
+        assert results[0][1] == ['Quote "Band"/A/01 It\'s.mp3']
+
+    def test_error_raises(self, fake_mpd):
+        with (
+            MPDClient(fake_mpd.host, fake_mpd.port) as client,
+            pytest.raises(MPDError),
+        ):
+            client.command("unknowncommand")
+
+
+@pytest.mark.unit
+class TestWriteResults:
+    def test_outputs(self, temp_dir, capsys):
+        output = temp_dir / "04.csv"
+        output_missing = temp_dir / "05.csv"
+        results = [
+            (("A", "1"), ["A/x/1.mp3", "A/y/1.mp3"]),
+            (("B", "2"), []),
+        ]
+
+        nb_found, nb_missing = write_results(results, output, output_missing)
+
+        assert (nb_found, nb_missing) == (1, 1)
+        assert output.read_text() == "A/x/1.mp3\nA/y/1.mp3\n"
+        assert output_missing.read_text() == "B - 2\n"
+        assert "Track B - 2 not found in mpd database." in capsys.readouterr().out
+
+    def test_overwrites_previous_results(self, temp_dir):
+        output = temp_dir / "04.csv"
+        output_missing = temp_dir / "05.csv"
+        output.write_text("old\n")
+        output_missing.write_text("old\n")
+
+        write_results([], output, output_missing)
+
+        assert output.read_text() == ""
+        assert output_missing.read_text() == ""
+
+
+@pytest.mark.unit
+class TestMplaylistMain:
+    def test_main_writes_outputs(self, fake_mpd, temp_dir):
+        from mplaylist import main
+
+        fake_mpd.songs = SONGS
+        favorites = temp_dir / "favorites.txt"
+        favorites.write_text("Artist Two - Track Two\nArtist Three - Nothing\n")
+        output = temp_dir / "04.csv"
+        output_missing = temp_dir / "05.csv"
+
+        main(
+            [
+                str(favorites),
+                "--host",
+                fake_mpd.host,
+                "--port",
+                str(fake_mpd.port),
+                "--output",
+                str(output),
+                "--output-missing",
+                str(output_missing),
+                "--cache",
+                str(temp_dir / "cache.json"),
+            ]
+        )
+
+        assert output.read_text() == "Artist Two/Album Two/02 Track Two.mp3\n"
+        assert output_missing.read_text() == "Artist Three - Nothing\n"
@@ -0,0 +1,150 @@
+import random
+
+import pytest
+from mpd_lib import MPDClient
+from mpd_playlist_lib import (
+    edit_script,
+    load_uploaded,
+    save_uploaded,
+    upload_playlists,
+)
+
+
+def apply(commands, tracks):
+    # Same semantics as the stored playlist commands of mpd
+    tracks = list(tracks)
+    for name, _, *args in commands:
+        if name == "playlistdelete":
+            del tracks[int(args[0])]
+        elif name == "playlistadd":
+            tracks.insert(int(args[1]) if len(args) > 1 else len(tracks), args[0])
+        elif name == "playlistmove":
+            tracks.insert(int(args[1]), tracks.pop(int(args[0])))
+    return tracks
+
+
+@pytest.mark.unit
+class TestEditScript:
+    def test_one_track_change_is_one_command(self):
+        current = [f"track{i}.mp3" for i in range(500)]
+
+        added = current[:250] + ["new.mp3"] + current[250:]
+        removed = current[:250] + current[251:]
+        moved = current[:10] + current[11:400] + current[10:11] + current[400:]
+
+        assert edit_script("Rock", current, added) == [
+            ("playlistadd", "Rock", "new.mp3", "250")
+        ]
+        assert edit_script("Rock", current, current + ["new.mp3"]) == [
+            ("playlistadd", "Rock", "new.mp3")
+        ]
+        assert edit_script("Rock", current, removed) == [
+            ("playlistdelete", "Rock", "250")
+        ]
+        assert len(edit_script("Rock", current, moved)) == 1
+        assert edit_script("Rock", current, current) == []
+
+    def test_random_edits(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            current = rng.choices("abcdefgh", k=rng.randint(0, 12))
+            desired = rng.choices("abcdefgh", k=rng.randint(0, 12))
+
+            commands = edit_script("P", current, desired)
+
+            assert apply(commands, current) == desired
+            assert len(commands) <= len(current) + len(desired)
+
+
+@pytest.mark.unit
+class TestUploadPlaylists:
+    @pytest.fixture
+    def folder(self, temp_dir):
+        folder = temp_dir / "mpd_playlists"
+        folder.mkdir()
+        (folder / "1_Rock.m3u").write_text("a.mp3\nb.mp3\nc.mp3")
+        (folder / "2_Pop.m3u").write_text("d.mp3")
+        return folder
+
+    def test_upload(self, fake_mpd, folder):
+        fake_mpd.playlists = {
+            "1_Rock": ["a.mp3", "c.mp3"],
+            "3_Jazz": ["e.mp3"],
+            "Manual": ["f.mp3"],
+        }
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            names, deleted, failed, commands = upload_playlists(
+                client, folder, ["1_Rock", "3_Jazz"]
+            )
+
+        assert names == ["1_Rock", "2_Pop"]
+        assert deleted == ["3_Jazz"]
+        assert failed == []
+        assert fake_mpd.playlists == {
+            "1_Rock": ["a.mp3", "b.mp3", "c.mp3"],
+            "Manual": ["f.mp3"],
+            "2_Pop": ["d.mp3"],
+        }
+        assert commands == [
+            ("playlistadd", "1_Rock", "b.mp3", "1"),
+            ("playlistadd", "2_Pop", "d.mp3"),
+            ("rm", "3_Jazz"),
+        ]
+        assert fake_mpd.commands == [
+            "listplaylists",
+            'listplaylist "1_Rock"',
+            'playlistadd "1_Rock" "b.mp3" "1"',
+            'playlistadd "2_Pop" "d.mp3"',
+            'rm "3_Jazz"',
+        ]
+
+    def test_unchanged_playlists_not_edited(self, fake_mpd, folder):
+        fake_mpd.playlists = {"1_Rock": ["a.mp3", "b.mp3", "c.mp3"], "2_Pop": ["d.mp3"]}
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            upload_playlists(client, folder, ["1_Rock", "2_Pop"])
+
+        assert fake_mpd.commands == [
+            "listplaylists",
+            'listplaylist "1_Rock"',
+            'listplaylist "2_Pop"',
+        ]
+
+    def test_changes_of_other_runs_uploaded(self, fake_mpd, folder):
+        # Playlists changed by a run without --upload are diffed like the others
+        fake_mpd.playlists = {"1_Rock": ["a.mp3"], "2_Pop": ["d.mp3"]}
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            upload_playlists(client, folder, ["1_Rock", "2_Pop"])
+
+        assert fake_mpd.playlists["1_Rock"] == ["a.mp3", "b.mp3", "c.mp3"]
+
+    def test_failed_playlist_reported(self, fake_mpd, folder, monkeypatch, capsys):
+        add = fake_mpd.cmd_playlistadd
+
+        def playlistadd(name, uri, position=None):
+            if uri == "b.mp3":
+                raise KeyError("No such song")
+            return add(name, uri, position)
+
+        monkeypatch.setattr(fake_mpd, "cmd_playlistadd", playlistadd)
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            _, _, failed, commands = upload_playlists(client, folder)
+
+        assert failed == ["1_Rock"]
+        assert fake_mpd.playlists == {"1_Rock": ["a.mp3"], "2_Pop": ["d.mp3"]}
+        assert commands == [("playlistadd", "2_Pop", "d.mp3")]
+        assert "WARNING: can't upload 1_Rock to mpd" in capsys.readouterr().out
+
+
+@pytest.mark.unit
+class TestUploaded:
+    def test_roundtrip(self, temp_dir):
+        record_file = temp_dir / "uploaded.json"
+        assert load_uploaded(record_file) == []
+
+        save_uploaded(record_file, {"2_Pop", "1_Rock"})
+
+        assert load_uploaded(record_file) == ["1_Rock", "2_Pop"]
@@ -0,0 +1,104 @@
+import os
+import threading
+
+import pytest
+import path_lib
+from path_lib import PathValidator, list_directory
+
+
+@pytest.fixture
+def music_dir(temp_dir):
+    for name in ["A/a1.mp3", "A/a2.mp3", "B/b1.flac"]:
+        path = temp_dir / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text("test")
+    (temp_dir / "A" / "Subfolder").mkdir()
+    return temp_dir
+
+
+@pytest.mark.unit
+class TestListDirectory:
+    def test_files_only(self, music_dir):
+        mtime, names = list_directory(music_dir / "A")
+
+        assert names == ["a1.mp3", "a2.mp3"]
+        assert mtime == os.stat(music_dir / "A").st_mtime_ns
+
+    def test_cached_listing_reused(self, music_dir):
+        cached = [os.stat(music_dir / "A").st_mtime_ns, ["cached.mp3"]]
+
+        assert list_directory(music_dir / "A", cached) is cached
+
+
+@pytest.mark.unit
+class TestPathValidator:
+    def test_validate(self, music_dir):
+        paths = [
+            str(music_dir / "A/a1.mp3"),
+            str(music_dir / "A/missing.mp3"),
+            str(music_dir / "A/Subfolder"),
+            str(music_dir / "B/b1.flac"),
+            str(music_dir / "C/c1.mp3"),
+        ]
+
+        result = PathValidator().validate(paths)
+
+        assert result == {
+            paths[0]: True,
+            paths[1]: False,
+            paths[2]: False,
+            paths[3]: True,
+            paths[4]: False,
+        }
+
+    def test_one_listing_per_directory(self, music_dir):
+        validator = PathValidator()
+
+        validator.validate([str(music_dir / "A/a1.mp3"), str(music_dir / "A/a2.mp3")])
+
+        assert validator.listings == 1
+
+    def test_cache_across_runs(self, music_dir):
+        cache_file = music_dir / "cache.json"
+        paths = [str(music_dir / "A/a1.mp3"), str(music_dir / "A/new.mp3")]
+        PathValidator(cache_file).validate(paths)
+
+        validator = PathValidator(cache_file)
+        assert validator.validate(paths) == {paths[0]: True, paths[1]: False}
+        assert validator.listings == 0
+
+        (music_dir / "A/new.mp3").write_text("test")
+        os.utime(music_dir / "A", ns=(0, 1))
+        validator = PathValidator(cache_file)
+        assert validator.validate(paths) == {paths[0]: True, paths[1]: True}
+        assert validator.listings == 1
+
+    def test_unused_directories_pruned(self, music_dir):
+        cache_file = music_dir / "cache.json"
+        PathValidator(cache_file).validate(
+            [str(music_dir / "A/a1.mp3"), str(music_dir / "B/b1.flac")]
+        )
+
+        PathValidator(cache_file).validate([str(music_dir / "B/b1.flac")])
+
+        assert list(PathValidator(cache_file).cache) == [str(music_dir / "B")]
+
+    def test_timeout_on_hung_directory(self, music_dir, monkeypatch, capsys):
+        released = threading.Event()
+        list_directory = path_lib.list_directory
+
+        def hanging_list_directory(directory, cached=None):
+            if directory.endswith("B"):
+                released.wait()
+            return list_directory(directory, cached)
+
+        monkeypatch.setattr(path_lib, "list_directory", hanging_list_directory)
+        paths = [str(music_dir / "A/a1.mp3"), str(music_dir / "B/b1.flac")]
+
+        try:
+            result = PathValidator(timeout=0.2).validate(paths)
+        finally:
+            released.set()
+
+        assert result == {paths[0]: True, paths[1]: False}
+        assert "WARNING" in capsys.readouterr().out
@@ -3,10 +3,17 @@ from playlist_lib import (
     read_files,
     build_artist_dict,
     match_tracks,
+    iter_matches,
     match_missing_tracks,
     build_playlists,
     export_playlists,
     export_raw_playlists,
+    load_manifest,
+    TrackTable,
+    match_tracks_table,
+    match_missing_tracks_table,
+    iter_content,
+    write_playlist_files,
 )
 
 
@@ -193,6 +200,19 @@ class TestMatchTracks:
         assert file_list == []
         assert missing_artists == []
 
+    def test_iter_matches_missing_set(self):
+        missing = set()
+        pairs = list(
+            iter_matches(
+                ["A/x.mp3", "B/y.mp3", "C/z.mp3", "C/w.mp3"],
+                {"A": ["1", "2"], "B": ["2"]},
+                missing,
+            )
+        )
+
+        assert pairs == [("1", "A/x.mp3"), ("2", "A/x.mp3"), ("2", "B/y.mp3")]
+        assert missing == {"C"}
+
 
 @pytest.mark.unit
 class TestMatchMissingTracks:
@@ -422,3 +442,210 @@ class TestExportRawPlaylists:
         export_raw_playlists(final_dict, str(folder))
 
         assert (folder / "1_Rock-Metal.txt").exists()
+
+
+@pytest.mark.unit
+class TestIncrementalExport:
+    def test_unchanged_playlists_are_not_rewritten(self, temp_dir):
+        folder = temp_dir / "playlists"
+        manifest = temp_dir / "manifest.json"
+        final_dict = {"1_Rock": ["track1.mp3"], "2_Pop": ["track2.mp3"]}
+
+        written, _ = export_playlists(str(folder), "/music/", final_dict, manifest)
+        assert len(written) == 2
+        mtime = (folder / "2_Pop.m3u").stat().st_mtime_ns
+
+        final_dict["1_Rock"].append("track3.mp3")
+        written, removed = export_playlists(
+            str(folder), "/music/", final_dict, manifest
+        )
+
+        assert written == [f"{folder}/1_Rock.m3u"]
+        assert removed == []
+        assert (folder / "2_Pop.m3u").stat().st_mtime_ns == mtime
+        assert (folder / "1_Rock.m3u").read_text() == (
+            "/music/track1.mp3\n/music/track3.mp3"
+        )
+
+    def test_missing_file_is_rewritten(self, temp_dir):
+        folder = temp_dir / "raw_playlists"
+        manifest = temp_dir / "manifest.json"
+        final_dict = {"1_Rock": ["track1.mp3"]}
+
+        export_raw_playlists(final_dict, str(folder), manifest)
+        (folder / "1_Rock.txt").unlink()
+        written, _ = export_raw_playlists(final_dict, str(folder), manifest)
+
+        assert written == [f"{folder}/1_Rock.txt"]
+        assert (folder / "1_Rock.txt").exists()
+
+    def test_externally_modified_file_is_rewritten(self, temp_dir):
+        folder = temp_dir / "playlists"
+        manifest = temp_dir / "manifest.json"
+        final_dict = {"1_Rock": ["track1.mp3"]}
+
+        export_playlists(str(folder), "", final_dict, manifest)
+        (folder / "1_Rock.m3u").write_text("edited by hand")
+        written, _ = export_playlists(str(folder), "", final_dict, manifest)
+
+        assert written == [f"{folder}/1_Rock.m3u"]
+        assert (folder / "1_Rock.m3u").read_text() == "track1.mp3"
+
+    def test_stale_playlists_are_deleted(self, temp_dir):
+        folder = temp_dir / "playlists"
+        other_folder = temp_dir / "mpd_playlists"
+        manifest = temp_dir / "manifest.json"
+
+        export_playlists(str(folder), "", {"1_Rock": ["a"], "2_Pop": ["b"]}, manifest)
+        export_playlists(str(other_folder), "", {"2_Pop": ["b"]}, manifest)
+        (folder / "manual.m3u").write_text("kept")
+
+        written, removed = export_playlists(
+            str(folder), "", {"1_Rock": ["a"]}, manifest
+        )
+
+        assert written == []
+        assert removed == [f"{folder}/2_Pop.m3u"]
+        assert not (folder / "2_Pop.m3u").exists()
+        assert (folder / "manual.m3u").exists()
+        assert (other_folder / "2_Pop.m3u").exists()
+        assert f"{other_folder}/2_Pop.m3u" in load_manifest(manifest)
+
+    def test_without_manifest_always_writes(self, temp_dir):
+        folder = temp_dir / "playlists"
+        final_dict = {"1_Rock": ["a"]}
+
+        export_playlists(str(folder), "", final_dict)
+        written, _ = export_playlists(str(folder), "", final_dict)
+
+        assert written == [f"{folder}/1_Rock.m3u"]
+
+
+@pytest.mark.unit
+class TestPlaylistWriters:
+    @pytest.mark.parametrize("nb_tracks", [0, 1, 3, 4, 10])
+    def test_iter_content_same_as_join(self, nb_tracks):
+        tracks = [f"track{i}.mp3" for i in range(nb_tracks)]
+
+        content = "".join(iter_content("/music/", tracks, chunk_size=3))
+
+        assert content == "\n".join(f"/music/{x}" for x in tracks)
+
+    def test_manifest_hash_of_the_content(self, temp_dir):
+        import hashlib
+
+        folder = temp_dir / "playlists"
+        manifest = temp_dir / "manifest.json"
+
+        export_playlists(str(folder), "/music/", {"1_Rock": ["a", "b"]}, manifest)
+
+        digest = hashlib.sha1(b"/music/a\n/music/b").hexdigest()
+        assert load_manifest(manifest)[f"{folder}/1_Rock.m3u"][0] == digest
+
+    def test_crash_keeps_previous_playlist(self, temp_dir):
+        folder = temp_dir / "playlists"
+        export_playlists(str(folder), "", {"1_Rock": ["a", "b"]})
+
+        class Tracks:
+            # Fails while the file is written, after the content was hashed
+            iterations = 0
+
+            def __iter__(self):
+                self.iterations += 1
+                yield "c"
+                if self.iterations > 1:
+                    raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            write_playlist_files(str(folder), {f"{folder}/1_Rock.m3u": ("", Tracks())})
+
+        assert (folder / "1_Rock.m3u").read_text() == "a\nb"
+        assert [x.name for x in folder.iterdir()] == ["1_Rock.m3u"]
+
+    def test_parallel_writers(self, temp_dir):
+        folder = temp_dir / "playlists"
+        final_dict = {f"{i}_Playlist": [f"track{i}.mp3"] * 100 for i in range(20)}
+
+        written, _ = export_playlists(str(folder), "/music/", final_dict)
+
+        assert written == [f"{folder}/{x}.m3u" for x in final_dict]
+        for name, tracks in final_dict.items():
+            assert (folder / f"{name}.m3u").read_text() == "\n".join(
+                f"/music/{x}" for x in tracks
+            )
+
+
+@pytest.mark.unit
+class TestTrackTable:
+    def test_tracks_are_interned(self):
+        table = TrackTable()
+        table.add("1", "Artist/Album/a.mp3")
+        table.add("2", "Artist/Album/a.mp3")
+        table.add("1", "Artist/Album/b.mp3")
+
+        assert table.tracks == ["Artist/Album/a.mp3", "Artist/Album/b.mp3"]
+        assert list(table.playlists["1"]) == [0, 1]
+        assert list(table.playlists["2"]) == [0]
+        assert len(table) == 3
+
+    def test_view(self):
+        table = TrackTable()
+        table.add_pairs([("1", "a"), ("1", "b"), ("1", "c")])
+        view = table.view("1")
+
+        assert len(view) == 3
+        assert view == ["a", "b", "c"]
+        assert view[1] == "b"
+        assert view[-2:] == ["b", "c"]
+
+    def test_same_playlists_as_list_of_dicts(self):
+        tracks = [
+            "Artist One/Album/Track1.mp3",
+            "Artist Two/Album/Track2.mp3",
+            "Unknown/Album/Track3.mp3",
+            "Artist One/Album/Track4.mp3",
+        ]
+        artist_dict = {"Artist One": ["1", "2"], "Artist Two": ["2"]}
+        playlist_dict = {"1": "Rock", "2": "Pop"}
+
+        file_list, missing_artists = match_tracks(tracks, artist_dict)
+        table = TrackTable()
+        table_missing_artists = match_tracks_table(tracks, artist_dict, table)
+
+        expected = build_playlists(file_list, playlist_dict)
+        result = build_playlists(table, playlist_dict)
+        assert result == expected
+        assert list(result) == list(expected)
+        assert table_missing_artists == missing_artists
+
+    def test_extend_keeps_order(self, temp_dir):
+        test_file = temp_dir / "track.mp3"
+        test_file.write_text("test")
+        missing_dict = {"Artist Three - Track": str(test_file)}
+        artist_dict = {"Artist One": ["1"], "Artist Three": ["3", "1"]}
+        playlist_dict = {"1": "Rock", "3": "Jazz"}
+
+        missing_table, list_missing_paths, _ = match_missing_tracks_table(
+            ["Artist Three - Track", "Other - Track"], missing_dict, artist_dict
+        )
+        table = TrackTable()
+        match_tracks_table(["Artist One/a.mp3"], artist_dict, table)
+        table.extend(missing_table)
+
+        missing_file_list, _, _ = match_missing_tracks(
+            ["Artist Three - Track", "Other - Track"], missing_dict, artist_dict
+        )
+        file_list, _ = match_tracks(["Artist One/a.mp3"], artist_dict)
+        assert build_playlists(table, playlist_dict) == build_playlists(
+            file_list + missing_file_list, playlist_dict
+        )
+        assert list_missing_paths == ["Other - Track"]
+
+    def test_export_from_table(self, temp_dir):
+        table = TrackTable()
+        table.add_pairs([("1", "a.mp3"), ("1", "b.mp3")])
+        final_dict = build_playlists(table, {"1": "Rock"})
+
+        export_playlists(str(temp_dir), "/music/", final_dict)
+
+        assert (temp_dir / "1_Rock.m3u").read_text() == "/music/a.mp3\n/music/b.mp3"
@@ -0,0 +1,145 @@
+import mplaylist
+import pytest
+from cache_lib import QueryCache, get_db_update
+from library_lib import IncrementalMatcher, save_dump
+from match_lib import search_favorites
+from mpd_lib import MPDClient
+from rank_lib import Ranking, parse_rules
+
+FAVORITE = ("Artist One", "Track One")
+
+SONGS = [
+    {
+        "file": "Various/Best Of 1990/07 Track One.flac",
+        "Artist": "Artist One",
+        "Title": "Track One",
+        "Album": "Best Of 1990",
+        "AlbumArtist": "Various Artists",
+    },
+    {
+        "file": "Artist One/Live in Paris/03 Track One.flac",
+        "Artist": "Artist One",
+        "Title": "Track One",
+        "Album": "Live in Paris",
+    },
+    {
+        "file": "Artist One/Album One/01 Track One.mp3",
+        "Artist": "Artist One",
+        "Title": "Track One",
+        "Album": "Album One",
+    },
+    {
+        "file": "Artist One/Album One (Deluxe)/01 Track One.flac",
+        "Artist": "Artist One",
+        "Title": "Track One",
+        "Album": "Album One (Deluxe)",
+    },
+    {
+        "file": "Artist One/Album One/01 track one.flac",
+        "Artist": "artist one",
+        "Title": "track one",
+        "Album": "Album One",
+    },
+]
+
+
+def files(indexes):
+    return [SONGS[i]["file"] for i in indexes]
+
+
+@pytest.mark.unit
+class TestRanking:
+    def test_default_rules(self):
+        ranking = Ranking(top=None)
+
+        assert ranking.rank(FAVORITE, SONGS) == files([3, 2, 1, 0, 4])
+
+    @pytest.mark.parametrize(
+        "rules, expected",
+        [
+            (("exact",), [0, 1, 2, 3, 4]),
+            (("album",), [2, 3, 4, 1, 0]),
+            (("format",), [0, 1, 3, 4, 2]),
+            (("length",), [2, 0, 4, 1, 3]),
+            (("format", "length"), [0, 4, 1, 3, 2]),
+        ],
+    )
+    def test_single_rules(self, rules, expected):
+        assert Ranking(rules, top=None).rank(FAVORITE, SONGS) == files(expected)
+
+    def test_top(self):
+        assert Ranking(top=2).rank(FAVORITE, SONGS) == files([3, 2])
+        assert Ranking(top=1).rank(FAVORITE, SONGS[:1]) == files([0])
+
+    def test_preferred_formats(self):
+        ranking = Ranking(("format",), top=1, formats=["mp3", "flac"])
+
+        assert ranking.rank(FAVORITE, SONGS) == files([2])
+
+    def test_featured_artist_is_not_a_compilation(self):
+        song = {
+            "file": "A/B/01.mp3",
+            "Artist": "Artist One feat. Other",
+            "AlbumArtist": "Artist One",
+        }
+
+        assert Ranking().rank_album(*FAVORITE, song) == 0
+
+    def test_parse_rules(self):
+        assert parse_rules("format, exact") == ("format", "exact")
+        with pytest.raises(ValueError, match="unknown rules size"):
+            parse_rules("exact,size")
+
+
+@pytest.mark.unit
+class TestRankedMatching:
+    def test_search_favorites(self, fake_mpd, temp_dir):
+        fake_mpd.songs = SONGS
+
+        with MPDClient(fake_mpd.host, fake_mpd.port) as client:
+            cache = QueryCache(temp_dir / "cache.json", get_db_update(client))
+            first = list(search_favorites(client, [FAVORITE], cache=cache))
+            cache.save()
+
+            cache = QueryCache(temp_dir / "cache.json", get_db_update(client))
+            ranked = list(
+                search_favorites(client, [FAVORITE], cache=cache, ranking=Ranking())
+            )
+
+        assert first == [(FAVORITE, files([0, 1, 2, 3, 4]))]
+        assert ranked == [(FAVORITE, files([3]))]
+        assert len([x for x in fake_mpd.commands if x.startswith("search")]) == 1
+
+    def test_incremental_matcher(self):
+        matcher = IncrementalMatcher([FAVORITE], SONGS[:3], Ranking())
+        assert list(matcher.results()) == [(FAVORITE, files([2]))]
+
+        _, _, _, changed = matcher.update(SONGS)
+
+        assert changed == [FAVORITE]
+        assert list(matcher.results()) == [(FAVORITE, files([3]))]
+
+    def test_mplaylist_top(self, temp_dir):
+        dump = temp_dir / "library.txt"
+        favorites = temp_dir / "favorites.txt"
+        output = temp_dir / "04.csv"
+        save_dump(SONGS, dump)
+        favorites.write_text("Artist One - Track One\n")
+
+        mplaylist.main(
+            [
+                str(favorites),
+                "--dump",
+                str(dump),
+                "--top",
+                "1",
+                "--formats",
+                "mp3",
+                "--output",
+                str(output),
+                "--output-missing",
+                str(temp_dir / "05.csv"),
+            ]
+        )
+
+        assert output.read_text() == f"{SONGS[2]['file']}\n"
@@ -0,0 +1,77 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import report_lib
+from report_lib import RunReport, count, counted, span
+
+
+@pytest.fixture
+def report():
+    report = report_lib.enable()
+    yield report
+    report_lib.disable()
+
+
+@pytest.mark.unit
+class TestRunReport:
+    def test_span(self):
+        ticks = iter([0.0, 1.0, 3.5, 4.0])
+        report = RunReport(clock=lambda: next(ticks))
+
+        with report.span("parse"):
+            pass
+
+        assert report.spans[0]["name"] == "parse"
+        assert report.spans[0]["start"] == 1.0
+        assert report.spans[0]["duration"] == 2.5
+        assert report.spans[0]["peak_memory"] > 0
+        assert report.to_dict()["duration"] == 4.0
+
+    def test_span_recorded_on_error(self):
+        report = RunReport()
+
+        with pytest.raises(ValueError):
+            with report.span("parse"):
+                raise ValueError
+
+        assert [x["name"] for x in report.spans] == ["parse"]
+
+    def test_save(self, temp_dir):
+        report = RunReport()
+        report.count("lines", 3)
+        report.count("lines")
+
+        report.save(temp_dir / "report.json")
+
+        data = json.loads((temp_dir / "report.json").read_text())
+        assert data["counters"] == {"lines": 4}
+        assert data["spans"] == []
+
+
+@pytest.mark.unit
+class TestModuleFunctions:
+    def test_off_by_default(self):
+        items = [1, 2]
+
+        assert counted("items", items) is items
+        assert span("parse") is report_lib.NULL_SPAN
+        count("lines")
+
+    def test_enabled(self, report):
+        with span("parse"):
+            count("lines", 2)
+            assert list(counted("items", iter([1, 2, 3]))) == [1, 2, 3]
+
+        assert report.counters == {"lines": 2, "items": 3}
+        assert [x["name"] for x in report.spans] == ["parse"]
+
+    def test_count_from_threads(self, report):
+        def work(_):
+            for _ in range(10000):
+                count("stat_calls")
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(work, range(8)))
+
+        assert report.counters["stat_calls"] == 80000
@@ -0,0 +1,119 @@
+import pytest
+from smart_lib import parse_range, parse_rule, read_smart_playlists
+from snapshot_lib import Snapshot, write_snapshot
+
+SONGS = [
+    {
+        "file": "Art Blakey/Moanin'/01 Moanin'.flac",
+        "Artist": "Art Blakey",
+        "Title": "Moanin'",
+        "Genre": "Jazz",
+        "Date": "1958-10-30",
+        "duration": "575.000",
+    },
+    {
+        "file": "Miles Davis/Kind of Blue/01 So What.FLAC",
+        "Artist": "Miles Davis",
+        "Title": "So What",
+        "Genre": "jazz",
+        "Date": "1959",
+        "duration": "562.5",
+    },
+    {
+        "file": "Miles Davis/Bitches Brew/01 Pharaoh's Dance.mp3",
+        "Genre": "Jazz",
+        "Date": "1970",
+        "duration": "1200",
+    },
+    {
+        "file": "Björk/Debut/01 Human Behaviour.ogg",
+        "Genre": "Pop",
+        "Date": "1993",
+        "duration": "252",
+    },
+    {"file": "Untagged/01.flac"},
+]
+
+
+def files(indexes):
+    return [SONGS[i]["file"] for i in indexes]
+
+
+@pytest.fixture
+def snapshot_file(temp_dir):
+    snapshot_file = temp_dir / "library.snapshot"
+    write_snapshot(SONGS, snapshot_file)
+    return snapshot_file
+
+
+@pytest.mark.unit
+class TestRules:
+    def test_parse_range(self):
+        assert parse_range("1955-1965") == (1955, 1965)
+        assert parse_range("1959") == (1959, 1959)
+        assert parse_range("-600") == (None, 600)
+        assert parse_range("120-") == (120, None)
+        with pytest.raises(ValueError, match="invalid range"):
+            parse_range("fifties")
+
+    def test_parse_rule(self):
+        assert parse_rule("genre=Jazz|Hard Bop") == ("genre", {"jazz", "hard bop"})
+        assert parse_rule("favorites") == ("favorites", None)
+        with pytest.raises(ValueError, match="unknown rule bpm"):
+            parse_rule("bpm=120")
+        with pytest.raises(ValueError, match="needs a value"):
+            parse_rule("genre=")
+
+    def test_read_smart_playlists(self, temp_dir):
+        smart_file = temp_dir / "10_smart-playlists.csv"
+        smart_file.write_text("Hard Bop;genre=jazz;year=1955-1965\n\nAll\n")
+
+        assert read_smart_playlists(smart_file) == [
+            ("Hard Bop", [("genre", {"jazz"}), ("year", (1955, 1965))]),
+            ("All", []),
+        ]
+
+        smart_file.write_text("Hard Bop;genre=jazz;year=fifties\n")
+        with pytest.raises(ValueError, match="line 1 of"):
+            read_smart_playlists(smart_file)
+
+
+@pytest.mark.unit
+class TestBuildSmartPlaylists:
+    @pytest.mark.parametrize(
+        "rules, expected",
+        [
+            ([], [0, 1, 2, 3, 4]),
+            (["genre=JAZZ"], [0, 1, 2]),
+            (["genre=pop|rock"], [3]),
+            (["year=1955-1965"], [0, 1]),
+            (["year=1970-"], [2, 3]),
+            (["duration=-600"], [0, 1, 3]),
+            (["format=flac"], [0, 1, 4]),
+            (["format=mp3|ogg"], [2, 3]),
+            (["path=Miles Davis/*"], [1, 2]),
+            (["favorites"], [1, 3]),
+            (["genre=jazz", "year=1959-", "format=flac"], [1]),
+            (["path=*/01 *", "duration=500-"], [0, 1, 2]),
+        ],
+    )
+    def test_rules(self, snapshot_file, rules, expected):
+        pytest.importorskip("numpy")
+        from smart_lib import build_smart_playlists
+
+        favorites = files([1, 3]) + ["Not/In/The/Library.mp3"]
+        with Snapshot(snapshot_file) as snapshot:
+            result = build_smart_playlists(
+                snapshot, [("Smart", [parse_rule(x) for x in rules])], favorites
+            )
+
+        assert result == {"Smart": files(expected)}
+
+    def test_snapshot_closed_after_build(self, snapshot_file):
+        pytest.importorskip("numpy")
+        from smart_lib import build_smart_playlists
+
+        snapshot = Snapshot(snapshot_file)
+        build_smart_playlists(snapshot, [("Smart", [parse_rule("year=1959")])])
+
+        snapshot.close()
@@ -0,0 +1,129 @@
+import mplaylist
+import pytest
+from library_lib import build_index, resolve_favorites, save_dump
+from playlist_lib import TrackTable, build_artist_dict, match_tracks_table
+from rank_lib import Ranking
+from snapshot_lib import FIELDS, Snapshot, SnapshotError, write_snapshot
+
+SONGS = [
+    {
+        "file": "Artist One/Album One/01 Track One.flac",
+        "Artist": "Artist One",
+        "Title": "Track One",
+        "Album": "Album One",
+        "duration": "201.5",
+        "Genre": "Rock",
+    },
+    {
+        "file": "Various/Best Of/07 Track One.mp3",
+        "Artist": "ARTIST ONE ",
+        "Title": "track one",
+    },
+    {"file": "Untagged/01.mp3"},
+    {
+        "file": "Tinissima 4et/Monk'n'Roll/01 Mrs. Robinson.flac",
+        "Artist": "Francesco Bearzatti",
+        "AlbumArtist": "Francesco Bearzatti Tinissima 4et",
+        "Title": "Mrs. Robinson",
+    },
+    {
+        "file": "Björk/Debut/01 Human Behaviour.flac",
+        "Artist": "Björk",
+        "Title": "Human Behaviour",
+    },
+]
+
+FAVORITES = [
+    ("Artist One", "Track One"),
+    ("björk", "HUMAN BEHAVIOUR"),
+    ("Francesco Bearzatti", "Mrs. Robinson"),
+    ("Nobody", "Track One"),
+]
+
+
+@pytest.fixture
+def snapshot_file(temp_dir):
+    snapshot_file = temp_dir / "library.snapshot"
+    write_snapshot(SONGS, snapshot_file)
+    return snapshot_file
+
+
+@pytest.mark.unit
+class TestSnapshot:
+    def test_songs(self, snapshot_file):
+        with Snapshot(snapshot_file) as snapshot:
+            assert len(snapshot) == len(SONGS)
+            assert list(snapshot) == [
+                {k: v for k, v in x.items() if k in FIELDS} for x in SONGS
+            ]
+            assert list(snapshot.songs(("file", "Title")))[3] == {
+                "file": "Tinissima 4et/Monk'n'Roll/01 Mrs. Robinson.flac",
+                "Title": "Mrs. Robinson",
+            }
+
+    @pytest.mark.parametrize("tags", [False, True])
+    def test_same_results_as_build_index(self, snapshot_file, tags):
+        ranking = Ranking(top=None) if tags else None
+        expected = list(
+            resolve_favorites(FAVORITES, build_index(SONGS, tags=tags), ranking)
+        )
+
+        with Snapshot(snapshot_file) as snapshot:
+            results = list(
+                resolve_favorites(FAVORITES, snapshot.index(tags=tags), ranking)
+            )
+
+        assert results == expected
+        assert [len(x) for _, x in results] == [2, 1, 1, 0]
+
+    def test_tag_artists(self, snapshot_file):
+        artist_dict = build_artist_dict([("Francesco Bearzatti", "3")])
+        table = TrackTable()
+
+        with Snapshot(snapshot_file) as snapshot:
+            tag_artists = snapshot.tag_artists()
+            assert tag_artists.get("Untagged/01.mp3", ()) == ()
+            assert tag_artists.get("Missing/01.mp3") is None
+            missing_artists = match_tracks_table(
+                [x["file"] for x in SONGS], artist_dict, table, tag_artists=tag_artists
+            )
+
+        assert list(table.view("3")) == [SONGS[3]["file"]]
+        assert "Tinissima 4et" not in missing_artists
+
+    def test_empty_library(self, temp_dir):
+        write_snapshot([], temp_dir / "empty.snapshot")
+
+        with Snapshot(temp_dir / "empty.snapshot") as snapshot:
+            assert list(snapshot) == []
+            assert snapshot.index().get(("a", "b"), []) == []
+
+    def test_not_a_snapshot(self, temp_dir):
+        (temp_dir / "library.txt").write_text("file: a.mp3\n")
+
+        with pytest.raises(SnapshotError):
+            Snapshot(temp_dir / "library.txt")
+
+    def test_mplaylist_save_and_match(self, temp_dir):
+        dump = temp_dir / "library.txt"
+        snapshot_file = temp_dir / "library.snapshot"
+        favorites = temp_dir / "favorites.txt"
+        save_dump(SONGS, dump)
+        favorites.write_text("Artist One - Track One\nNobody - Track One\n")
+        outputs = ["--output-missing", str(temp_dir / "05.csv")]
+
+        mplaylist.main(
+            [str(favorites), "--dump", str(dump), "--save-snapshot", str(snapshot_file)]
+            + ["--output", str(temp_dir / "dump.csv")]
+            + outputs
+        )
+        mplaylist.main(
+            [str(favorites), "--snapshot", str(snapshot_file)]
+            + ["--output", str(temp_dir / "snapshot.csv")]
+            + outputs
+        )
+
+        assert (temp_dir / "snapshot.csv").read_text() == (
+            temp_dir / "dump.csv"
+        ).read_text()
+        assert (temp_dir / "05.csv").read_text() == "Nobody - Track One\n"
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+from spread_lib import spread_tracks, track_artist
+
+
+def min_gap(tracks):
+    last = {}
+    gaps = [len(tracks)]
+    for i, track in enumerate(tracks):
+        artist = track_artist(track)
+        if artist in last:
+            gaps.append(i - last[artist] - 1)
+        last[artist] = i
+    return min(gaps)
+
+
+def burst_tracks(nb_artists=20, nb_tracks=500, seed=0):
+    # Favorites added in bursts of tracks of the same artist
+    rng = random.Random(seed)
+    tracks = []
+    while len(tracks) < nb_tracks:
+        artist = f"Artist {rng.randrange(nb_artists)}"
+        tracks += [f"{artist}/Album/{len(tracks):03d}.mp3"] * rng.randint(1, 5)
+    return [f"{x[:-4]}-{i}.mp3" for i, x in enumerate(tracks)]
+
+
+@pytest.mark.unit
+class TestSpreadTracks:
+    def test_gap_enforced(self):
+        tracks = burst_tracks()
+        assert min_gap(tracks) == 0
+
+        spread = spread_tracks(tracks, 5)
+
+        assert sorted(spread) == sorted(tracks)
+        # The last tracks are left to the few artists with tracks remaining
+        assert min_gap(spread[:-10]) >= 5
+
+    def test_no_gap_keeps_order(self):
+        tracks = burst_tracks()
+        assert spread_tracks(tracks, 0) == tracks
+
+    def test_recency_kept(self):
+        # Newest tracks are at the end, and stay near it
+        tracks = burst_tracks()
+        spread = spread_tracks(tracks, 5)
+
+        positions = {x: i for i, x in enumerate(spread)}
+        assert all(abs(positions[x] - i) < 50 for i, x in enumerate(tracks))
+        assert set(spread[-20:]) & set(tracks[-10:])
+
+    def test_not_enough_artists(self):
+        tracks = ["A/1.mp3", "A/2.mp3", "A/3.mp3", "B/1.mp3", "a/4.mp3"]
+
+        assert spread_tracks(tracks, 2) == [
+            "A/1.mp3",
+            "B/1.mp3",
+            "A/2.mp3",
+            "A/3.mp3",
+            "a/4.mp3",
+        ]
+
+    def test_seeded(self):
+        tracks = burst_tracks()
+
+        assert spread_tracks(tracks, 5, seed=1) == spread_tracks(tracks, 5, seed=1)
+        assert spread_tracks(tracks, 5, seed=1) != spread_tracks(tracks, 5, seed=2)
+
+    def test_stable_when_tracks_added(self):
+        # New favorites don't move the older tracks far from their spread position
+        tracks = burst_tracks()
+        before = spread_tracks(tracks[:-10], 5)
+        after = spread_tracks(tracks, 5)
+
+        assert after[:400] == before[:400]
+
+    def test_separator(self):
+        tracks = ["A - 1", "A - 2", "B - 1"]
+        assert spread_tracks(tracks, 1, sep=" - ") == ["A - 1", "B - 1", "A - 2"]
@@ -0,0 +1,78 @@
+import pytest
+import state_store
+from playlist_lib import read_artist_list
+from store_lib import StateStore
+
+FILES = {
+    "playlists": "1;Rock\n2;Pop\n",
+    "artists": "1;Artist One\n2;Artist Two\n1;Artist Two\n2;Björk\n",
+    "aliases": "\r\nA1;Artist One",
+    "fix": "Artist One - Track Five;/music/Artist One/05.mp3\n",
+}
+
+
+@pytest.fixture
+def files(temp_dir):
+    files = {}
+    for name, content in FILES.items():
+        files[name] = temp_dir / f"{name}.csv"
+        files[name].write_bytes(content.encode("utf-8"))
+    return files
+
+
+@pytest.mark.unit
+class TestStateStore:
+    def test_lossless_export(self, temp_dir, files):
+        with StateStore(temp_dir / "state.sqlite3") as store:
+            store.sync(files)
+            for filename in files.values():
+                filename.unlink()
+            for name, filename in files.items():
+                assert store.export_file(name, filename)
+
+        for name, filename in files.items():
+            assert filename.read_bytes() == FILES[name].encode("utf-8")
+
+    def test_only_changed_files_imported(self, temp_dir, files):
+        with StateStore(temp_dir / "state.sqlite3") as store:
+            assert store.sync(files) == list(FILES)
+            assert store.sync(files) == []
+
+        files["playlists"].write_text("1;Rock\n2;Pop\n3;Jazz\n")
+        files["aliases"].unlink()
+        with StateStore(temp_dir / "state.sqlite3") as store:
+            assert store.sync(files) == ["playlists", "aliases"]
+            assert store.playlist_dict() == {"1": "Rock", "2": "Pop", "3": "Jazz"}
+            assert store.alias_list() == []
+            assert not store.export_file("aliases", files["aliases"])
+
+    def test_same_fields_as_read_functions(self, temp_dir, files):
+        with StateStore(temp_dir / "state.sqlite3") as store:
+            store.sync(files)
+
+            assert store.artist_list() == read_artist_list(files["artists"])
+            assert store.missing_dict() == {
+                "Artist One - Track Five": "/music/Artist One/05.mp3"
+            }
+            assert store.alias_list() == [("A1", "Artist One")]
+
+    def test_malformed_lines_skipped(self, temp_dir, files, capsys):
+        files["artists"].write_text("1;Artist One\nArtist Two\n2;Björk\n")
+
+        with StateStore(temp_dir / "state.sqlite3") as store:
+            store.sync(files)
+
+            assert store.artist_list() == [("Artist One", "1"), ("Björk", "2")]
+        assert f"WARNING: line 2 of {files['artists']} is malformed" in (
+            capsys.readouterr().out
+        )
+
+    def test_state_store_script(self, temp_dir, files, monkeypatch):
+        monkeypatch.setattr(state_store, "input_files", lambda: files)
+        db_file = str(temp_dir / "state.sqlite3")
+
+        state_store.main(["import", "--store", db_file])
+        files["artists"].write_text("")
+        state_store.main(["export", "--store", db_file, "--file", "artists"])
+
+        assert files["artists"].read_text() == FILES["artists"]
@@ -0,0 +1,107 @@
+import pytest
+from playlist_lib import build_playlists, export_playlists, load_manifest
+from stream_lib import (
+    iter_fields,
+    reverse_lines,
+    group_playlists,
+    export_playlist_streams,
+)
+
+
+@pytest.mark.unit
+class TestReverseLines:
+    @pytest.mark.parametrize(
+        "content",
+        [
+            "",
+            "\n",
+            "a",
+            "a\n",
+            "a\nb\nc",
+            "a\nb\nc\n",
+            " a \n\nb\r\nc\n",
+            "é\nà\nü\n" * 10,
+        ],
+    )
+    @pytest.mark.parametrize("block_size", [1, 2, 7, 65536])
+    def test_same_lines_as_readlines(self, temp_dir, content, block_size):
+        path = temp_dir / "lines.txt"
+        path.write_bytes(content.encode("utf-8"))
+        with open(path, "r", encoding="utf-8") as f:
+            expected = [x.strip() for x in f.readlines()]
+
+        assert list(reverse_lines(path, block_size)) == expected[::-1]
+
+    def test_iter_fields(self, temp_dir):
+        path = temp_dir / "fields.csv"
+        path.write_text("1;Rock\n2;Pop\n")
+
+        assert list(iter_fields(path)) == [["1", "Rock"], ["2", "Pop"]]
+
+
+@pytest.mark.unit
+class TestGroupPlaylists:
+    @pytest.mark.parametrize("memory_budget", [1, 300, 10**9])
+    def test_same_as_build_playlists(self, memory_budget):
+        playlist_dict = {"1": "Rock", "2": "Pop", "10": "Jazz"}
+        pairs = [(str(i % 3 if i % 3 else 10), f"track{i}.mp3") for i in range(50)]
+        pairs.append(("99", "unknown.mp3"))
+
+        grouped = {
+            name: list(tracks)
+            for name, tracks in group_playlists(pairs, playlist_dict, memory_budget)
+        }
+
+        expected = build_playlists([{k: v} for k, v in pairs], playlist_dict)
+        assert grouped == expected
+        assert list(grouped) == list(expected)
+
+
+@pytest.mark.unit
+class TestExportPlaylistStreams:
+    def test_same_files_as_export_playlists(self, temp_dir):
+        final_dict = {"1_Rock": ["a.mp3", "b.mp3"], "2_Pop/Synth": ["c.mp3"]}
+        streamed = temp_dir / "streamed"
+        exported = temp_dir / "exported"
+
+        written, _ = export_playlist_streams(
+            ((k, iter(v)) for k, v in final_dict.items()),
+            [(str(streamed), "/music/", ".m3u")],
+        )
+        export_playlists(str(exported), "/music/", final_dict)
+
+        assert len(written) == 2
+        for path in exported.iterdir():
+            assert (streamed / path.name).read_text() == path.read_text()
+        assert not list(streamed.glob("*.tmp"))
+
+    def test_manifest_shared_with_export_playlists(self, temp_dir):
+        final_dict = {"1_Rock": ["a.mp3"], "2_Pop": ["b.mp3"]}
+        folder = temp_dir / "playlists"
+        manifest = temp_dir / "manifest.json"
+        export_playlists(str(folder), "", final_dict, manifest)
+        mtime = (folder / "1_Rock.m3u").stat().st_mtime_ns
+
+        written, removed = export_playlist_streams(
+            [("1_Rock", iter(["a.mp3"]))], [(str(folder), "", ".m3u")], manifest
+        )
+
+        assert written == []
+        assert removed == [f"{folder}/2_Pop.m3u"]
+        assert (folder / "1_Rock.m3u").stat().st_mtime_ns == mtime
+        assert list(load_manifest(manifest)) == [f"{folder}/1_Rock.m3u"]
+
+    def test_crash_keeps_previous_playlists(self, temp_dir):
+        folder = temp_dir / "playlists"
+        targets = [(str(folder), "", ".m3u"), (str(folder), "/music/", ".txt")]
+        export_playlist_streams([("1_Rock", iter(["a", "b"]))], targets)
+
+        def tracks():
+            yield "c"
+            raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            export_playlist_streams([("1_Rock", tracks())], targets)
+
+        assert (folder / "1_Rock.m3u").read_text() == "a\nb"
+        assert sorted(x.name for x in folder.iterdir()) == ["1_Rock.m3u", "1_Rock.txt"]
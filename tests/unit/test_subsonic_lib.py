@@ -0,0 +1,190 @@
+import random
+
+import pytest
+import subsonic_lib
+from subsonic_lib import (
+    SongIdMap,
+    SubsonicClient,
+    SubsonicError,
+    playlist_delta,
+    sync_playlists,
+)
+
+SONGS = {f"s{i}": f"Artist {i % 3}/Album/{i:02d} Track.mp3" for i in range(10)}
+
+
+def apply(current, removed, added):
+    # Same semantics as updatePlaylist
+    return [x for i, x in enumerate(current) if i not in set(removed)] + added
+
+
+@pytest.fixture
+def server(fake_subsonic):
+    fake_subsonic.songs = dict(SONGS)
+    return fake_subsonic
+
+
+@pytest.fixture
+def client(server):
+    return SubsonicClient(server.url, server.user, server.password)
+
+
+@pytest.fixture
+def folder(temp_dir):
+    folder = temp_dir / "playlists"
+    folder.mkdir()
+    (folder / "1_Rock.m3u").write_text(
+        "\n".join(f"/music/{SONGS[x]}" for x in ["s0", "s3", "s6"])
+    )
+    (folder / "2_Pop.m3u").write_text(f"/music/{SONGS['s1']}\n/music/Unknown.mp3")
+    return folder
+
+
+@pytest.mark.unit
+class TestPlaylistDelta:
+    def test_one_track_change(self):
+        current = [f"s{i}" for i in range(500)]
+
+        assert playlist_delta(current, current) == ([], [])
+        assert playlist_delta(current, current + ["new"]) == ([], ["new"])
+        assert playlist_delta(current, current[:250] + current[251:]) == ([250], [])
+
+    def test_random_deltas(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            current = rng.choices("abcdefgh", k=rng.randint(0, 12))
+            desired = rng.choices("abcdefgh", k=rng.randint(0, 12))
+
+            assert apply(current, *playlist_delta(current, desired)) == desired
+
+
+@pytest.mark.unit
+class TestSubsonicClient:
+    def test_wrong_password(self, server):
+        client = SubsonicClient(server.url, server.user, "wrong")
+
+        with pytest.raises(SubsonicError, match="Wrong"):
+            client.playlists()
+
+    def test_iter_songs_pages(self, client, server):
+        songs = list(client.iter_songs(page_size=4))
+
+        assert {x["id"]: x["path"] for x in songs} == SONGS
+        assert server.endpoints() == ["search3"] * 3
+
+
+@pytest.mark.unit
+class TestSongIdMap:
+    def test_cached_until_scan(self, client, server, temp_dir):
+        cache_file = temp_dir / "ids.json"
+        SongIdMap(cache_file, client).load()
+
+        server.requests.clear()
+        id_map = SongIdMap(cache_file, client)
+        assert id_map.resolve(["/music/Artist 1/Album/01 Track.mp3"], "/music/") == (
+            ["s1"],
+            [],
+        )
+        assert server.endpoints() == ["getScanStatus"]
+
+        server.last_scan = "2024-02-01T00:00:00Z"
+        server.songs["s1"] = "Artist 1/Album/01 Moved.mp3"
+        id_map = SongIdMap(cache_file, client)
+        assert id_map.resolve(["/music/Artist 1/Album/01 Track.mp3"], "/music/") == (
+            [],
+            ["/music/Artist 1/Album/01 Track.mp3"],
+        )
+        assert "search3" in server.endpoints()
+
+
+@pytest.mark.unit
+class TestSyncPlaylists:
+    def test_sync(self, client, server, folder, temp_dir, capsys):
+        id_map = SongIdMap(temp_dir / "ids.json", client)
+
+        result = sync_playlists(client, id_map, folder, "/music/")
+
+        assert result == (["1_Rock", "2_Pop"], [], [], 2)
+        assert server.stored_playlist("1_Rock") == ["s0", "s3", "s6"]
+        assert server.stored_playlist("2_Pop") == ["s1"]
+        assert "WARNING: 1 tracks not found" in capsys.readouterr().out
+
+        client.request("createPlaylist", name="Manual", songId=["s2"])
+        (folder / "1_Rock.m3u").write_text(
+            "\n".join(f"/music/{SONGS[x]}" for x in ["s0", "s6", "s9"])
+        )
+        (folder / "2_Pop.m3u").unlink()
+        server.requests.clear()
+        result = sync_playlists(client, id_map, folder, "/music/", ["1_Rock", "2_Pop"])
+
+        assert result == (["1_Rock"], ["2_Pop"], [], 2)
+        assert server.stored_playlist("1_Rock") == ["s0", "s6", "s9"]
+        assert [x["name"] for x in server.playlists.values()] == ["1_Rock", "Manual"]
+        update = dict(server.requests)["updatePlaylist"]
+        assert update["songIndexToRemove"] == ["1"]
+        assert update["songIdToAdd"] == ["s9"]
+
+    def test_unchanged_playlists_not_updated(self, client, server, folder, temp_dir):
+        id_map = SongIdMap(temp_dir / "ids.json", client)
+        sync_playlists(client, id_map, folder, "/music/")
+        server.requests.clear()
+
+        result = sync_playlists(client, id_map, folder, "/music/", ["1_Rock", "2_Pop"])
+
+        assert result == (["1_Rock", "2_Pop"], [], [], 0)
+        assert sorted(server.endpoints()) == [
+            "getPlaylist",
+            "getPlaylist",
+            "getPlaylists",
+        ]
+
+    def test_failed_playlist_reported(
+        self, client, server, folder, temp_dir, monkeypatch, capsys
+    ):
+        create = server.api_createPlaylist
+
+        def create_playlist(params):
+            if params["name"] == ["1_Rock"]:
+                raise KeyError("Refused")
+            return create(params)
+
+        monkeypatch.setattr(server, "api_createPlaylist", create_playlist)
+        id_map = SongIdMap(temp_dir / "ids.json", client)
+
+        result = sync_playlists(client, id_map, folder, "/music/")
+
+        assert result == (["1_Rock", "2_Pop"], [], ["1_Rock"], 1)
+        assert [x["name"] for x in server.playlists.values()] == ["2_Pop"]
+        assert "WARNING: can't upload 1_Rock" in capsys.readouterr().out
+
+    def test_paths_not_reported(self, client, server, folder, temp_dir):
+        # Synthetic paths of navidrome without Report Real Path
+        server.songs = {k: f"{v[:-4]} (synthetic).mp3" for k, v in SONGS.items()}
+        id_map = SongIdMap(temp_dir / "ids.json", client)
+
+        with pytest.raises(SubsonicError, match="Report Real Path"):
+            sync_playlists(client, id_map, folder, "/music/")
+
+        assert server.playlists == {}
+
+    def test_batches(self, client, server, folder, temp_dir, monkeypatch):
+        monkeypatch.setattr(subsonic_lib, "UPDATE_BATCH_SIZE", 2)
+        id_map = SongIdMap(temp_dir / "ids.json", client)
+
+        sync_playlists(client, id_map, folder, "/music/")
+
+        assert server.stored_playlist("1_Rock") == ["s0", "s3", "s6"]
+        assert server.endpoints().count("updatePlaylist") == 1
+
+    def test_concurrency_limit(self, client, server, temp_dir):
+        folder = temp_dir / "many"
+        folder.mkdir()
+        for i in range(8):
+            (folder / f"{i}_Playlist.m3u").write_text(f"/music/{SONGS['s0']}")
+        id_map = SongIdMap(temp_dir / "ids.json", client)
+        server.delay = 0.02
+
+        sync_playlists(client, id_map, folder, "/music/", max_workers=3)
+
+        assert len(server.playlists) == 8
+        assert 1 < server.max_active <= 3
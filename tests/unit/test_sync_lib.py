@@ -0,0 +1,116 @@
+import os
+import threading
+
+import pytest
+import sync_lib
+from sync_lib import atomic_copy, sync_folder, sync_targets
+
+
+@pytest.fixture
+def exported(temp_dir):
+    folder = temp_dir / "playlists"
+    folder.mkdir()
+    for name in ["1_Rock.m3u", "2_Pop.m3u"]:
+        (folder / name).write_text(name)
+    return folder
+
+
+@pytest.mark.unit
+class TestSyncFolder:
+    def test_atomic_copy(self, exported, temp_dir):
+        atomic_copy(exported / "1_Rock.m3u", temp_dir / "copy.m3u")
+
+        assert (temp_dir / "copy.m3u").read_text() == "1_Rock.m3u"
+        assert not (temp_dir / "copy.m3u.tmp").exists()
+
+    def test_first_sync_copies_everything(self, exported, temp_dir):
+        target = temp_dir / "target"
+
+        copied, deleted, record = sync_folder(exported, target, {})
+
+        assert copied == [str(target / "1_Rock.m3u"), str(target / "2_Pop.m3u")]
+        assert deleted == []
+        assert sorted(record) == ["1_Rock.m3u", "2_Pop.m3u"]
+        assert (target / "2_Pop.m3u").read_text() == "2_Pop.m3u"
+
+    def test_only_changes_copied(self, exported, temp_dir):
+        target = temp_dir / "target"
+        (exported / "3_Jazz.m3u").write_text("old")
+        _, _, record = sync_folder(exported, target, {})
+        (exported / "2_Pop.m3u").write_text("new")
+        (exported / "3_Jazz.m3u").unlink()
+        (target / "4_Other.m3u").write_text("not exported")
+
+        copied, deleted, record = sync_folder(exported, target, record)
+
+        assert copied == [str(target / "2_Pop.m3u")]
+        assert deleted == [str(target / "3_Jazz.m3u")]
+        assert sorted(record) == ["1_Rock.m3u", "2_Pop.m3u"]
+        assert (target / "2_Pop.m3u").read_text() == "new"
+        assert sorted(os.listdir(target)) == ["1_Rock.m3u", "2_Pop.m3u", "4_Other.m3u"]
+
+    def test_missing_at_target_copied(self, exported, temp_dir):
+        # Target cleaned up since the last sync
+        target = temp_dir / "target"
+        _, _, record = sync_folder(exported, target, {})
+        (target / "1_Rock.m3u").unlink()
+
+        copied, _, record = sync_folder(exported, target, record)
+
+        assert copied == [str(target / "1_Rock.m3u")]
+        assert sync_folder(exported, target, record)[:2] == ([], [])
+
+
+@pytest.mark.unit
+class TestSyncTargets:
+    def test_targets(self, exported, temp_dir, capsys):
+        other = temp_dir / "mpd_playlists"
+        other.mkdir()
+        (other / "1_Rock.m3u").write_text("mpd")
+        targets = [
+            (str(exported), str(temp_dir / "nas")),
+            (str(other), str(temp_dir / "mpd")),
+        ]
+        record_file = temp_dir / "record.json"
+
+        synced = sync_targets(targets, record_file)
+
+        assert synced[str(temp_dir / "mpd")] == ([str(temp_dir / "mpd/1_Rock.m3u")], [])
+        assert len(synced[str(temp_dir / "nas")][0]) == 2
+        assert "Synced" in capsys.readouterr().out
+
+        # Changed by a run without --sync
+        (other / "1_Rock.m3u").write_text("changed")
+        synced = sync_targets(targets, record_file)
+
+        assert synced == {
+            str(temp_dir / "nas"): ([], []),
+            str(temp_dir / "mpd"): ([str(temp_dir / "mpd/1_Rock.m3u")], []),
+        }
+
+    def test_failing_target(self, exported, temp_dir, capsys):
+        (temp_dir / "file").write_text("not a folder")
+
+        synced = sync_targets([(str(exported), str(temp_dir / "file"))])
+
+        assert synced == {str(temp_dir / "file"): None}
+        assert "WARNING" in capsys.readouterr().out
+
+    def test_hung_target(self, exported, temp_dir, monkeypatch, capsys):
+        released = threading.Event()
+        monkeypatch.setattr(
+            sync_lib, "sync_folder", lambda *args: released.wait() and ([], [], {})
+        )
+        targets = [(str(exported), str(temp_dir / "nas"))]
+
+        try:
+            synced = sync_targets(targets, timeout=0.1)
+            assert synced == {}
+            assert "no answer" in capsys.readouterr().out
+
+            # Not synced again while the timed out sync can still write
+            synced = sync_targets(targets, timeout=0.1)
+            assert synced == {str(temp_dir / "nas"): None}
+            assert "still running" in capsys.readouterr().out
+        finally:
+            released.set()
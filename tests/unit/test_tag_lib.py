@@ -0,0 +1,201 @@
+import json
+import os
+import struct
+
+import mplaylist
+import pytest
+import tag_lib
+from playlist_lib import TrackTable, build_artist_dict, match_tracks_table
+from tag_lib import TagCache, index_library, load_tag_artists, walk_library
+
+
+def read_text_tags(filename):
+    # Stands for read_tags, the test files hold "ARTIST;ALBUMARTIST;TITLE"
+    with open(filename, encoding="utf-8") as f:
+        content = f.read()
+    if not content:
+        return None
+    artist, album_artist, title = content.split(";")
+    return {"Artist": artist, "AlbumArtist": album_artist, "Title": title}
+
+
+def write_flac(filename, comments, seconds=2, sample_rate=44100):
+    # Minimal FLAC file: STREAMINFO and VORBIS_COMMENT blocks, no audio frames
+    streaminfo = struct.pack(">HH", 4096, 4096) + b"\x00" * 6
+    samples = seconds * sample_rate
+    streaminfo += ((sample_rate << 44) | (1 << 41) | (15 << 36) | samples).to_bytes(
+        8, "big"
+    )
+    streaminfo += b"\x00" * 16
+    vendor = b"test"
+    comment = struct.pack("<I", len(vendor)) + vendor
+    comment += struct.pack("<I", len(comments))
+    for key, value in comments.items():
+        entry = f"{key}={value}".encode("utf-8")
+        comment += struct.pack("<I", len(entry)) + entry
+    with open(filename, "wb") as f:
+        f.write(b"fLaC")
+        f.write(bytes([0]) + len(streaminfo).to_bytes(3, "big") + streaminfo)
+        f.write(bytes([0x84]) + len(comment).to_bytes(3, "big") + comment)
+
+
+def make_library(basepath, files):
+    for path, content in files.items():
+        filename = basepath / path
+        filename.parent.mkdir(parents=True, exist_ok=True)
+        filename.write_text(content, encoding="utf-8")
+
+
+LIBRARY = {
+    "Francesco Bearzatti Tinissima 4et/Monk'n'Roll/01 Mrs. Robinson.flac": (
+        "Francesco Bearzatti;Francesco Bearzatti Tinissima 4et;Mrs. Robinson"
+    ),
+    "Artist One/Album One/01 Track One.mp3": "Artist One;Artist One;Track One",
+    "Artist One/Album One/cover.jpg": "",
+}
+
+
+@pytest.mark.unit
+class TestIndexLibrary:
+    def test_walk_library(self, temp_dir):
+        make_library(temp_dir, LIBRARY)
+
+        assert [x[0] for x in walk_library(temp_dir)] == [
+            "Artist One/Album One/01 Track One.mp3",
+            "Francesco Bearzatti Tinissima 4et/Monk'n'Roll/01 Mrs. Robinson.flac",
+        ]
+
+    def test_only_changed_files_read_again(self, temp_dir):
+        library = temp_dir / "library"
+        cache_file = temp_dir / "tag-cache.json"
+        make_library(library, LIBRARY)
+        reads = []
+
+        def reader(filename):
+            reads.append(os.path.relpath(filename, library))
+            return read_text_tags(filename)
+
+        songs = index_library(library, cache_file, reader=reader)
+
+        assert songs[1] == {
+            "file": "Francesco Bearzatti Tinissima 4et/Monk'n'Roll/01 Mrs. Robinson.flac",
+            "Artist": "Francesco Bearzatti",
+            "AlbumArtist": "Francesco Bearzatti Tinissima 4et",
+            "Title": "Mrs. Robinson",
+        }
+        assert len(reads) == 2
+
+        reads.clear()
+        assert index_library(library, cache_file, reader=reader) == songs
+        assert reads == []
+
+        make_library(library, {"Artist One/Album One/01 Track One.mp3": "A;A;Track"})
+        (
+            library
+            / "Francesco Bearzatti Tinissima 4et/Monk'n'Roll/01 Mrs. Robinson.flac"
+        ).unlink()
+        songs = index_library(library, cache_file, reader=reader)
+
+        assert reads == ["Artist One/Album One/01 Track One.mp3"]
+        assert songs == [
+            {
+                "file": "Artist One/Album One/01 Track One.mp3",
+                "Artist": "A",
+                "AlbumArtist": "A",
+                "Title": "Track",
+            }
+        ]
+        assert list(json.loads(cache_file.read_text())) == [songs[0]["file"]]
+
+    def test_unreadable_files_not_cached(self, temp_dir, capsys):
+        cache_file = temp_dir / "tag-cache.json"
+        make_library(temp_dir / "library", {"A/B/01.mp3": ""})
+
+        assert (
+            index_library(temp_dir / "library", cache_file, reader=read_text_tags) == []
+        )
+        assert "WARNING: can't read the tags of A/B/01.mp3." in capsys.readouterr().out
+        assert TagCache(cache_file).entries == {}
+
+    def test_process_pool(self, temp_dir, monkeypatch):
+        monkeypatch.setattr(tag_lib, "READ_CHUNK_SIZE", 2)
+        make_library(
+            temp_dir,
+            {f"Artist {i}/Album/01.mp3": f"Artist {i};;Title {i}" for i in range(10)},
+        )
+
+        songs = index_library(temp_dir, max_workers=2, reader=read_text_tags)
+
+        assert sorted(x["Artist"] for x in songs) == sorted(
+            f"Artist {i}" for i in range(10)
+        )
+
+    def test_tag_artists_match_tracks(self, temp_dir):
+        cache_file = temp_dir / "tag-cache.json"
+        make_library(temp_dir / "library", LIBRARY)
+        index_library(temp_dir / "library", cache_file, reader=read_text_tags)
+        tag_artists = load_tag_artists(cache_file)
+        artist_dict = build_artist_dict([("Francesco Bearzatti", "3")])
+        tracks = list(LIBRARY)[:2]
+
+        assert tag_artists[tracks[0]] == [
+            "Francesco Bearzatti",
+            "Francesco Bearzatti Tinissima 4et",
+        ]
+        table = TrackTable()
+        assert match_tracks_table(tracks, artist_dict, table) == [
+            "Artist One",
+            "Francesco Bearzatti Tinissima 4et",
+        ]
+
+        missing_artists = match_tracks_table(
+            tracks, artist_dict, table, tag_artists=tag_artists
+        )
+
+        assert list(table.view("3")) == [tracks[0]]
+        assert missing_artists == ["Artist One"]
+
+
+@pytest.mark.unit
+class TestReadTags:
+    def test_read_flac(self, temp_dir):
+        pytest.importorskip("mutagen")
+        write_flac(
+            temp_dir / "01.flac",
+            {"ARTIST": "Francesco Bearzatti", "TITLE": "Mrs. Robinson"},
+        )
+
+        assert tag_lib.read_tags(temp_dir / "01.flac") == {
+            "Artist": "Francesco Bearzatti",
+            "Title": "Mrs. Robinson",
+            "duration": "2.000",
+        }
+
+    def test_mplaylist_local(self, temp_dir):
+        pytest.importorskip("mutagen")
+        library = temp_dir / "library"
+        (library / "Tinissima 4et/Album").mkdir(parents=True)
+        write_flac(
+            library / "Tinissima 4et/Album/01.flac",
+            {"ARTIST": "Francesco Bearzatti", "TITLE": "Mrs. Robinson"},
+        )
+        favorites = temp_dir / "favorites.txt"
+        favorites.write_text("Francesco Bearzatti - Mrs. Robinson\nA - B\n")
+        output = temp_dir / "04.csv"
+
+        mplaylist.main(
+            [
+                str(favorites),
+                "--local",
+                str(library),
+                "--tag-cache",
+                str(temp_dir / "tag-cache.json"),
+                "--output",
+                str(output),
+                "--output-missing",
+                str(temp_dir / "05.csv"),
+            ]
+        )
+
+        assert output.read_text() == "Tinissima 4et/Album/01.flac\n"
+        assert (temp_dir / "05.csv").read_text() == "A - B\n"
@@ -0,0 +1,246 @@
+import random
+
+import pytest
+from match_lib import write_results
+from path_lib import PathValidator
+from playlist_lib import (
+    TrackTable,
+    build_artist_dict,
+    build_playlists,
+    match_missing_tracks_table,
+    match_tracks_table,
+    read_alias_list,
+    read_files,
+    read_optional,
+)
+from watch_lib import (
+    FileWatcher,
+    PlaylistState,
+    changed_track_artists,
+    group_by_artist,
+)
+
+ARTISTS = [f"Artist {i}" for i in range(8)]
+
+
+@pytest.fixture
+def files(temp_dir):
+    rng = random.Random(0)
+    music_dir = temp_dir / "music"
+    music_dir.mkdir()
+    files = {
+        name: temp_dir / filename
+        for name, filename in [
+            ("favorites", "00.txt"),
+            ("playlists", "01.csv"),
+            ("artists", "02.csv"),
+            ("result", "04.csv"),
+            ("missing", "05.csv"),
+            ("fix", "06.csv"),
+        ]
+    }
+    favorites = [f"{rng.choice(ARTISTS)} - Title {i}" for i in range(60)]
+    missing = favorites[::7] + ["Unknown - Title"]
+    fixes = []
+    for i, track in enumerate(missing[:-2]):
+        path = music_dir / f"{i}.mp3"
+        if i != 3:
+            path.write_text("test")
+        fixes.append(f"{track};{path}")
+
+    files["favorites"].write_text("\n".join(favorites))
+    files["playlists"].write_text("1;Rock\n2;Pop\n3;Jazz")
+    files["artists"].write_text(
+        "\n".join(f"{rng.randint(1, 4)};{x}" for x in ARTISTS[:-1] + ARTISTS[:3])
+    )
+    files["result"].write_text(
+        "\n".join(
+            f"{x.split(' - ')[0]}/Album/{x.split(' - ')[1]}.mp3"
+            for x in favorites
+            if x not in missing
+        )
+    )
+    files["missing"].write_text("\n".join(missing))
+    files["fix"].write_text("\n".join(fixes))
+    return files
+
+
+def create_playlists(files, local_basepath):
+    # Same steps as create_playlists.create_playlists
+    raw_tracks, tracks, missing_tracks, playlist_dict, artist_list, missing_dict = (
+        read_files(*(v for k, v in files.items() if k != "aliases"))
+    )
+    artist_dict = build_artist_dict(
+        artist_list, read_optional(read_alias_list, files.get("aliases"), [])
+    )
+    missing_table, list_missing_paths, missing_artists2 = match_missing_tracks_table(
+        missing_tracks, missing_dict, artist_dict, local_basepath
+    )
+    table = TrackTable()
+    table.extend(missing_table)
+    missing_artists = match_tracks_table(tracks, artist_dict, table)
+    raw_table = TrackTable()
+    match_tracks_table(raw_tracks, artist_dict, raw_table, sep=" - ")
+    raw_table.extend(missing_table)
+    return (
+        [
+            {k: list(v) for k, v in build_playlists(x, playlist_dict).items()}
+            for x in [table, raw_table]
+        ],
+        sorted(set(missing_artists + missing_artists2)),
+        list_missing_paths,
+    )
+
+
+def state_playlists(state):
+    return (
+        state.final_dicts(),
+        sorted(set(state.missing_artists())),
+        state.list_missing_paths,
+    )
+
+
+@pytest.mark.unit
+class TestPlaylistState:
+    def test_group_by_artist(self):
+        ordered, groups = group_by_artist(["A/1", "B/2", "A/3"])
+
+        assert ordered == ["A/3", "B/2", "A/1"]
+        assert groups == {"A": [0, 2], "B": [1]}
+
+    def test_same_as_create_playlists(self, files, temp_dir, capsys):
+        state = PlaylistState(files, f"{temp_dir}/", PathValidator())
+
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
+        assert "WARNING" in capsys.readouterr().out
+
+    def test_artist_change_rebuilds_its_playlists(self, files, temp_dir):
+        state = PlaylistState(files, f"{temp_dir}/")
+
+        with open(files["artists"], "a") as f:
+            f.write("\n3;Artist 7")
+        affected = state.update(["artists"])
+
+        assert affected == {"3"}
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
+
+    def test_artist_removed(self, files, temp_dir):
+        state = PlaylistState(files, f"{temp_dir}/")
+
+        lines = files["artists"].read_text().splitlines()
+        files["artists"].write_text(
+            "\n".join(x for x in lines if not x.endswith("Artist 1"))
+        )
+        affected = state.update(["artists"])
+
+        assert affected == {x.split(";")[0] for x in lines if x.endswith("Artist 1")}
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
+
+    def test_fix_change(self, files, temp_dir):
+        state = PlaylistState(files, f"{temp_dir}/")
+
+        lines = files["fix"].read_text().splitlines()
+        files["fix"].write_text("\n".join(lines[1:]))
+        state.update(["fix"])
+
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
+
+    @pytest.mark.parametrize("name", ["favorites", "playlists", "result", "missing"])
+    def test_other_changes(self, files, temp_dir, name):
+        state = PlaylistState(files, f"{temp_dir}/")
+
+        lines = files[name].read_text().splitlines()
+        files[name].write_text("\n".join(lines[2:] + lines[:1]))
+        state.update([name])
+
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
+
+    def test_folded_artists_and_aliases(self, files, temp_dir):
+        files["aliases"] = temp_dir / "09.csv"
+        with open(files["result"], "a") as f:
+            f.write("\nartist 0/Album/A.mp3\nThe Artist 1/Album/B.mp3\nA1/Album/C.mp3")
+        with open(files["favorites"], "a") as f:
+            f.write("\nARTIST 2 - Title")
+        state = PlaylistState(files, f"{temp_dir}/")
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
+        assert "A1" in state.missing_artists()
+
+        files["aliases"].write_text("A1;Artist 1")
+        affected = state.update(["aliases"])
+
+        assert "A1" not in state.missing_artists()
+        assert set(state.artist_dict["Artist 1"]) <= affected
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
+
+    def test_update_results_same_as_files(self, files, temp_dir):
+        # Results of a matcher: (favorite, files) in favorites order
+        favorites = files["favorites"].read_text().splitlines()
+        results = [
+            (tuple(x.split(" - ")), [] if i % 7 == 0 else [f"{x[:8]}/Album/{i}.mp3"])
+            for i, x in enumerate(favorites)
+        ]
+        write_results(results, files["result"], files["missing"], verbose=False)
+        state = PlaylistState(files, f"{temp_dir}/")
+        state.load_results(results)
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
+
+        changes = {
+            0: (results[0][0], [f"{favorites[0][:8]}/Live/0.mp3"]),
+            5: (results[5][0], []),
+            9: (results[9][0], ["Artist 7/Album/9.mp3", "Artist 0/Best Of/9.mp3"]),
+        }
+        results = [changes.get(i, x) for i, x in enumerate(results)]
+        write_results(results, files["result"], files["missing"], verbose=False)
+        affected = state.update_results(changes)
+
+        assert set(state.artist_dict["Artist 0"]) <= affected
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
+
+
+@pytest.mark.unit
+class TestFileWatcher:
+    def test_wait_until_quiet(self, files):
+        writes = iter(
+            [
+                lambda: files["artists"].write_text("1;Artist 0"),
+                lambda: files["fix"].write_text(""),
+                lambda: None,
+            ]
+        )
+        sleeps = []
+
+        def sleep(interval):
+            sleeps.append(interval)
+            next(writes)()
+
+        watcher = FileWatcher(files, interval=0.1, sleep=sleep)
+        assert watcher.changed() == []
+
+        assert watcher.wait() == ["artists", "fix"]
+        assert sleeps == [0.1, 0.1, 0.1]
+        assert watcher.changed() == []
+
+
+@pytest.mark.unit
+class TestChangedTrackArtists:
+    def test_changed_artists_only(self):
+        old = group_by_artist(["A/1", "B/1", "C/1"])
+        new = group_by_artist(["A/1", "B/1", "B/2", "C/1"])
+
+        assert changed_track_artists(old, new) == {"B"}
+
+    def test_order_of_other_artists_changed(self):
+        old = group_by_artist(["A/1", "B/1", "C/1"])
+        new = group_by_artist(["C/1", "A/1", "B/1", "B/2"])
+
+        assert changed_track_artists(old, new) is None
+
+    def test_result_change_rebuilds_artist_playlists(self, files, temp_dir):
+        state = PlaylistState(files, f"{temp_dir}/")
+
+        with open(files["result"], "a") as f:
+            f.write("\nArtist 7/Album/New.mp3\nArtist 0/Album/New.mp3")
+        affected = state.update(["result"])
+
+        assert affected == set(state.artist_dict["Artist 0"])
+        assert state_playlists(state) == create_playlists(files, f"{temp_dir}/")
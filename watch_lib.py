@@ -0,0 +1,322 @@
+import time
+from bisect import insort
+from collections import defaultdict
+
+from path_lib import PathValidator
+from playlist_lib import (
+    build_artist_dict,
+    file_signature,
+    iter_missing_paths,
+    playlist_id_width,
+    playlist_name,
+    read_alias_list,
+    read_artist_list,
+    read_lines,
+    read_missing_dict,
+    read_optional,
+    read_playlist_dict,
+)
+
+DEFAULT_INTERVAL = 0.5
+
+# Input files of a PlaylistState, in read_files order
+INPUTS = ["favorites", "playlists", "artists", "aliases", "result", "missing", "fix"]
+
+
+def group_by_artist(tracks, sep="/"):
+    # Tracks newest last (as in match_tracks), and their positions for each artist
+    ordered = tracks[::-1]
+    groups = defaultdict(list)
+    for i, track in enumerate(ordered):
+        groups[track.split(sep)[0].strip()].append(i)
+    return ordered, dict(groups)
+
+
+def artists_by_playlist(artist_dict):
+    # {playlist_id: {artist: number of times the artist is in the playlist}}
+    playlists = defaultdict(lambda: defaultdict(int))
+    for artist, playlist_ids in artist_dict.items():
+        for playlist_id in playlist_ids:
+            playlists[playlist_id][artist] += 1
+    return playlists
+
+
+def names_by_artist(artist_dict, names):
+    # {artist of artist_dict: names of the tracks resolved to it}
+    result = defaultdict(list)
+    for name in names:
+        artist = artist_dict.canonical(name)
+        if artist is not None:
+            result[artist].append(name)
+    return result
+
+
+def merge_artists(ordered, groups, artists):
+    ids = sorted(
+        i
+        for artist, nb in artists.items()
+        for i in groups.get(artist, ())
+        for _ in range(nb)
+    )
+    return [ordered[i] for i in ids]
+
+
+def changed_artists(old, new):
+    # Artists whose playlists changed between two artist dicts
+    return {x for x in old.keys() | new.keys() if old.get(x) != new.get(x)}
+
+
+def changed_track_artists(old, new):
+    # Artists whose tracks changed between two group_by_artist results, None when
+    # the order of the tracks of the other artists changed too
+    old_tracks = {k: [old[0][i] for i in v] for k, v in old[1].items()}
+    new_tracks = {k: [new[0][i] for i in v] for k, v in new[1].items()}
+    artists = changed_artists(old_tracks, new_tracks)
+
+    def others(ordered, groups):
+        ids = sorted(i for k, v in groups.items() if k not in artists for i in v)
+        return [ordered[i] for i in ids]
+
+    if others(*old) != others(*new):
+        return None
+    return artists
+
+
+class PlaylistState:
+    # Parsed input files and matches grouped by artist, kept between rebuilds: a
+    # change only re-parses the changed files and re-derives the playlists of the
+    # artists it touches. Gives the same playlists as create_playlists.
+    def __init__(self, files, local_basepath="", path_validator=None):
+        self.files = files
+        self.local_basepath = local_basepath
+        self.path_validator = path_validator or PathValidator()
+        self.playlist_dict = {}
+        self.artist_list = []
+        self.aliases = []
+        self.artist_dict = build_artist_dict([])
+        self.by_playlist = {}
+        self.names = {}
+        self.tracks = ([], {})
+        self.raw_tracks = ([], {})
+        self.missing_tracks = []
+        self.missing_dict = {}
+        self.missing_paths = []
+        self.list_missing_paths = []
+        self.playlists = {}
+        self.raw_playlists = {}
+        # Keys of the result tracks and missing lines of each favorite, see
+        # load_results
+        self.result_keys = {}
+        self.missing_lines = {}
+        self.update(INPUTS)
+
+    def parse(self, name):
+        filename = self.files.get(name)
+        if name == "favorites":
+            self.raw_tracks = group_by_artist(read_lines(filename), sep=" - ")
+        elif name == "playlists":
+            self.playlist_dict = read_playlist_dict(filename)
+        elif name == "artists":
+            self.artist_list = read_artist_list(filename)
+        elif name == "aliases":
+            self.aliases = read_optional(read_alias_list, filename, [])
+        elif name == "result":
+            self.tracks = group_by_artist(read_optional(read_lines, filename, []))
+        elif name == "missing":
+            self.missing_tracks = read_optional(read_lines, filename, [])
+        elif name == "fix":
+            self.missing_dict = read_optional(read_missing_dict, filename, {})
+
+    def resolve_missing(self):
+        self.list_missing_paths = []
+        self.missing_paths = list(
+            iter_missing_paths(
+                self.missing_tracks,
+                self.missing_dict,
+                self.local_basepath,
+                self.list_missing_paths,
+                self.path_validator,
+            )
+        )
+
+    def update(self, names):
+        # Returns the ids of the rebuilt playlists
+        old_artist_dict = self.artist_dict
+        old_missing_paths = self.missing_paths
+        old_tracks = {"favorites": self.raw_tracks, "result": self.tracks}
+        for name in names:
+            self.parse(name)
+
+        if "artists" in names or "aliases" in names:
+            self.artist_dict = build_artist_dict(self.artist_list, self.aliases)
+            self.by_playlist = artists_by_playlist(self.artist_dict)
+        if "missing" in names or "fix" in names:
+            self.resolve_missing()
+        # Names of the tracks for each artist, they may differ from the artists file
+        # by case, accents, articles, punctuation or an alias
+        self.names = names_by_artist(
+            self.artist_dict,
+            set(self.tracks[1])
+            | set(self.raw_tracks[1])
+            | {x for x, _ in self.missing_paths},
+        )
+
+        artists = changed_artists(old_artist_dict, self.artist_dict)
+        if old_missing_paths != self.missing_paths:
+            # The order of the missing tracks is kept across artists
+            artists |= {x for x, _ in old_missing_paths + self.missing_paths}
+        for name, new_tracks in [
+            ("favorites", self.raw_tracks),
+            ("result", self.tracks),
+        ]:
+            if name in names and artists is not None:
+                changed = changed_track_artists(old_tracks[name], new_tracks)
+                artists = None if changed is None else artists | changed
+
+        if "playlists" in names or "aliases" in names or artists is None:
+            affected = (
+                set(self.by_playlist) | set(self.playlists) | set(self.raw_playlists)
+            )
+        else:
+            affected = {
+                playlist_id
+                for artist in artists
+                for artist_dict in (old_artist_dict, self.artist_dict)
+                for playlist_id in artist_dict.get(artist, ())
+            }
+
+        for playlist_id in affected:
+            self.rebuild(playlist_id)
+        return affected
+
+    def load_results(self, results):
+        # Result and missing tracks from the (favorite, files) of a matcher instead
+        # of the files it wrote, same tracks in the same order. The tracks are keyed
+        # by (-favorite position, -file position), newest last as in group_by_artist,
+        # so that update_results can replace the tracks of a favorite in place
+        self.tracks = ({}, {})
+        self.result_keys = {}
+        self.missing_lines = {}
+        self.set_results(enumerate(results))
+        self.missing_tracks = list(self.missing_lines.values())
+
+    def set_results(self, results):
+        # Returns the artists of the replaced and added tracks
+        ordered, groups = self.tracks
+        artists = set()
+        for i, ((artist, title), files) in results:
+            for key in self.result_keys.pop(i, ()):
+                name = ordered.pop(key).split("/")[0].strip()
+                groups[name].remove(key)
+                if not groups[name]:
+                    del groups[name]
+                artists.add(name)
+            self.missing_lines.pop(i, None)
+            if not files:
+                self.missing_lines[i] = f"{artist} - {title}"
+            self.result_keys[i] = [(-i, -j) for j in range(len(files))]
+            for key, track in zip(self.result_keys[i], files):
+                ordered[key] = track
+                name = track.split("/")[0].strip()
+                insort(groups.setdefault(name, []), key)
+                artists.add(name)
+        return artists
+
+    def update_results(self, results):
+        # Same as update(["result", "missing"]) after a matcher wrote its results,
+        # from the {position: (favorite, files)} of the favorites that changed only.
+        # Returns the ids of the rebuilt playlists
+        old_missing_lines = dict(self.missing_lines)
+        artists = self.set_results(results.items())
+        if self.missing_lines != old_missing_lines:
+            old_missing_paths = self.missing_paths
+            self.missing_tracks = [
+                self.missing_lines[i] for i in sorted(self.missing_lines)
+            ]
+            self.resolve_missing()
+            if old_missing_paths != self.missing_paths:
+                artists |= {x for x, _ in old_missing_paths + self.missing_paths}
+
+        for name in artists:
+            artist = self.artist_dict.canonical(name)
+            if artist is not None and name not in self.names[artist]:
+                self.names[artist].append(name)
+        affected = {
+            playlist_id
+            for artist in artists
+            for playlist_id in self.artist_dict.get(artist, ())
+        }
+        for playlist_id in affected:
+            self.rebuild(playlist_id)
+        return affected
+
+    def rebuild(self, playlist_id):
+        artists = {
+            name: nb
+            for artist, nb in self.by_playlist.get(playlist_id, {}).items()
+            for name in self.names.get(artist, ())
+        }
+        missing = [
+            path
+            for artist, path in self.missing_paths
+            for _ in range(artists.get(artist, 0))
+        ]
+        # Same order as the TrackTables of create_playlists
+        tracks = missing + merge_artists(*self.tracks, artists)
+        raw_tracks = merge_artists(*self.raw_tracks, artists) + missing
+        for playlists, value in [
+            (self.playlists, tracks),
+            (self.raw_playlists, raw_tracks),
+        ]:
+            if value:
+                playlists[playlist_id] = value
+            else:
+                playlists.pop(playlist_id, None)
+
+    def missing_artists(self):
+        return [x for x in self.tracks[1] if x not in self.artist_dict] + [
+            x for x, _ in self.missing_paths if x not in self.artist_dict
+        ]
+
+    def final_dicts(self):
+        # Same as build_playlists for the playlists and the raw playlists
+        width = playlist_id_width(self.playlist_dict)
+        final_dicts = []
+        for playlists in [self.playlists, self.raw_playlists]:
+            final_dict = {}
+            for playlist_id, tracks in playlists.items():
+                if playlist_id in self.playlist_dict:
+                    name = playlist_name(playlist_id, self.playlist_dict, width)
+                    final_dict[name] = tracks
+                else:
+                    print(f"Playlist name {playlist_id} not in playlist dict.")
+            final_dicts.append(final_dict)
+        return final_dicts
+
+
+class FileWatcher:
+    # Polls the signature (size, mtime) of each file, one stat per file per interval
+    def __init__(self, files, interval=DEFAULT_INTERVAL, sleep=time.sleep):
+        self.files = files
+        self.interval = interval
+        self.sleep = sleep
+        self.signatures = {k: file_signature(v) for k, v in files.items()}
+
+    def changed(self):
+        changed = []
+        for name, filename in self.files.items():
+            signature = file_signature(filename)
+            if signature != self.signatures[name]:
+                self.signatures[name] = signature
+                changed.append(name)
+        return changed
+
+    def wait(self):
+        # Editors save in several steps, changes are collected until a quiet interval
+        changed = []
+        while True:
+            new = [x for x in self.changed() if x not in changed]
+            if changed and not new:
+                return changed
+            changed += new
+            self.sleep(self.interval)